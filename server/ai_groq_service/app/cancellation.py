@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Iterable, Optional
+from starlette.responses import JSONResponse
+from app.metrics import ABANDONED_REQUESTS, CANCELLED_WORK
+
+logger = logging.getLogger(__name__)
+
+# Status recorded for requests whose client went away (nginx's "client closed request")
+CLIENT_CLOSED_STATUS = 499
+
+
+class RequestCancelled(BaseException):
+    """
+    Raised at a checkpoint once the request's client has disconnected. A
+    BaseException, like asyncio.CancelledError, so the services' broad
+    `except Exception` fallbacks don't swallow it and carry on with the work.
+    """
+
+
+class CancelToken:
+    """
+    Request-scoped cancellation flag, safe to check from worker threads. While
+    another request holds it (a retry attached through its Idempotency-Key), a
+    disconnect only takes effect once the last hold is released.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._holds = 0
+        self._client_gone = False
+
+    def cancel(self):
+        with self._lock:
+            self._client_gone = True
+            if self._holds:
+                return
+        self._event.set()
+
+    def hold(self):
+        with self._lock:
+            self._holds += 1
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            fire = self._client_gone and not self._holds
+        if fire:
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+# Token of the request being handled; copied into run_in_threadpool threads with the context
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def checkpoint(stage: str):
+    """
+    Raise RequestCancelled if the current request has been cancelled. Call it
+    between units of work (an OCR page, an LLM call); outside a cancellable
+    request it does nothing.
+    """
+    token = _current_token.get()
+    if token is not None and token.cancelled:
+        CANCELLED_WORK.labels(stage=stage).inc()
+        raise RequestCancelled(stage)
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    ASGI middleware that cancels a request's remaining OCR and LLM work when its
+    client disconnects.
+
+    Once the request body has been read, a watcher waits for `http.disconnect`
+    and cancels the request's CancelToken. Work running in threads stops at its
+    next checkpoint(): OCR between pages, Groq calls while waiting on the
+    response (the HTTP call itself is abandoned, not interrupted). The request
+    then ends with a 499 that nobody reads, counted in
+    ai_abandoned_requests_total. Work that a retry is attached to (see
+    IdempotencyMiddleware) runs on for the retry instead.
+    """
+
+    def __init__(self, app, paths: Iterable[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        token = CancelToken()
+        disconnected = asyncio.get_running_loop().create_future()
+        watcher: Optional[asyncio.Task] = None
+        response_started = False
+
+        async def watch():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    token.cancel()
+                    disconnected.set_result(message)
+                    return
+
+        async def wrapped_receive():
+            nonlocal watcher
+            if watcher is not None:
+                # The watcher owns the connection now; later reads only ever see the disconnect
+                return await asyncio.shield(disconnected)
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                token.cancel()
+                return message
+            if not message.get("more_body", False):
+                watcher = asyncio.create_task(watch())
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        reset = _current_token.set(token)
+        try:
+            await self.app(scope, wrapped_receive, tracked_send)
+        except RequestCancelled as e:
+            ABANDONED_REQUESTS.labels(route=scope["path"]).inc()
+            logger.info(f"Client disconnected from {scope['path']}; abandoned remaining work at {e}")
+            if not response_started:
+                # Outer middleware expects a response even though nobody is listening
+                await JSONResponse({"detail": "Client closed request"}, status_code=CLIENT_CLOSED_STATUS)(
+                    scope, wrapped_receive, send
+                )
+        finally:
+            _current_token.reset(reset)
+            if watcher is not None:
+                watcher.cancel()
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.metrics import DEADLINE_DEGRADATIONS
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+PARTIAL_HEADER = "X-Partial-Result"
+# Kept back from LLM timeouts for serializing and sending the response
+RESPONSE_MARGIN_SECONDS = 0.25
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting an LLM call the request's deadline leaves no time for"""
+
+
+class Deadline:
+    """
+    Time budget of one request, from the caller's X-Request-Deadline-Ms.
+    Stages degrade instead of overrunning it and note why in `degraded`.
+    """
+
+    def __init__(self, budget_seconds: float, llm_reserve_seconds: float = 5.0, min_llm_seconds: float = 1.0):
+        self.expires_at = time.monotonic() + budget_seconds
+        # OCR leaves this much of the budget for the LLM call that follows it
+        self.llm_reserve_seconds = llm_reserve_seconds
+        # An LLM call with less time than this isn't started
+        self.min_llm_seconds = min_llm_seconds
+        self.degraded: List[str] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def allows(self, seconds: float) -> bool:
+        """Whether `seconds` more of OCR work still leaves the LLM reserve"""
+        return self.remaining() - self.llm_reserve_seconds >= seconds
+
+    def llm_timeout(self, timeout: float) -> Optional[float]:
+        """Timeout for an LLM call that must finish before the deadline, or None if there's no time for one"""
+        remaining = self.remaining() - RESPONSE_MARGIN_SECONDS
+        if remaining < self.min_llm_seconds:
+            return None
+        return min(timeout, remaining)
+
+    def degrade(self, reason: str):
+        with self._lock:
+            if reason in self.degraded:
+                return
+            self.degraded.append(reason)
+        DEADLINE_DEGRADATIONS.labels(reason=reason).inc()
+        logger.info(f"Deadline: {reason} ({self.remaining():.2f}s left)")
+
+
+# Deadline of the request being handled; copied into run_in_threadpool threads with the context
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def partial_fields() -> Dict[str, object]:
+    """`partial` / `partial_reasons` response fields for the current request"""
+    deadline = _current_deadline.get()
+    reasons = list(deadline.degraded) if deadline is not None else []
+    return {"partial": bool(reasons), "partial_reasons": reasons}
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware honouring `X-Request-Deadline-Ms`: the milliseconds the
+    caller will wait for this response. The request runs with a Deadline that
+    OCR and Groq calls read (see OCRService and GroqService.chat_completion),
+    and a response that had to cut corners carries `X-Partial-Result` with the
+    reasons. Requests without the header use `default_ms` (0 = no deadline).
+    """
+
+    def __init__(self, app, paths: Iterable[str], default_ms: float = 0,
+                 llm_reserve_seconds: float = 5.0, min_llm_seconds: float = 1.0):
+        self.app = app
+        self.paths = set(paths)
+        self.default_ms = default_ms
+        self.llm_reserve_seconds = llm_reserve_seconds
+        self.min_llm_seconds = min_llm_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        budget_ms = self.default_ms
+        header = Headers(scope=scope).get(DEADLINE_HEADER)
+        if header:
+            try:
+                budget_ms = float(header)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {DEADLINE_HEADER} header: {header[:32]!r}")
+        if not budget_ms or budget_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(budget_ms / 1000, self.llm_reserve_seconds, self.min_llm_seconds)
+
+        async def flagged_send(message):
+            if message["type"] == "http.response.start" and deadline.degraded:
+                MutableHeaders(scope=message)[PARTIAL_HEADER] = ",".join(deadline.degraded)
+            await send(message)
+
+        reset = _current_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, flagged_send)
+        finally:
+            _current_deadline.reset(reset)
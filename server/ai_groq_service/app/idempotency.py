@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import logging
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from app.cancellation import CLIENT_CLOSED_STATUS, CancelToken, current_token
+from app.metrics import IDEMPOTENT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# Retry bodies past this size are buffered on disk while they are fingerprinted
+BODY_BUFFER_BYTES = 1024 * 1024
+REPLAY_CHUNK_SIZE = 64 * 1024
+
+
+class _BodyFingerprint:
+    """
+    SHA-256 of a request body. Multipart boundaries are random per request, so
+    they are hashed as a fixed marker: a retry whose form the client rebuilt
+    still matches when its fields and file are the same.
+    """
+
+    MARKER = b"\0boundary\0"
+
+    def __init__(self, content_type: str):
+        self._digest = hashlib.sha256()
+        self._boundary: Optional[bytes] = None
+        if content_type.lower().startswith("multipart/"):
+            for param in content_type.split(";")[1:]:
+                name, _, value = param.strip().partition("=")
+                if name.lower() == "boundary" and value:
+                    self._boundary = value.strip('"').encode("latin-1")
+        self._tail = b""
+
+    def update(self, chunk: bytes):
+        if not self._boundary:
+            self._digest.update(chunk)
+            return
+        data = (self._tail + chunk).replace(self._boundary, self.MARKER)
+        # Hold back what could be the start of a boundary split across chunks
+        split = max(0, len(data) - (len(self._boundary) - 1))
+        self._digest.update(data[:split])
+        self._tail = data[split:]
+
+    def hexdigest(self) -> str:
+        self._digest.update(self._tail)
+        self._tail = b""
+        return self._digest.hexdigest()
+
+
+class _Entry:
+    """One idempotency key: in flight until `done` is set, then holds the captured response"""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.status: Optional[int] = None
+        self.headers: list = []
+        self.body = bytearray()
+        # Set once the captured body passed the store's size limit; the rest isn't kept
+        self.oversized = False
+        self.completed_at: Optional[float] = None
+        # Cancel token of the attempt running this key; attached retries hold it
+        self.token: Optional[CancelToken] = None
+        # Body fingerprint of the attempt, set once its body has been read (None if it never was)
+        self.fingerprint: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class IdempotencyStore:
+    """Bounded in-memory map of (path, key) -> entry, oldest evicted first"""
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1000, max_body_bytes: int = 5 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry and entry.completed_at is not None and time.time() - entry.completed_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry
+
+    def start(self, key: Tuple[str, str]) -> _Entry:
+        entry = _Entry()
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if not oldest.done.is_set():
+                # Never evict in-flight work; let the map run over until it finishes
+                break
+            del self._entries[oldest_key]
+        return entry
+
+    def finish(self, key: Tuple[str, str], entry: _Entry):
+        entry.completed_at = time.time()
+        if not entry.fingerprint.done():
+            entry.fingerprint.set_result(None)
+        entry.done.set()
+        # Server errors and oversized bodies aren't retained: a later retry runs again
+        if entry.status is None or entry.status >= 500 or entry.oversized:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware honouring an `Idempotency-Key` header on selected POST routes.
+
+    - First request with a key runs normally; its response is captured.
+    - A retry while it is still running waits for it and gets the same response.
+    - A retry after it completed gets the stored response for `ttl_seconds`.
+    Replayed responses carry `Idempotent-Replayed: true`. A key reused with a
+    different body gets 422. If the attempt dies without responding, one
+    waiting retry runs in its place and the others attach to that. Keys are
+    scoped per path and held in this worker's memory, so retries routed to a
+    different worker process are not deduplicated.
+    """
+
+    def __init__(self, app, paths: Iterable[str], ttl_seconds: float = 3600, max_entries: int = 1000,
+                 max_body_bytes: int = 5 * 1024 * 1024):
+        self.app = app
+        self.paths = set(paths)
+        self.store = IdempotencyStore(ttl_seconds, max_entries, max_body_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = Headers(scope=scope).get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        key = (scope["path"], idempotency_key)
+        content_type = Headers(scope=scope).get("content-type", "")
+        entry = self.store.get(key)
+        if entry is None:
+            await self._execute(key, scope, receive, send, _BodyFingerprint(content_type))
+            return
+
+        # A retry: read its body first so it can be compared with the attempt's
+        fingerprint = _BodyFingerprint(content_type)
+        with tempfile.SpooledTemporaryFile(max_size=BODY_BUFFER_BYTES) as body:
+            size = 0
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    # Gone before its body arrived; outer middleware still expects a response
+                    await JSONResponse({"detail": "Client closed request"}, status_code=CLIENT_CLOSED_STATUS)(
+                        scope, receive, send
+                    )
+                    return
+                chunk = message.get("body", b"")
+                fingerprint.update(chunk)
+                body.write(chunk)
+                size += len(chunk)
+                if not message.get("more_body", False):
+                    break
+            digest = fingerprint.hexdigest()
+
+            while entry is not None:
+                attached = not entry.done.is_set()
+                # Keep the running attempt alive for this retry even if its own client disconnects
+                token = entry.token if attached else None
+                if token is not None:
+                    token.hold()
+                try:
+                    original = await entry.fingerprint
+                    if original is not None and original != digest:
+                        IDEMPOTENT_REQUESTS.labels(outcome="rejected").inc()
+                        response = JSONResponse(
+                            {"detail": "Idempotency-Key was already used with a different request body"}, status_code=422
+                        )
+                        await response(scope, receive, send)
+                        return
+                    await entry.done.wait()
+                finally:
+                    if token is not None:
+                        token.release()
+                if entry.status is not None and original is not None:
+                    IDEMPOTENT_REQUESTS.labels(outcome="attached" if attached else "replayed").inc()
+                    await self._replay(entry, send)
+                    return
+                # The attempt died without responding (its entry is gone) or never read its body
+                # (stored, but can't be matched). The first retry here starts the next entry
+                # synchronously, so the others find it and attach to it.
+                entry = self.store.get(key)
+                if entry is not None and entry.done.is_set():
+                    entry = None
+
+            body.seek(0)
+
+            sent_last = False
+
+            async def buffered_receive():
+                nonlocal sent_last
+                if sent_last:
+                    return await receive()
+                chunk = body.read(REPLAY_CHUNK_SIZE)
+                sent_last = body.tell() >= size
+                return {"type": "http.request", "body": chunk, "more_body": not sent_last}
+
+            await self._execute(key, scope, buffered_receive, send, digest=digest)
+
+    async def _execute(self, key: Tuple[str, str], scope, receive, send,
+                       fingerprint: Optional[_BodyFingerprint] = None, digest: Optional[str] = None):
+        """Run the request as the attempt for `key`, fingerprinting its body as the app reads it"""
+        entry = self.store.start(key)
+        entry.token = current_token()
+        if digest is not None:
+            entry.fingerprint.set_result(digest)
+        IDEMPOTENT_REQUESTS.labels(outcome="executed").inc()
+
+        async def fingerprinted_receive():
+            message = await receive()
+            if fingerprint is not None and message["type"] == "http.request" and not entry.fingerprint.done():
+                fingerprint.update(message.get("body", b""))
+                if not message.get("more_body", False):
+                    entry.fingerprint.set_result(fingerprint.hexdigest())
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                entry.status = message["status"]
+                entry.headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body" and not entry.oversized:
+                entry.body += message.get("body", b"")
+                if len(entry.body) > self.store.max_body_bytes:
+                    # Won't be retained anyway; stop buffering and just forward
+                    entry.oversized = True
+                    entry.body = bytearray()
+            await send(message)
+
+        try:
+            await self.app(scope, fingerprinted_receive, capture_send)
+        finally:
+            self.store.finish(key, entry)
+
+    async def _replay(self, entry: _Entry, send):
+        headers = [(k, v) for k, v in entry.headers if k.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(entry.body)).encode()))
+        headers.append((REPLAYED_HEADER, b"true"))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": bytes(entry.body)})
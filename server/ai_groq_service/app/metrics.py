@@ -0,0 +1,188 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets span fast regex/prompt work (ms) up to slow OCR + LLM requests (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "ai_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "ai_requests_in_flight",
+    "Requests currently being processed",
+    ["route"],
+    # Summed over live workers when PROMETHEUS_MULTIPROC_DIR is set
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "ai_stage_duration_seconds",
+    "Latency of individual pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+PDF_DOCUMENTS = Counter(
+    "ai_pdf_documents_total",
+    "PDFs processed, by how their text was obtained (text_layer or ocr_fallback)",
+    ["source"],
+)
+OCR_PAGES = Counter(
+    "ai_ocr_pages_total",
+    "Pages OCR'd, by resolution pass (single, low_res, high_res_rerender)",
+    ["pass_type"],
+)
+GROQ_REQUESTS = Counter(
+    "ai_groq_requests_total",
+    "Groq chat completion calls by model and outcome",
+    ["model", "outcome"],
+)
+GROQ_ERRORS = Counter(
+    "ai_groq_errors_total",
+    "Groq errors by type (timeout, rate_limit, connection, api_status, other)",
+    ["model", "error_type"],
+)
+GROQ_TOKENS = Counter(
+    "ai_groq_tokens_total",
+    "Tokens reported by response.usage",
+    ["model", "kind"],
+)
+
+LLM_JSON_PARSES = Counter(
+    "ai_llm_json_parse_total",
+    "LLM JSON outputs by parse outcome (clean, extracted, repaired, failed)",
+    ["outcome"],
+)
+GROQ_HEDGES = Counter(
+    "ai_groq_hedges_total",
+    "Hedged Groq calls by outcome (primary_won, hedge_won, budget_exhausted, all_failed)",
+    ["outcome"],
+)
+LLM_ESCALATIONS = Counter(
+    "ai_llm_escalations_total",
+    "Fast-tier LLM outputs that failed parsing/validation and were retried on the large tier",
+    ["task"],
+)
+EXTRACTION_PROMPT_TOKENS = Histogram(
+    "ai_skill_extraction_prompt_tokens_per_certificate",
+    "Estimated prompt tokens (characters / 4) spent per certificate, single vs batched extraction",
+    ["mode"],
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000),
+)
+BATCH_EXTRACTION_ITEMS = Counter(
+    "ai_skill_extraction_batch_items_total",
+    "Certificates in batched extraction by outcome (batched, retried individually)",
+    ["outcome"],
+)
+STACKABILITY_TEMPLATES = Counter(
+    "ai_stackability_templates_total",
+    "Stackability pathway template lookups by outcome (hit = served from cache, miss = generated by the LLM)",
+    ["outcome"],
+)
+PRECOMPUTED_LOOKUPS = Counter(
+    "ai_precomputed_lookups_total",
+    "Lookups in the offline precompute store by kind and outcome (hit, miss)",
+    ["kind", "outcome"],
+)
+IDEMPOTENT_REQUESTS = Counter(
+    "ai_idempotent_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome (executed, attached to in-flight, replayed from store, rejected for a different body)",
+    ["outcome"],
+)
+ABANDONED_REQUESTS = Counter(
+    "ai_abandoned_requests_total",
+    "Requests whose remaining work was cancelled because the client disconnected",
+    ["route"],
+)
+CANCELLED_WORK = Counter(
+    "ai_cancelled_work_total",
+    "Units of work skipped after a client disconnect, by stage (pdf_page, ocr_page, llm_call)",
+    ["stage"],
+)
+DEADLINE_DEGRADATIONS = Counter(
+    "ai_deadline_degradations_total",
+    "Work cut short to meet a request deadline, by reason (ocr_pages_truncated, ocr_low_resolution, llm_skipped, llm_timeout)",
+    ["reason"],
+)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry to expose on /metrics. Under the multi-worker launcher each worker
+    writes its samples to PROMETHEUS_MULTIPROC_DIR and any worker can serve the
+    aggregate; otherwise the default in-process registry is used.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+# Per-request stage totals for the Server-Timing header: {stage: (seconds, count)}
+_request_timings: ContextVar[Optional[Dict[str, Tuple[float, int]]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, Tuple[float, int]]:
+    """Begin collecting stage timings for the current request context"""
+    timings: Dict[str, Tuple[float, int]] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Observe the duration of a pipeline stage, e.g. `with track_stage("tesseract"): ...`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            total, count = timings.get(stage, (0.0, 0))
+            timings[stage] = (total + elapsed, count + 1)
+
+
+def format_server_timing(timings: Dict[str, Tuple[float, int]], total_seconds: float) -> str:
+    """Render stage totals as a Server-Timing header value (durations in ms)"""
+    entries = []
+    for stage, (seconds, count) in timings.items():
+        desc = f';desc="x{count}"' if count > 1 else ""
+        entries.append(f"{stage}{desc};dur={seconds * 1000:.1f}")
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def classify_groq_error(error: Exception) -> str:
+    """Map Groq SDK exceptions to a small label set without importing the SDK"""
+    name = type(error).__name__
+    if name == "APITimeoutError" or isinstance(error, TimeoutError):
+        return "timeout"
+    if name == "RateLimitError":
+        return "rate_limit"
+    if name == "APIConnectionError":
+        return "connection"
+    if hasattr(error, "status_code"):
+        return "api_status"
+    return "other"
+
+
+def record_groq_usage(model: str, usage) -> None:
+    """Add token counts from a chat completion's usage block, if present"""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            GROQ_TOKENS.labels(model=model, kind=kind.replace("_tokens", "")).inc(value)
@@ -40,7 +40,20 @@ class NSQFAlignment(BaseModel):
     reasoning: Optional[str] = Field(None, description="Reasoning for alignment or non-alignment")
 
 
-class OCRResponse(BaseModel):
+class PartialResult(BaseModel):
+    """Deadline flags carried by every response of a route that honours X-Request-Deadline-Ms"""
+    partial: bool = Field(
+        False,
+        description="True when work was cut short to meet the request deadline (X-Request-Deadline-Ms)"
+    )
+    
+    partial_reasons: List[str] = Field(
+        default_factory=list,
+        description="What was cut: ocr_pages_truncated, ocr_low_resolution, llm_skipped, llm_timeout"
+    )
+
+
+class OCRResponse(PartialResult):
     """Complete OCR processing response"""
     extracted_text: str = Field(description="Full text extracted from certificate")
     
@@ -71,6 +84,19 @@ class OCRResponse(BaseModel):
     )
 
 
+class CertificateIdResult(BaseModel):
+    """Certificate number found by the regex scorer or, when that is weak, by the AI extraction"""
+    certificate_number: Optional[str] = None
+    confidence: float = Field(description="Score of the chosen candidate (0-100)")
+    status: str = Field(description="found, needs_review or not_found")
+    candidate: Optional[Dict[str, Any]] = Field(None, description="Winning candidate with its evidence")
+
+
+class IngestResponse(OCRResponse):
+    """Single-pass ingest: OCR response plus the certificate ID, from one OCR run and one LLM call"""
+    certificate_id: CertificateIdResult = Field(description="Certificate number extraction result")
+
+
 class RecommendedSkill(BaseModel):
     skill: str
     description: str
@@ -102,7 +128,7 @@ class RecommendationRequest(BaseModel):
     certificates: List[dict]
 
 
-class RecommendationResponse(BaseModel):
+class RecommendationResponse(PartialResult):
     skills: List[str]
     recommended_next_skills: List[RecommendedSkill]
     role_suggestions: List[RoleSuggestion]
@@ -122,7 +148,7 @@ class EmployerChatRequest(BaseModel):
     )
 
 
-class EmployerChatResponse(BaseModel):
+class EmployerChatResponse(PartialResult):
     """Response from employer chatbot"""
     answer: str = Field(description="Natural language answer to the question")
     relevant_skills: List[SkillExtraction] = Field(
@@ -160,6 +186,6 @@ class StackablePathwayReport(BaseModel):
     skills: List[PathwaySkill] = Field(description="Breakdown of skills in this pathway")
 
 
-class StackabilityResponse(BaseModel):
+class StackabilityResponse(PartialResult):
     """Response containing list of potential pathways"""
     pathways: List[StackablePathwayReport]
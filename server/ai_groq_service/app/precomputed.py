@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from app.metrics import PRECOMPUTED_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Results the offline job (cli/precompute.py) writes and the API serves
+KINDS = ("recommendations", "roadmap", "skill_profile")
+
+# Keys a result needs before it is stored or served. The services return {} on
+# failure, but the roadmap can come back holding only `stackable_pathways`.
+REQUIRED_KEYS = {
+    "recommendations": ("recommended_next_skills", "role_suggestions", "learning_path", "recommended_courses"),
+    "roadmap": ("current_status", "future_plans", "job_opportunities"),
+    "skill_profile": ("current_skills", "ready_to_apply_jobs"),
+}
+
+
+def missing_keys(kind: str, result: Any) -> list:
+    """Required keys absent from a result (everything, if it isn't a dict)"""
+    if not isinstance(result, dict):
+        return list(REQUIRED_KEYS[kind])
+    return [key for key in REQUIRED_KEYS[kind] if key not in result]
+
+
+def input_hash(kind: str, certificates: list, learner_profile: Optional[dict] = None) -> str:
+    """
+    Content hash of what a result was generated from. A stored result is only
+    served for a request with exactly the same inputs, so a learner who gains a
+    certificate after the job ran is generated live again.
+    """
+    inputs = {"certificates": certificates or []}
+    if kind == "roadmap":
+        inputs["learner_profile"] = learner_profile or {}
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{kind}:{canonical}".encode()).hexdigest()
+
+
+class PrecomputedStore:
+    """
+    SQLite table of precomputed results keyed by (kind, input hash). WAL mode
+    lets the batch job write while API workers read.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float = 7 * 86400):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS precomputed (
+                    kind TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    learner_email TEXT,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, input_hash)
+                )
+                """
+            )
+            self._conn.commit()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM precomputed WHERE kind = ? AND input_hash = ?", (kind, key)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.max_age_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, kind: str, key: str, payload: Any, learner_email: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO precomputed (kind, input_hash, learner_email, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, learner_email, json.dumps(payload, default=str), time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[PrecomputedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[PrecomputedStore]:
+    """The store at PRECOMPUTE_DB, or None when precomputed serving is off"""
+    global _store
+    path = os.getenv("PRECOMPUTE_DB")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = PrecomputedStore(path, float(os.getenv("PRECOMPUTE_MAX_AGE_SECONDS", 7 * 86400)))
+            logger.info(f"Serving precomputed results from {path}")
+        return _store
+
+
+def lookup(kind: str, certificates: list, learner_profile: Optional[dict] = None) -> Optional[Any]:
+    """Precomputed result for these inputs, if the store is enabled and has a fresh one"""
+    store = get_store()
+    if store is None:
+        return None
+    try:
+        result = store.get(kind, input_hash(kind, certificates, learner_profile))
+    except sqlite3.Error as e:
+        logger.warning(f"Precomputed store lookup failed: {e}")
+        result = None
+    if result is not None and missing_keys(kind, result):
+        # Written before results were validated; generate live instead of serving a hollow one
+        result = None
+    PRECOMPUTED_LOOKUPS.labels(kind=kind, outcome="miss" if result is None else "hit").inc()
+    return result
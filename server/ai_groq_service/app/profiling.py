@@ -0,0 +1,200 @@
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+def admin_authorized(headers) -> bool:
+    """True when ADMIN_TOKEN is configured and the request carries the matching X-Admin-Token"""
+    expected = os.getenv("ADMIN_TOKEN")
+    provided = headers.get(ADMIN_TOKEN_HEADER)
+    return bool(expected and provided and hmac.compare_digest(expected, provided))
+
+
+def profiling_requested(headers) -> bool:
+    return headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes") and admin_authorized(headers)
+
+
+class ProfileStore:
+    """
+    Bounded store of recent request profiles, oldest evicted first. In memory
+    by default; with `directory` set (PROFILE_DIR, shared by every worker of the
+    launcher) each profile is a file there, so any worker can serve it.
+    """
+
+    def __init__(self, max_entries: int = 20, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def add(self, profilers: List[cProfile.Profile], meta: dict) -> str:
+        """Store the merged stats of a request's profilers (event loop plus worker threads)"""
+        profile_id = uuid.uuid4().hex[:12]
+
+        text = io.StringIO()
+        stats = pstats.Stats(*profilers, stream=text)
+        stats.sort_stats("cumulative").print_stats(80)
+
+        entry = {
+            "id": profile_id,
+            "created_at": time.time(),
+            "pid": os.getpid(),
+            "pstats": marshal.dumps(stats.stats),
+            "text": text.getvalue(),
+            **meta,
+        }
+        if self.directory:
+            self._write(entry)
+            return profile_id
+        with self._lock:
+            self._profiles[profile_id] = entry
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if self.directory:
+            # IDs are hex; anything else can't name a stored profile (or escape the directory)
+            if not profile_id.isalnum():
+                return None
+            return self._read(os.path.join(self.directory, f"{profile_id}.prof"))
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        if self.directory:
+            entries = [self._read(path) for path in reversed(self._files())]
+        else:
+            with self._lock:
+                entries = list(reversed(self._profiles.values()))
+        return [
+            {k: v for k, v in entry.items() if k not in ("pstats", "text")}
+            for entry in entries if entry is not None
+        ]
+
+    def _files(self) -> List[str]:
+        """Stored profile files, oldest first"""
+        paths = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".prof"):
+                path = os.path.join(self.directory, name)
+                try:
+                    paths.append((os.stat(path).st_mtime_ns, path))
+                except OSError:
+                    pass  # evicted by another worker
+        return [path for _, path in sorted(paths)]
+
+    def _write(self, entry: dict):
+        path = os.path.join(self.directory, f"{entry['id']}.prof")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            marshal.dump(entry, fh)
+        os.replace(tmp, path)
+        files = self._files()
+        for stale in files[:max(0, len(files) - self.max_entries)]:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path, "rb") as fh:
+                return marshal.load(fh)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+
+profile_store = ProfileStore(
+    max_entries=int(os.getenv("PROFILE_STORE_SIZE", 20)),
+    directory=os.getenv("PROFILE_DIR") or None,
+)
+
+# cProfile can only have one active profiler per thread, and the event loop runs
+# every request on one thread, so at most one request is profiled at a time.
+_profile_lock = threading.Lock()
+
+# Profilers of the request being profiled, one per threadpool call it made;
+# copied into run_in_threadpool threads with the context
+_thread_profilers: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("thread_profilers", default=None)
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """
+    starlette's run_in_threadpool, but when the request is being profiled the
+    call runs under its own cProfile in the worker thread, so OCR and LLM work
+    moved off the event loop still shows up in the request's profile.
+    """
+    profilers = _thread_profilers.get()
+    if profilers is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def profiled():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per interpreter; the
+            # request's profiler already sees this thread there
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profilers.append(profiler)
+
+    return await _run_in_threadpool(profiled)
+
+
+async def call_with_profile(request, call_next):
+    """
+    Run the rest of the request under cProfile and store the result, merged
+    with the profiles of its run_in_threadpool calls.
+    Returns (response, profile_id); profile_id is None if another request is
+    already being profiled. Other requests interleaved on the same event loop
+    may show up in the profile.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return await call_next(request), None
+
+    profiler = cProfile.Profile()
+    thread_profilers: List[cProfile.Profile] = []
+    reset = _thread_profilers.set(thread_profilers)
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+    finally:
+        _thread_profilers.reset(reset)
+        _profile_lock.release()
+
+    profile_id = profile_store.add([profiler] + thread_profilers, {
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    })
+    logger.info(f"Stored profile {profile_id} for {request.method} {request.url.path}")
+    return response, profile_id
@@ -0,0 +1,150 @@
+import logging
+import zlib
+from typing import Any, AsyncIterator, Optional, Type
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "image/svg+xml")
+
+
+def _split_param(value: Optional[str]) -> set:
+    return {part.strip() for part in (value or "").split(",") if part.strip()}
+
+
+def select_fields(payload: Any, request: Request) -> Any:
+    """
+    Apply top-level field selection from the query string:
+    `?fields=skills,nsqf` keeps only those keys, `?exclude=extracted_text` drops keys.
+    """
+    if not isinstance(payload, dict):
+        return payload
+    fields = _split_param(request.query_params.get("fields"))
+    exclude = _split_param(request.query_params.get("exclude"))
+    if fields:
+        payload = {k: v for k, v in payload.items() if k in fields}
+    if exclude:
+        payload = {k: v for k, v in payload.items() if k not in exclude}
+    return payload
+
+
+def respond(request: Request, payload: Any, model: Optional[Type[BaseModel]] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Serialize a route result with orjson, bypassing FastAPI's response_model pass.
+
+    - A pydantic model instance is treated as already validated and dumped as-is.
+    - A dict with `model` given is validated (and filtered to the model's fields) once.
+    - Anything else is serialized unchanged.
+    Field selection from the query string is applied last.
+    """
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump(mode="json")
+    elif model is not None:
+        payload = model.model_validate(payload).model_dump(mode="json")
+    return ORJSONResponse(select_fields(payload, request), status_code=status_code)
+
+
+def ndjson_stream(request: Request, items: AsyncIterator[Any]) -> StreamingResponse:
+    """
+    Stream dicts as newline-delimited JSON, one line per item as it is produced.
+    Field selection from the query string is applied to each line.
+    """
+    async def lines():
+        try:
+            async for item in items:
+                yield orjson.dumps(select_fields(item, request)) + b"\n"
+        finally:
+            # Runs the producer's cleanup now if the client went away mid-stream
+            if hasattr(items, "aclose"):
+                await items.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing buffered (non-streaming) responses with Brotli
+    or gzip, according to the client's Accept-Encoding. Brotli is preferred
+    when the `brotli` package is installed. Streaming responses, small bodies,
+    already-encoded bodies and non-text content types pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope) -> Optional[str]:
+        accepted = set()
+        for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+            name, _, params = item.strip().partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0"):
+                continue
+            accepted.add(name.strip().lower())
+        if "br" in accepted and brotli is not None:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        return compressor.compress(body) + compressor.flush()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            compressible = (
+                not message.get("more_body", False)
+                and "content-encoding" not in headers
+                and len(body) >= self.minimum_size
+                and content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if not compressible:
+                # Streaming or unsuitable: forward everything unchanged from here on
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
+from app.profiling import admin_authorized, profile_store
+from app.sampling_profiler import sampling_profiler
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def _require_admin(request: Request):
+    if not admin_authorized(request.headers):
+        # 404 rather than 403 so the admin surface isn't discoverable
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profiles")
+async def list_profiles(request: Request):
+    """List stored request profiles, newest first"""
+    _require_admin(request)
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, format: str = "text"):
+    """
+    Retrieve a stored profile.
+    format=text returns the cumulative-time pstats report;
+    format=pstats returns the raw stats file (open with `python -m pstats` or snakeviz).
+    """
+    _require_admin(request)
+    entry = profile_store.get(profile_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "pstats":
+        return Response(
+            entry["pstats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename=profile_{profile_id}.pstats"}
+        )
+    return PlainTextResponse(entry["text"])
+
+
+@router.get("/stackability-templates")
+async def list_stackability_templates(request: Request):
+    """Cached stackability pathway templates in this worker, least recently used first"""
+    _require_admin(request)
+    from app.services.stackability_service import stackability_service
+    return {"templates": stackability_service.templates.list()}
+
+
+@router.delete("/stackability-templates")
+async def clear_stackability_templates(request: Request):
+    """Drop cached templates, e.g. after a prompt change; they are regenerated on next use"""
+    _require_admin(request)
+    from app.services.stackability_service import stackability_service
+    return {"cleared": stackability_service.templates.clear()}
+
+
+@router.get("/sampling-profiler")
+async def sampling_profiler_status(request: Request):
+    """Sampler state, sample counts and measured overhead"""
+    _require_admin(request)
+    return sampling_profiler.status()
+
+
+@router.get("/sampling-profiler/folded")
+async def sampling_profiler_folded(request: Request):
+    """Aggregated stacks in collapsed-stack format (flamegraph.pl, speedscope, inferno)"""
+    _require_admin(request)
+    return PlainTextResponse(sampling_profiler.folded())
+
+
+@router.get("/sampling-profiler/flamegraph.svg")
+async def sampling_profiler_flamegraph(request: Request, width: int = 1200):
+    """Aggregated stacks rendered as an SVG flamegraph"""
+    _require_admin(request)
+    return Response(sampling_profiler.flamegraph_svg(width=width), media_type="image/svg+xml")
+
+
+@router.post("/sampling-profiler/{action}")
+async def sampling_profiler_control(action: str, request: Request):
+    """start, stop or reset the sampler"""
+    _require_admin(request)
+    if action == "start":
+        sampling_profiler.start()
+    elif action == "stop":
+        sampling_profiler.stop()
+    elif action == "reset":
+        sampling_profiler.reset()
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+    return sampling_profiler.status()
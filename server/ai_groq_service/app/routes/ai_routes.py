@@ -1,27 +1,81 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
 from app.models.schemas import (
     RecommendationRequest, 
     RecommendationResponse, 
     OCRResponse,
+    IngestResponse,
     EmployerChatRequest,
     EmployerChatResponse,
     StackabilityRequest,
     StackabilityResponse
 )
-from app.services.recommendation_service import recommendation_service
-from app.services.ocr_service import ocr_service
-from app.services.skill_extraction_service import skill_extraction_service
-from app.services.employer_chatbot_service import employer_chatbot_service
-from app.services.groq_service import groq_service
-from app.services.stackability_service import stackability_service
 import logging
+from app.profiling import run_in_threadpool
+from app.deadline import DeadlineExceeded, partial_fields
+from app.precomputed import lookup as lookup_precomputed
+from app.responses import ndjson_stream, respond
+from app.uploads import spool_upload
+
+# Service modules are imported inside the handlers that use them: they pull in
+# heavy dependencies (PIL, pytesseract, pdf2image, PyPDF2, reportlab, qrcode, groq)
+# and build their singletons on import, so a pod only pays for what it serves.
+# See app/warmup.py for optional background preloading.
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Regex ID results scoring below this are replaced by the number the AI extraction found
+ID_AI_FALLBACK_THRESHOLD = 70.0
+
+
+def _require_text(extracted_text: str, filename: str):
+    """Reject documents OCR couldn't read with a 422 explaining why"""
+    if not extracted_text:
+        logger.error(f"OCR FAILED: No text extracted from {filename}")
+        raise HTTPException(
+            status_code=422, 
+            detail="No text could be extracted from the document. Please ensure it contains readable text and is not a blank page."
+        )
+    
+    text_length = len(extracted_text.strip())
+    if text_length < 10:
+        logger.error(f"OCR FAILED: Only {text_length} characters extracted from {filename}")
+        raise HTTPException(
+            status_code=422, 
+            detail=f"Only {text_length} characters extracted. The document may be blank, contain only images, or have unreadable text."
+        )
+
+
+def _respond_precomputed(http_request: Request, payload, model=None):
+    """Serve a result written by the offline precompute job (cli/precompute.py)"""
+    response = respond(http_request, {**payload, **partial_fields()}, model=model)
+    response.headers["X-Precomputed"] = "true"
+    return response
+
+
+def _parse_nsqf_context(nsqf_context: str) -> list:
+    """Parse the optional JSON-encoded NSQF context form field"""
+    parsed_context = []
+    if nsqf_context:
+        try:
+            import json
+            parsed_context = json.loads(nsqf_context)
+            logger.info(f"Received NSQF context with {len(parsed_context)} items")
+        except Exception as e:
+            logger.warning(f"Failed to parse NSQF context: {e}")
+    return parsed_context
+
+
+def _with_regex_certificate_number(certificate_metadata: dict, id_result: dict) -> dict:
+    """Fill a missing certificate_number in the metadata from the regex result (an LLM cut short by the deadline)"""
+    if certificate_metadata.get("certificate_number") or not id_result.get("certificate_number"):
+        return certificate_metadata
+    return {**certificate_metadata, "certificate_number": id_result["certificate_number"]}
+
 
 @router.post("/process-ocr", response_model=OCRResponse)
 async def process_ocr(
+    http_request: Request,
     file: UploadFile = File(...),
     learner_email: str = Form(...),
     certificate_title: str = Form(...),
@@ -36,45 +90,33 @@ async def process_ocr(
     2. Send text to Groq AI for skill extraction
     3. AI returns: skills, NSQF level, keywords, metadata
     4. Return structured data for storage in PostgreSQL
+
+    Supports `?exclude=extracted_text` (or `?fields=...`) to trim the response.
+    With `X-Request-Deadline-Ms`, OCR and the LLM call are cut to the budget and
+    the response is flagged `partial` instead of running over it.
     """
+    from app.services.ocr_service import ocr_service
+    from app.services.skill_extraction_service import skill_extraction_service
+
     try:
-        # Read file
-        file_bytes = await file.read()
-        logger.info(f"Received file: {file.filename}, content_type: {file.content_type}, size: {len(file_bytes)} bytes")
-        
-        # Step 1: Extract text using OCR
-        extracted_text = ocr_service.extract_text(file_bytes, file.filename)
+        # Spool the upload to disk (size-capped, hashed) and OCR it by path
+        async with spool_upload(file) as upload:
+            logger.info(f"Received file: {file.filename}, content_type: {file.content_type}, size: {upload.size} bytes")
+            
+            # Step 1: Extract text using OCR
+            extracted_text = await run_in_threadpool(ocr_service.extract_text, upload.path, upload.filename)
         
         # Enhanced validation with better error messages
-        if not extracted_text:
-            logger.error(f"OCR FAILED: No text extracted from {file.filename}")
-            raise HTTPException(
-                status_code=422, 
-                detail="No text could be extracted from the document. Please ensure it contains readable text and is not a blank page."
-            )
-        
-        text_length = len(extracted_text.strip())
-        if text_length < 10:
-            logger.error(f"OCR FAILED: Only {text_length} characters extracted from {file.filename}")
-            raise HTTPException(
-                status_code=422, 
-                detail=f"Only {text_length} characters extracted. The document may be blank, contain only images, or have unreadable text."
-            )
+        _require_text(extracted_text, file.filename)
         
         logger.info(f"✓ Successfully extracted {len(extracted_text)} characters from {file.filename}")
         
         # Parse NSQF context if provided
-        parsed_context = []
-        if nsqf_context:
-            try:
-                import json
-                parsed_context = json.loads(nsqf_context)
-                logger.info(f"Received NSQF context with {len(parsed_context)} items")
-            except Exception as e:
-                logger.warning(f"Failed to parse NSQF context: {e}")
+        parsed_context = _parse_nsqf_context(nsqf_context)
         
         # Step 2: Extract skills, NSQF, keywords using AI
-        ai_extraction = skill_extraction_service.extract_skills_and_metadata(
+        ai_extraction = await run_in_threadpool(
+            skill_extraction_service.extract_skills_and_metadata,
             extracted_text=extracted_text,
             certificate_title=certificate_title,
             issuer_name=issuer_name,
@@ -83,16 +125,24 @@ async def process_ocr(
         
         logger.info(f"Extracted {len(ai_extraction.get('skills', []))} skills and {len(ai_extraction.get('keywords', []))} keywords")
         
+        certificate_metadata = ai_extraction.get('certificate_metadata', {}) or {}
+        partial = partial_fields()
+        if partial["partial"] and not certificate_metadata.get("certificate_number"):
+            # The LLM was cut short: the certificate number comes from the regex scorer instead
+            id_result = await ocr_service.extract_certificate_number_from_text(extracted_text)
+            certificate_metadata = _with_regex_certificate_number(certificate_metadata, id_result)
+        
         # Return complete OCR response
-        return {
+        return respond(http_request, {
             "extracted_text": extracted_text,
             "skills": ai_extraction.get('skills', []),
             "nsqf": ai_extraction.get('nsqf', {"level": 1, "confidence": 0.0, "reasoning": ""}),
             "nsqf_alignment": ai_extraction.get('nsqf_alignment', None),
             "keywords": ai_extraction.get('keywords', []),
-            "certificate_metadata": ai_extraction.get('certificate_metadata', {}),
-            "description": ai_extraction.get('description', '')
-        }
+            "certificate_metadata": certificate_metadata,
+            "description": ai_extraction.get('description', ''),
+            **partial
+        }, model=OCRResponse)
         
     except HTTPException:
         raise
@@ -101,22 +151,99 @@ async def process_ocr(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ingest-certificate", response_model=IngestResponse)
+async def ingest_certificate(
+    http_request: Request,
+    file: UploadFile = File(...),
+    certificate_title: str = Form(...),
+    issuer_name: str = Form(...),
+    learner_email: str = Form(None),
+    nsqf_context: str = Form(None)  # JSON string
+):
+    """
+    Single-pass ingest for credential issuance: replaces calling
+    /extract-certificate-id and /process-ocr on the same file.
+    
+    Flow:
+    1. OCR the file once
+    2. Score certificate-number candidates with regex on that text
+    3. Run the skill/NSQF extraction (the only LLM call)
+    4. If the regex result is weak, take the certificate number from the extraction's metadata
+    
+    Under an `X-Request-Deadline-Ms` too short for step 3, the response is the OCR
+    text and regex result with empty skills, flagged `partial`.
+    """
+    from app.services.ocr_service import ocr_service
+    from app.services.skill_extraction_service import skill_extraction_service
+
+    try:
+        async with spool_upload(file) as upload:
+            extracted_text = await run_in_threadpool(ocr_service.extract_text, upload.path, upload.filename)
+        _require_text(extracted_text, file.filename)
+        
+        id_result = await ocr_service.extract_certificate_number_from_text(extracted_text)
+        
+        ai_extraction = await run_in_threadpool(
+            skill_extraction_service.extract_skills_and_metadata,
+            extracted_text=extracted_text,
+            certificate_title=certificate_title,
+            issuer_name=issuer_name,
+            nsqf_context=_parse_nsqf_context(nsqf_context)
+        )
+        certificate_metadata = ai_extraction.get('certificate_metadata', {}) or {}
+        
+        if id_result["status"] == "not_found" or id_result["confidence"] < ID_AI_FALLBACK_THRESHOLD:
+            id_result = ocr_service.certificate_number_from_metadata(certificate_metadata) or id_result
+        partial = partial_fields()
+        if partial["partial"]:
+            certificate_metadata = _with_regex_certificate_number(certificate_metadata, id_result)
+        
+        logger.info(
+            f"Ingested {file.filename}: {len(extracted_text)} chars, {len(ai_extraction.get('skills', []))} skills, "
+            f"certificate number status={id_result['status']}"
+        )
+        
+        return respond(http_request, {
+            "extracted_text": extracted_text,
+            "skills": ai_extraction.get('skills', []),
+            "nsqf": ai_extraction.get('nsqf', {"level": 1, "confidence": 0.0, "reasoning": ""}),
+            "nsqf_alignment": ai_extraction.get('nsqf_alignment', None),
+            "keywords": ai_extraction.get('keywords', []),
+            "certificate_metadata": certificate_metadata,
+            "description": ai_extraction.get('description', ''),
+            "certificate_id": id_result,
+            **partial
+        }, model=IngestResponse)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Certificate ingest error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/recommendations", response_model=RecommendationResponse)
-async def get_recommendations(request: RecommendationRequest):
+async def get_recommendations(request: RecommendationRequest, http_request: Request):
     """
     Generate AI-powered recommendations
     Backend sends certificate data from PostgreSQL
     """
+    from app.services.recommendation_service import recommendation_service
+
     try:
-        recommendations = recommendation_service.generate_recommendations(request.certificates)
-        return recommendations
+        precomputed = lookup_precomputed("recommendations", request.certificates)
+        if precomputed is not None:
+            return _respond_precomputed(http_request, precomputed, model=RecommendationResponse)
+        
+        recommendations = await run_in_threadpool(recommendation_service.generate_recommendations, request.certificates)
+        return respond(http_request, {**recommendations, **partial_fields()}, model=RecommendationResponse)
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/employer-chat", response_model=EmployerChatResponse)
-async def employer_chat(request: dict):
+async def employer_chat(request: dict, http_request: Request):
     """
     Employer chatbot endpoint for querying learner skills
     
@@ -131,6 +258,8 @@ async def employer_chat(request: dict):
     3. Reference specific certificates and skills
     4. Provide confidence score
     """
+    from app.services.employer_chatbot_service import employer_chatbot_service
+
     try:
         learner_email = request.get("learner_email", "")
         question = request.get("question", "")
@@ -140,13 +269,14 @@ async def employer_chat(request: dict):
         logger.info(f"Received {len(credentials)} credentials for analysis")
         
         # Use the employer chatbot service to generate response
-        response = employer_chatbot_service.answer_employer_question(
+        response = await run_in_threadpool(
+            employer_chatbot_service.answer_employer_question,
             learner_email=learner_email,
             question=question,
             learner_credentials=credentials
         )
         
-        return response
+        return respond(http_request, {**response, **partial_fields()}, model=EmployerChatResponse)
         
     except Exception as e:
         logger.error(f"Employer chat error: {e}")
@@ -154,42 +284,56 @@ async def employer_chat(request: dict):
 
 
 @router.post("/generate-roadmap")
-async def generate_roadmap(request: dict):
+async def generate_roadmap(request: dict, http_request: Request):
     """
     Generate a career roadmap
     """
+    from app.services.recommendation_service import recommendation_service
+
     try:
         certificates = request.get("certificates", [])
         learner_profile = request.get("learner_profile", {})
-        roadmap = recommendation_service.generate_roadmap(certificates, learner_profile)
-        return roadmap
+        precomputed = lookup_precomputed("roadmap", certificates, learner_profile)
+        if precomputed is not None:
+            return _respond_precomputed(http_request, precomputed)
+        
+        roadmap = await run_in_threadpool(recommendation_service.generate_roadmap, certificates, learner_profile)
+        return respond(http_request, {**roadmap, **partial_fields()})
     except Exception as e:
         logger.error(f"Roadmap generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate-skill-profile")
-async def generate_skill_profile(request: dict):
+async def generate_skill_profile(request: dict, http_request: Request):
     """
     Generate a skill profile
     """
+    from app.services.recommendation_service import recommendation_service
+
     try:
         certificates = request.get("certificates", [])
-        profile = recommendation_service.generate_skill_profile(certificates)
-        return profile
+        precomputed = lookup_precomputed("skill_profile", certificates)
+        if precomputed is not None:
+            return _respond_precomputed(http_request, precomputed)
+        
+        profile = await run_in_threadpool(recommendation_service.generate_skill_profile, certificates)
+        return respond(http_request, {**profile, **partial_fields()})
     except Exception as e:
         logger.error(f"Skill profile generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/enrich-credential")
-async def enrich_credential(request: dict):
+async def enrich_credential(request: dict, http_request: Request):
     """
     Enrich credential metadata
     """
+    from app.services.recommendation_service import recommendation_service
+
     try:
         certificate_title = request.get("certificate_title", "")
         nos_data = request.get("nos_data", {})
-        metadata = recommendation_service.enrich_credential_metadata(certificate_title, nos_data)
-        return metadata
+        metadata = await run_in_threadpool(recommendation_service.enrich_credential_metadata, certificate_title, nos_data)
+        return respond(http_request, {**metadata, **partial_fields()})
     except Exception as e:
         logger.error(f"Credential enrichment error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -197,16 +341,18 @@ async def enrich_credential(request: dict):
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
+    from app.services.groq_service import groq_service
+    from app.warmup import warmup_status
+
     return {
         "status": "ok",
         "model": groq_service.model_name,
         "mock": groq_service.mock_mode,
-        "key_loaded": groq_service.client is not None
+        "key_loaded": groq_service.client is not None,
+        "warmup": warmup_status()
     }
 
 from fastapi.responses import StreamingResponse
-from app.services.pdf_service import pdf_service
-import io
 
 @router.post("/append-qr")
 async def append_qr(
@@ -217,36 +363,44 @@ async def append_qr(
     Appends a new page with a QR code and 'MicroMerit' branding to the uploaded PDF.
     Returns the modified PDF as a downloadable file.
     """
+    from app.services.pdf_service import pdf_service
+
     try:
-        # Read file content
-        file_bytes = await file.read()
-        
         # Check if file is PDF
         if file.content_type != "application/pdf" and not file.filename.lower().endswith('.pdf'):
              raise HTTPException(status_code=400, detail="File must be a PDF")
 
-        # Process PDF
-        modified_pdf_bytes = pdf_service.append_qr_page(file_bytes, qr_data)
+        # Process PDF straight from the spooled upload
+        async with spool_upload(file) as upload:
+            modified_pdf = pdf_service.append_qr_page_stream(upload.path, qr_data)
         
-        # Create streaming response
+        # Stream the output buffer in chunks rather than copying it to bytes
         return StreamingResponse(
-            io.BytesIO(modified_pdf_bytes),
+            iter(lambda: modified_pdf.read(64 * 1024), b""),
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename=modified_{file.filename}"}
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error appending QR code: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
 
 
 @router.post("/stackability", response_model=StackabilityResponse)
-async def analyze_stackability(request: StackabilityRequest):
+async def analyze_stackability(request: StackabilityRequest, http_request: Request):
     """
     Analyze stackability of a qualification and suggest next progression steps.
     """
+    from app.services.stackability_service import stackability_service
+
     try:
-        result = stackability_service.generate_stackable_path(request)
-        return result
+        try:
+            result = await run_in_threadpool(stackability_service.generate_stackable_path, request)
+        except DeadlineExceeded:
+            # No time left to build the pathway template: an empty, flagged result like the other routes
+            result = {"pathways": []}
+        return respond(http_request, {**result, **partial_fields()}, model=StackabilityResponse)
     except Exception as e:
         logger.error(f"Stackability error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -262,45 +416,38 @@ async def extract_certificate_id(
     Minimal endpoint: extract only the certificate number from a certificate image/PDF.
     Uses regex + scoring logic in OCR Service, with optional AI fallback.
     """
+    from app.services.ocr_service import ocr_service
+    from app.services.skill_extraction_service import skill_extraction_service
+
     try:
-        file_bytes = await file.read()
-        
-        # 1) Extract full OCR text (uses your OCR pipeline which handles pdfs/images)
-        extracted_text = ocr_service.extract_text(file_bytes, file.filename or "uploaded_file")
+        async with spool_upload(file) as upload:
+            # 1) Extract full OCR text (uses your OCR pipeline which handles pdfs/images)
+            extracted_text = await run_in_threadpool(ocr_service.extract_text, upload.path, upload.filename)
         
         # 2) Use refactored logic in OCR Service
         result = await ocr_service.extract_certificate_number_from_text(extracted_text)
         
         # 3) Optional AI Fallback if result is weak
         # If status is not found or review needed, check if we can improve it
-        if result["status"] == "not_found" or result["confidence"] < 70.0:
-            import re
-            
+        if result["status"] == "not_found" or result["confidence"] < ID_AI_FALLBACK_THRESHOLD:
             try:
-                ai_meta = skill_extraction_service.extract_skills_and_metadata(
+                ai_meta = (await run_in_threadpool(
+                    skill_extraction_service.extract_skills_and_metadata,
                     extracted_text=extracted_text,
                     certificate_title="",
                     issuer_name=issuer_name or "",
-                    nsqf_context=[]
-                ).get("certificate_metadata", {}) or {}
+                    nsqf_context=[],
+                    task="id_fallback"
+                )).get("certificate_metadata", {}) or {}
                 
-                for key in ("certificate_number", "certificate_no", "cert_no", "credential_id", "reference_no"):
-                     val = ai_meta.get(key)
-                     if val:
-                        val = str(val).strip()
-                        # Simple check if meaningful
-                        if len(val) > 4:
-                            # Override logic: If meaningful AI result found when regex failed
-                            return {
-                                "certificate_number": val,
-                                "confidence": 85.0, # AI usually good
-                                "status": "found",
-                                "candidate": {"value": val, "evidence": "ai_extracted", "score": 85.0}
-                            }
+                # Override logic: If meaningful AI result found when regex failed
+                ai_result = ocr_service.certificate_number_from_metadata(ai_meta)
+                if ai_result:
+                    return {**ai_result, **partial_fields()}
             except Exception as e:
                 logger.warning(f"AI Fallback failed: {e}")
                 
-        return result
+        return {**result, **partial_fields()}
 
     except HTTPException:
         raise
@@ -315,53 +462,151 @@ async def extract_bulk_ids(
 ):
     """
     Efficiently extract IDs from a ZIP file containing multiple certificates.
-    Fast: Unzips in memory and runs Regex-based extraction on each.
+    Fast: reads members one at a time from the spooled archive and runs Regex-based extraction on each.
     Returns: List of results.
     """
     import zipfile
-    import io
+    from app.services.ocr_service import ocr_service
     
     if not file.filename.lower().endswith('.zip'):
         raise HTTPException(status_code=400, detail="File must be a ZIP archive.")
         
     try:
-        file_bytes = await file.read()
         results = []
         
-        with zipfile.ZipFile(io.BytesIO(file_bytes)) as z:
-            # Filter for valid image/pdf files
-            valid_files = [n for n in z.namelist() if n.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg', '.webp')) and not n.startswith('__MACOSX')]
+        # Members are read one at a time from the spooled archive
+        async with spool_upload(file) as upload:
+            with zipfile.ZipFile(upload.path) as z:
+                # Filter for valid image/pdf files
+                valid_files = [n for n in z.namelist() if n.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg', '.webp')) and not n.startswith('__MACOSX')]
             
-            logger.info(f"Processing ZIP with {len(valid_files)} valid files")
+                logger.info(f"Processing ZIP with {len(valid_files)} valid files")
             
-            for filename in valid_files:
-                try:
-                    with z.open(filename) as f:
-                        content = f.read()
+                for filename in valid_files:
+                    try:
+                        with z.open(filename) as f:
+                            content = f.read()
                         
-                        # Run OCR extraction
-                        # Note: We skip the heavy AI fallback for bulk to keep it fast
-                        extracted_text = ocr_service.extract_text(content, filename)
-                        res = await ocr_service.extract_certificate_number_from_text(extracted_text)
+                            # Run OCR extraction
+                            # Note: We skip the heavy AI fallback for bulk to keep it fast
+                            extracted_text = ocr_service.extract_text(content, filename)
+                            res = await ocr_service.extract_certificate_number_from_text(extracted_text)
                         
-                        results.append({
-                            "filename": filename,
-                            "certificate_number": res["certificate_number"],
-                            "status": res["status"],
-                            "confidence": res["confidence"]
-                        })
-                except Exception as file_err:
-                     logger.error(f"Failed to process {filename} in zip: {file_err}")
-                     results.append({
-                         "filename": filename,
-                         "certificate_number": None,
-                         "status": "error",
-                         "confidence": 0.0,
-                         "error": str(file_err)
-                     })
+                            results.append({
+                                "filename": filename,
+                                "certificate_number": res["certificate_number"],
+                                "status": res["status"],
+                                "confidence": res["confidence"]
+                            })
+                    except Exception as file_err:
+                         logger.error(f"Failed to process {filename} in zip: {file_err}")
+                         results.append({
+                             "filename": filename,
+                             "certificate_number": None,
+                             "status": "error",
+                             "confidence": 0.0,
+                             "error": str(file_err)
+                         })
                      
         return {"success": True, "total": len(results), "results": results}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[extract-bulk-ids] error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _extract_member(archive, info, path: str):
+    """Copy one ZIP member to path without holding it in memory"""
+    import shutil
+    with archive.open(info) as src, open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+@router.post("/process-ocr-batch")
+async def process_ocr_batch(
+    http_request: Request,
+    file: UploadFile = File(...),
+    issuer_name: str = Form(...),
+    certificate_titles: str = Form(None),  # JSON object: ZIP member name -> certificate title
+    nsqf_context: str = Form(None)  # JSON string
+):
+    """
+    Full /process-ocr processing for every certificate in a ZIP archive.
+    
+    Files run through a two-stage pipeline (app/services/batch_pipeline.py):
+    OCR on a process pool, then skill extraction by concurrent LLM workers.
+    The response is NDJSON with one line per file, written as soon as that
+    file finishes (completion order, not archive order):
+        {"index": 0, "filename": "a.pdf", "status": "ok", "skills": [...], ...}
+        {"index": 3, "filename": "d.png", "status": "error", "error": "..."}
+    Certificates without an entry in certificate_titles use their file name as title.
+    """
+    import json
+    import os
+    import shutil
+    import tempfile
+    import zipfile
+    from app.services.batch_pipeline import batch_pipeline
+    from app.uploads import max_upload_bytes
+    
+    if not file.filename.lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="File must be a ZIP archive.")
+    
+    titles = {}
+    if certificate_titles:
+        try:
+            titles = json.loads(certificate_titles)
+        except ValueError:
+            titles = None
+        if not isinstance(titles, dict):
+            raise HTTPException(status_code=400, detail="certificate_titles must be a JSON object of file name -> title.")
+    
+    # Members are extracted here; the pipeline deletes each after OCR and the directory when done
+    workdir = tempfile.mkdtemp(prefix="batch_", dir=os.getenv("UPLOAD_SPOOL_DIR") or None)
+    try:
+        files = []
+        async with spool_upload(file) as upload:
+            with zipfile.ZipFile(upload.path) as z:
+                members = [
+                    info for info in z.infolist()
+                    if not info.is_dir()
+                    and info.filename.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg', '.webp'))
+                    and not info.filename.startswith('__MACOSX')
+                ]
+                if not members:
+                    raise HTTPException(status_code=400, detail="The ZIP archive contains no PDF or image files.")
+                if len(members) > batch_pipeline.max_files:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"The ZIP archive has {len(members)} files; at most {batch_pipeline.max_files} are accepted per request."
+                    )
+                
+                for index, info in enumerate(members):
+                    if info.file_size > max_upload_bytes():
+                        raise HTTPException(status_code=413, detail=f"{info.filename} exceeds the per-file upload limit.")
+                    # Index-based names: member paths never touch the filesystem
+                    path = os.path.join(workdir, f"{index:05d}{os.path.splitext(info.filename)[1].lower()}")
+                    await run_in_threadpool(_extract_member, z, info, path)
+                    files.append({
+                        "path": path,
+                        "filename": info.filename,
+                        "certificate_title": titles.get(info.filename) or os.path.splitext(os.path.basename(info.filename))[0]
+                    })
+    except HTTPException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    except zipfile.BadZipFile:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="File is not a valid ZIP archive.")
+    except Exception as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        logger.error(f"[process-ocr-batch] error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"Processing batch of {len(files)} certificates from {file.filename}")
+    return ndjson_stream(
+        http_request,
+        batch_pipeline.run(files, issuer_name, _parse_nsqf_context(nsqf_context), workdir=workdir)
+    )
@@ -0,0 +1,199 @@
+import html
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler. A daemon thread periodically snapshots
+    the stacks of all threads via sys._current_frames() and aggregates them
+    into folded-stack counts ("root;caller;callee N").
+
+    Overhead is bounded two ways: the sampler backs off its interval whenever
+    time spent sampling exceeds `max_overhead` of wall time, and at most
+    `max_stacks` distinct stacks are kept (further new stacks are counted under
+    a single "[truncated]" entry).
+    """
+
+    def __init__(self, interval_ms: float = 10.0, max_overhead: float = 0.01,
+                 max_depth: int = 64, max_stacks: int = 20000):
+        self.base_interval = interval_ms / 1000.0
+        self.interval = self.base_interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._samples = 0
+        self._sampling_seconds = 0.0
+        self._started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started (interval={self.base_interval * 1000:.1f}ms, "
+                    f"max_overhead={self.max_overhead:.1%})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+            self._sampling_seconds = 0.0
+            self._started_at = time.time()
+
+    def _frame_label(self, frame) -> str:
+        code = frame.f_code
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label.replace(";", ":")
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        folded = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack: List[str] = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(f"thread:{names.get(thread_id, thread_id)}")
+            folded.append(";".join(reversed(stack)))
+
+        with self._lock:
+            for key in folded:
+                if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    key = "[truncated]"
+                self._stacks[key] += 1
+            self._samples += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                logger.warning(f"Sampling profiler error: {e}")
+            cost = time.perf_counter() - started
+            self._sampling_seconds += cost
+
+            # Keep cost / (cost + sleep) at or below max_overhead
+            required = cost / self.max_overhead - cost if self.max_overhead > 0 else self.base_interval
+            self.interval = max(self.base_interval, required)
+            self._stop.wait(self.interval)
+
+    def folded(self) -> str:
+        """Collapsed-stack text, one "stack count" line per stack (flamegraph.pl / speedscope format)"""
+        with self._lock:
+            items = sorted(self._stacks.items())
+        return "\n".join(f"{stack} {count}" for stack, count in items) + ("\n" if items else "")
+
+    def status(self) -> Dict:
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "samples": self._samples,
+            "distinct_stacks": len(self._stacks),
+            "interval_ms": round(self.interval * 1000, 2),
+            "base_interval_ms": round(self.base_interval * 1000, 2),
+            "overhead": round(self._sampling_seconds / elapsed, 5) if elapsed else 0.0,
+            "max_overhead": self.max_overhead,
+            "since": self._started_at,
+        }
+
+    def flamegraph_svg(self, width: int = 1200, row_height: int = 16, min_width_px: float = 0.5) -> str:
+        """Render aggregated stacks as a self-contained SVG flamegraph (root at the bottom)"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+
+        # Build a frame tree: node = [count, children]
+        root = [0, {}]
+        for stack, count in stacks:
+            root[0] += count
+            node = root
+            for frame in stack.split(";"):
+                child = node[1].setdefault(frame, [0, {}])
+                child[0] += count
+                node = child
+
+        def depth_of(node) -> int:
+            return 1 + max((depth_of(c) for c in node[1].values()), default=0)
+
+        total = root[0] or 1
+        depth = depth_of(root)
+        height = depth * row_height + 40
+        scale = width / total
+        rects = []
+
+        def layout(node, name, x, level):
+            w = node[0] * scale
+            if w < min_width_px:
+                return
+            y = height - (level + 1) * row_height - 10
+            if name is not None:
+                hue = 20 + zlib.crc32(name.encode()) % 40
+                pct = node[0] / total * 100
+                title = html.escape(f"{name} ({node[0]} samples, {pct:.2f}%)")
+                label = html.escape(name[: max(0, int(w / 7))]) if w > 30 else ""
+                rects.append(
+                    f'<g><title>{title}</title>'
+                    f'<rect x="{x:.2f}" y="{y}" width="{w:.2f}" height="{row_height - 1}" '
+                    f'fill="hsl({hue},90%,60%)" rx="2"/>'
+                    f'<text x="{x + 3:.2f}" y="{y + row_height - 4}">{label}</text></g>'
+                )
+            child_x = x
+            for child_name, child in sorted(node[1].items()):
+                layout(child, child_name, child_x, level + (0 if name is None else 1))
+                child_x += child[0] * scale
+
+        layout(root, None, 0.0, 0)
+
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">'
+            f'<rect width="100%" height="100%" fill="#ffffff"/>'
+            f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">'
+            f'AI service flamegraph ({root[0]} samples)</text>'
+            + "".join(rects)
+            + "</svg>"
+        )
+
+
+sampling_profiler = SamplingProfiler(
+    interval_ms=float(os.getenv("SAMPLING_PROFILER_INTERVAL_MS", 10)),
+    max_overhead=float(os.getenv("SAMPLING_PROFILER_MAX_OVERHEAD", 0.01)),
+    max_depth=int(os.getenv("SAMPLING_PROFILER_MAX_DEPTH", 64)),
+    max_stacks=int(os.getenv("SAMPLING_PROFILER_MAX_STACKS", 20000)),
+)
+
+
+def start_sampling_profiler_if_enabled() -> bool:
+    if os.getenv("SAMPLING_PROFILER", "false").lower() != "true":
+        return False
+    sampling_profiler.start()
+    return True
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.profiling import run_in_threadpool
+from app.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling an extraction worker the OCR stage is finished
+_DONE = None
+
+
+def _ocr_file(path: str, filename: str) -> str:
+    """OCR one file; runs in a pool process, so the service is imported there"""
+    from app.services.ocr_service import ocr_service
+    return ocr_service.extract_text(path, filename)
+
+
+class BatchPipeline:
+    """
+    Two-stage pipeline for processing many certificates (/process-ocr semantics):
+
+        files -> OCR stage (process pool) -> bounded queue -> LLM extraction workers -> results
+
+    OCR is CPU-bound and extraction waits on the network, so running them as
+    overlapping stages keeps both busy: throughput approaches the slower
+    stage's capacity rather than the sum of both. The queue is bounded, so
+    when extraction falls behind, OCR workers hold their finished text and
+    stop taking new files instead of piling text up in memory.
+    """
+
+    def __init__(self):
+        # OCR processes per server worker (the CPUs shared out between WEB_CONCURRENCY
+        # workers); 0 runs OCR one file at a time on the thread pool instead
+        default_workers = max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WEB_CONCURRENCY") or 1)))
+        self.ocr_workers = int(os.getenv("PIPELINE_OCR_WORKERS", default_workers))
+        # Concurrent LLM extraction workers
+        self.llm_workers = int(os.getenv("PIPELINE_LLM_WORKERS", 4))
+        # OCR'd documents waiting for extraction before OCR pauses
+        self.queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", 2 * self.llm_workers))
+        # Queued documents an extraction worker sends in one prompt (see SkillExtractionService.extract_batch)
+        self.llm_batch_size = int(os.getenv("PIPELINE_LLM_BATCH_SIZE", 1))
+        self.max_files = int(os.getenv("PIPELINE_MAX_FILES", 500))
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.ocr_workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn, not fork: the parent runs an event loop and client threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.ocr_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next file starts a fresh one"""
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _ocr(self, item: Dict[str, str]) -> str:
+        """
+        OCR one file on the process pool. A worker dying mid-file (OOM, a
+        Tesseract segfault) breaks the whole pool and fails every file in it,
+        so the pool is replaced and each of those files is retried once in a
+        process of its own: only the file that kills that one fails.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        if executor is None:
+            return await run_in_threadpool(_ocr_file, item["path"], item["filename"])
+        try:
+            return await loop.run_in_executor(executor, _ocr_file, item["path"], item["filename"])
+        except BrokenProcessPool:
+            self._discard_pool(executor)
+            logger.warning(f"OCR pool broke while processing {item['filename']}; retrying it in its own process")
+        isolated = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return await loop.run_in_executor(isolated, _ocr_file, item["path"], item["filename"])
+        finally:
+            isolated.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(
+        self,
+        files: List[Dict[str, str]],
+        issuer_name: str,
+        nsqf_context: list = None,
+        workdir: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process files and yield one result per file, in completion order
+
+        Args:
+            files: Dicts with path, filename and certificate_title
+            issuer_name: Issuer applied to every certificate
+            nsqf_context: Potential NSQF matches applied to every certificate
+            workdir: Directory holding the files; removed when the run ends
+
+        Yields:
+            {"index", "filename", "status": "ok", ...OCRResponse fields} or
+            {"index", "filename", "status": "error", "error"}
+        """
+        ocr_slots = asyncio.Semaphore(max(1, self.ocr_workers))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.queue_size))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def ocr_one(index: int, item: Dict[str, str]):
+            try:
+                with track_stage("pipeline_ocr"):
+                    text = await self._ocr(item)
+                if not text or len(text.strip()) < 10:
+                    await results.put(self._error(index, item, "No readable text could be extracted from the document"))
+                    return
+                # Blocks while extraction is behind: this OCR slot stays taken, so no new file starts
+                await queue.put((index, item, text))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pipeline OCR failed for {item['filename']}: {e}")
+                await results.put(self._error(index, item, str(e)))
+            finally:
+                ocr_slots.release()
+                try:
+                    os.unlink(item["path"])
+                except OSError:
+                    pass
+
+        async def feed():
+            ocr_tasks = []
+            try:
+                for index, item in enumerate(files):
+                    await ocr_slots.acquire()
+                    ocr_tasks.append(asyncio.create_task(ocr_one(index, item)))
+                await asyncio.gather(*ocr_tasks)
+            finally:
+                for task in ocr_tasks:
+                    task.cancel()
+            for _ in range(max(1, self.llm_workers)):
+                await queue.put(_DONE)
+
+        async def extract_worker():
+            finished = False
+            while not finished:
+                entry = await queue.get()
+                if entry is _DONE:
+                    return
+                batch = [entry]
+                # Take whatever else is already waiting, up to the batch size
+                while len(batch) < self.llm_batch_size and not queue.empty():
+                    entry = queue.get_nowait()
+                    if entry is _DONE:
+                        finished = True
+                        break
+                    batch.append(entry)
+                for result in await self._extract(batch, issuer_name, nsqf_context):
+                    await results.put(result)
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(feed())] + [
+            asyncio.create_task(extract_worker()) for _ in range(max(1, self.llm_workers))
+        ]
+        succeeded = 0
+        try:
+            for _ in range(len(files)):
+                result = await results.get()
+                succeeded += result["status"] == "ok"
+                yield result
+        finally:
+            # Also runs when the client disconnects mid-stream: stop feeding and extracting
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+            logger.info(
+                f"Batch pipeline: {succeeded}/{len(files)} succeeded in {time.perf_counter() - started:.1f}s "
+                f"(ocr_workers={self.ocr_workers}, llm_workers={self.llm_workers})"
+            )
+
+    async def _extract(self, batch: list, issuer_name: str, nsqf_context: list) -> List[Dict[str, Any]]:
+        """Run skill extraction for queued (index, item, text) entries; one result per entry"""
+        from app.services.skill_extraction_service import skill_extraction_service
+
+        requests = [
+            {
+                "extracted_text": text,
+                "certificate_title": item["certificate_title"],
+                "issuer_name": issuer_name,
+                "nsqf_context": nsqf_context or []
+            }
+            for _, item, text in batch
+        ]
+        try:
+            with track_stage("pipeline_extraction"):
+                if len(requests) == 1:
+                    extractions = [await run_in_threadpool(skill_extraction_service.extract_skills_and_metadata, **requests[0])]
+                else:
+                    extractions = await run_in_threadpool(skill_extraction_service.extract_batch, requests)
+        except Exception as e:
+            logger.error(f"Pipeline extraction failed: {e}")
+            return [self._error(index, item, str(e)) for index, item, _ in batch]
+
+        return [
+            {
+                "index": index,
+                "filename": item["filename"],
+                "status": "ok",
+                "extracted_text": text,
+                "skills": extraction.get('skills', []),
+                "nsqf": extraction.get('nsqf', {"level": 1, "confidence": 0.0, "reasoning": ""}),
+                "nsqf_alignment": extraction.get('nsqf_alignment', None),
+                "keywords": extraction.get('keywords', []),
+                "certificate_metadata": extraction.get('certificate_metadata', {}),
+                "description": extraction.get('description', '')
+            }
+            for (index, item, text), extraction in zip(batch, extractions)
+        ]
+
+    def _error(self, index: int, item: Dict[str, str], message: str) -> Dict[str, Any]:
+        return {"index": index, "filename": item["filename"], "status": "error", "error": message}
+
+
+batch_pipeline = BatchPipeline()
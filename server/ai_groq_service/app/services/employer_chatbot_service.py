@@ -57,24 +57,25 @@ class EmployerChatbotService:
             ]
             
             logger.info(f"Calling Groq service for employer chat...")
-            response = groq_service.chat_completion(messages, temperature=0.3, use_json_mode=True)
+            try:
+                result = groq_service.json_completion(
+                    messages, task="chat",
+                    validate=lambda r: isinstance(r, dict) and "answer" in r
+                )
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON decode error: {e}")
+                logger.error(f"Response was: {e.doc}")
+                # Try to extract a meaningful answer from the response
+                return {
+                    "answer": e.doc if e.doc else "Unable to parse AI response.",
+                    "relevant_skills": [],
+                    "certificates_referenced": [],
+                    "confidence": 0.5
+                }
             
-            if response:
-                logger.info(f"Groq response received: {response[:200]}...")
-                try:
-                    result = json.loads(response)
-                    logger.info(f"Successfully parsed JSON response")
-                    return result
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e}")
-                    logger.error(f"Response was: {response}")
-                    # Try to extract a meaningful answer from the response
-                    return {
-                        "answer": response if isinstance(response, str) else "Unable to parse AI response.",
-                        "relevant_skills": [],
-                        "certificates_referenced": [],
-                        "confidence": 0.5
-                    }
+            if result:
+                logger.info(f"Successfully parsed JSON response")
+                return result
             else:
                 logger.warning("No response from Groq service")
                 return self._default_response(question)
@@ -1,13 +1,55 @@
+import json
 import os
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 try:
     from groq import Groq
 except ImportError:
     Groq = None
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
+from app.metrics import (
+    GROQ_ERRORS, GROQ_HEDGES, GROQ_REQUESTS, LLM_ESCALATIONS, classify_groq_error, record_groq_usage, track_stage
+)
+from app.cancellation import checkpoint, current_token
+from app.deadline import DeadlineExceeded, current_deadline
+from app.utils.hedging import HedgeBudget, LatencyTracker
+from app.utils.llm_json import parse_llm_json
 
 logger = logging.getLogger(__name__)
 
+LARGE_TIER = "large"
+FAST_TIER = "fast"
+
+# How often a call waiting on Groq checks whether its request was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+# Call site -> (tier, temperature override or None to use the tier default).
+# Cheap, short-output tasks go to the fast tier; anything a learner or employer
+# reads as advice stays on the large model.
+DEFAULT_ROUTES = {
+    "skill_extraction": (LARGE_TIER, 0.1),
+    "skill_extraction_batch": (LARGE_TIER, 0.1),
+    "recommendations": (LARGE_TIER, None),
+    "roadmap": (LARGE_TIER, None),
+    "skill_profile": (LARGE_TIER, None),
+    "stackability": (LARGE_TIER, None),
+    "chat": (LARGE_TIER, None),
+    "enrichment": (FAST_TIER, None),
+    "id_fallback": (FAST_TIER, 0.0),
+}
+
+
+def _parse_routes(value: Optional[str]) -> Dict[str, str]:
+    """Parse MODEL_ROUTES, e.g. "chat=fast,enrichment=large" """
+    routes = {}
+    for item in (value or "").split(","):
+        task, _, tier = item.partition("=")
+        if task.strip() and tier.strip():
+            routes[task.strip()] = tier.strip().lower()
+    return routes
+
 
 class GroqService:
     """Service for interacting with Groq LLM"""
@@ -18,43 +60,271 @@ class GroqService:
         self.model_name = os.getenv("MODEL_NAME", "llama-3.3-70b-versatile")
         self.mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
         self.timeout = float(os.getenv("GROQ_TIMEOUT_SECONDS", 30))
+        # Point at an OpenAI/Groq-compatible endpoint, e.g. the local stub in benchmarks/groq_stub.py
+        self.base_url = os.getenv("GROQ_BASE_URL") or None
+        if self.base_url and not self.api_key:
+            # Stand-in servers don't check keys, but the SDK requires one
+            self.api_key = "stub"
+        
+        # Model tiers: the large tier is MODEL_NAME; the fast tier serves cheap tasks
+        self.tiers = {
+            LARGE_TIER: {
+                "model": self.model_name,
+                "timeout": self.timeout,
+                "temperature": float(os.getenv("MODEL_TEMPERATURE", 0.3)),
+            },
+            FAST_TIER: {
+                "model": os.getenv("FAST_MODEL_NAME", "llama-3.1-8b-instant"),
+                "timeout": float(os.getenv("FAST_GROQ_TIMEOUT_SECONDS", 10)),
+                "temperature": float(os.getenv("FAST_MODEL_TEMPERATURE", 0.2)),
+            },
+        }
+        self.routes = dict(DEFAULT_ROUTES)
+        for task, tier in _parse_routes(os.getenv("MODEL_ROUTES")).items():
+            if tier not in self.tiers:
+                logger.warning(f"Ignoring MODEL_ROUTES entry {task}={tier}: unknown tier")
+                continue
+            self.routes[task] = (tier, self.routes.get(task, (tier, None))[1])
+        
+        # Opt-in request hedging: if a call is still running at the model's recent
+        # p{GROQ_HEDGE_PERCENTILE} latency, a second request races it (optionally on
+        # GROQ_HEDGE_TIER's model) and the first answer wins
+        self.hedging = os.getenv("GROQ_HEDGING", "false").lower() == "true"
+        self.hedge_percentile = float(os.getenv("GROQ_HEDGE_PERCENTILE", 95))
+        self.hedge_min_delay = float(os.getenv("GROQ_HEDGE_MIN_DELAY_SECONDS", 0.5))
+        # Used until enough latencies have been observed for the percentile
+        self.hedge_default_delay = float(os.getenv("GROQ_HEDGE_DEFAULT_DELAY_SECONDS", 3.0))
+        self.hedge_tier = os.getenv("GROQ_HEDGE_TIER") or None
+        self.hedge_budget = HedgeBudget(ratio=float(os.getenv("GROQ_HEDGE_MAX_RATIO", 0.05)))
+        self.latencies = LatencyTracker()
+        # Runs hedged calls, and calls made for a cancellable request so the caller can stop waiting.
+        # Built on first use (mock mode never needs it); the lock keeps concurrent first calls to one pool
+        self._call_executor = None
+        self._call_executor_lock = threading.Lock()
+        
+        # Set from 429s (Retry-After, else GROQ_RATE_LIMIT_BACKOFF_SECONDS) so batch
+        # callers can pause instead of adding to the overload; see rate_limit_wait()
+        self.rate_limit_backoff = float(os.getenv("GROQ_RATE_LIMIT_BACKOFF_SECONDS", 5))
+        self.rate_limited_until = 0.0
         
         # Debug logging
         logger.info(f"GROQ_API_KEY present: {bool(self.api_key)}")
-        logger.info(f"Model: {self.model_name}, Mock mode: {self.mock_mode}")
+        logger.info(f"Model: {self.model_name}, Fast model: {self.tiers[FAST_TIER]['model']}, Mock mode: {self.mock_mode}")
+        if self.base_url:
+            logger.info(f"Using custom Groq base URL: {self.base_url}")
         
-        self.client = Groq(api_key=self.api_key) if (not self.mock_mode and self.api_key) else None
+        self.client = Groq(api_key=self.api_key, base_url=self.base_url) if (not self.mock_mode and self.api_key) else None
         
         if self.mock_mode:
             logger.warning("Running in MOCK MODE - no real API calls will be made")
         elif not self.api_key:
             logger.warning("No GROQ_API_KEY found - running without AI capabilities")
     
-    def chat_completion(self, messages: list, temperature: float = 0.3, use_json_mode: bool = False) -> Optional[str]:
+    def chat_completion(self, messages: list, temperature: float = 0.3, use_json_mode: bool = False,
+                        model: Optional[str] = None, timeout: Optional[float] = None,
+                        hedge: Optional[bool] = None) -> Optional[str]:
         """
-        Send messages to Groq LLM and get response
+        Send messages to Groq LLM and get response.
+        model/timeout default to the large tier (MODEL_NAME, GROQ_TIMEOUT_SECONDS).
+        hedge overrides GROQ_HEDGING for this call.
+        Under a request deadline (app.deadline) the timeout is cut to the time
+        left, and DeadlineExceeded is raised when too little is left to try.
         """
         if self.mock_mode or not self.client:
             return self._mock_response()
         
+        timeout = timeout or self.timeout
+        deadline = current_deadline()
+        budgeted = False
+        if deadline is not None:
+            remaining = deadline.llm_timeout(timeout)
+            if remaining is None:
+                deadline.degrade("llm_skipped")
+                raise DeadlineExceeded("No time left before the request deadline for an LLM call")
+            budgeted, timeout = remaining < timeout, remaining
+        
+        params = {
+            "model": model or self.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "timeout": timeout
+        }
+        
+        # Enable JSON mode if requested (forces LLM to return valid JSON)
+        if use_json_mode:
+            params["response_format"] = {"type": "json_object"}
+        
+        checkpoint("llm_call")
+        try:
+            with track_stage("llm_call"):
+                if self.hedging if hedge is None else hedge:
+                    return self._hedged_create(params)
+                if current_token() is not None or deadline is not None:
+                    # On the pool so a client disconnect (app.cancellation) or the deadline stops
+                    # the wait, SDK retries included
+                    call = self._executor().submit(self._create, params)
+                    done, _ = self._wait([call], timeout=timeout if deadline is not None else None)
+                    if not done:
+                        call.cancel()
+                        deadline.degrade("llm_timeout")
+                        raise DeadlineExceeded(f"LLM call still running at the request deadline ({timeout:.1f}s)")
+                    return call.result()
+                return self._create(params)
+        except Exception as e:
+            if budgeted and classify_groq_error(e) == "timeout":
+                deadline.degrade("llm_timeout")
+            raise
+    
+    def _create(self, params: dict) -> Optional[str]:
+        model = params["model"]
+        start = time.perf_counter()
         try:
-            params = {
-                "model": self.model_name,
-                "messages": messages,
-                "temperature": temperature,
-                "timeout": self.timeout
-            }
-            
-            # Enable JSON mode if requested (forces LLM to return valid JSON)
-            if use_json_mode:
-                params["response_format"] = {"type": "json_object"}
-            
             response = self.client.chat.completions.create(**params)
-            return response.choices[0].message.content
         except Exception as e:
+            error_type = classify_groq_error(e)
+            GROQ_REQUESTS.labels(model=model, outcome="error").inc()
+            GROQ_ERRORS.labels(model=model, error_type=error_type).inc()
+            if error_type == "rate_limit":
+                self._note_rate_limit(e)
             logger.error(f"Groq API error: {e}")
             raise
+        self.latencies.record(model, time.perf_counter() - start)
+        GROQ_REQUESTS.labels(model=model, outcome="success").inc()
+        record_groq_usage(model, getattr(response, "usage", None))
+        return response.choices[0].message.content
     
+    def _hedged_create(self, params: dict) -> Optional[str]:
+        """
+        Race a hedge request against a slow primary; the first successful answer wins.
+
+        The SDK call is blocking, so the losing request can't be interrupted: it is
+        cancelled if it hasn't started yet, otherwise abandoned and its result
+        discarded when it returns. Its tokens are still billed and counted, which is
+        why hedges are capped by GROQ_HEDGE_MAX_RATIO.
+        """
+        self.hedge_budget.deposit()
+        
+        delay = self.latencies.percentile(params["model"], self.hedge_percentile)
+        delay = max(self.hedge_min_delay, self.hedge_default_delay if delay is None else delay)
+        
+        primary = self._executor().submit(self._create, params)
+        done, _ = self._wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not self.hedge_budget.withdraw():
+            GROQ_HEDGES.labels(outcome="budget_exhausted").inc()
+            self._wait([primary])
+            return primary.result()
+        
+        hedge_params = dict(params)
+        if self.hedge_tier in self.tiers:
+            hedge_params["model"] = self.tiers[self.hedge_tier]["model"]
+            hedge_params["timeout"] = self.tiers[self.hedge_tier]["timeout"]
+            if current_deadline() is not None:
+                # Already cut to the request deadline; the hedge can't outlive it either
+                hedge_params["timeout"] = min(hedge_params["timeout"], params["timeout"])
+        logger.info(f"Hedging {params['model']} call after {delay:.2f}s with {hedge_params['model']}")
+        hedge = self._executor().submit(self._create, hedge_params)
+        
+        pending = {primary, hedge}
+        while pending:
+            done, pending = self._wait(pending)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    GROQ_HEDGES.labels(outcome="primary_won" if future is primary else "hedge_won").inc()
+                    return future.result()
+        
+        GROQ_HEDGES.labels(outcome="all_failed").inc()
+        raise primary.exception()
+    
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._call_executor is None:
+            with self._call_executor_lock:
+                if self._call_executor is None:
+                    self._call_executor = ThreadPoolExecutor(
+                        max_workers=int(os.getenv("GROQ_CALL_WORKERS") or os.getenv("GROQ_HEDGE_WORKERS", 40)),
+                        thread_name_prefix="groq-call"
+                    )
+        return self._call_executor
+    
+    def _wait(self, futures, timeout: Optional[float] = None):
+        """
+        wait(futures, timeout, FIRST_COMPLETED), except that inside a cancellable
+        request it checks the request's CancelToken every CANCEL_POLL_SECONDS.
+        Once the client has disconnected, calls that haven't started are
+        cancelled, running ones are abandoned (their result is discarded, their
+        tokens still billed) and RequestCancelled is raised.
+        """
+        token = current_token()
+        if token is None:
+            return wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = CANCEL_POLL_SECONDS if deadline is None else max(0.0, min(CANCEL_POLL_SECONDS, deadline - time.monotonic()))
+            done, pending = wait(futures, timeout=step, return_when=FIRST_COMPLETED)
+            if done or (deadline is not None and time.monotonic() >= deadline):
+                return done, pending
+            if token.cancelled:
+                for future in pending:
+                    future.cancel()
+                checkpoint("llm_call")
+    
+    def _note_rate_limit(self, error: Exception):
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after") or self.rate_limit_backoff)
+        except (TypeError, ValueError):
+            retry_after = self.rate_limit_backoff
+        self.rate_limited_until = max(self.rate_limited_until, time.time() + retry_after)
+
+    def rate_limit_wait(self) -> float:
+        """Seconds until the most recent 429's back-off window ends (0 if not rate limited)"""
+        return max(0.0, self.rate_limited_until - time.time())
+
+    def route(self, task: str, tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve a call site to {"tier", "model", "timeout", "temperature"}.
+        Passing `tier` forces that tier but keeps the task's temperature override.
+        """
+        routed_tier, temperature = self.routes.get(task, (LARGE_TIER, None))
+        tier = tier or routed_tier
+        config = dict(self.tiers[tier], tier=tier)
+        if temperature is not None:
+            config["temperature"] = temperature
+        return config
+
+    def json_completion(self, messages: list, task: str, use_json_mode: bool = True,
+                        validate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        Run a JSON-producing call on the tier routed for `task` and return the parsed result.
+
+        If a fast-tier answer doesn't parse, or `validate(result)` is falsy, the
+        call is retried once on the large tier. Returns None when the model gives
+        no content; raises json.JSONDecodeError if the final answer doesn't parse.
+        """
+        config = self.route(task)
+        response = self.chat_completion(messages, temperature=config["temperature"], use_json_mode=use_json_mode,
+                                        model=config["model"], timeout=config["timeout"])
+        if config["tier"] == LARGE_TIER:
+            return parse_llm_json(response) if response else None
+
+        try:
+            result = parse_llm_json(response) if response else None
+            if result is not None and (validate is None or validate(result)):
+                return result
+            reason = "failed validation" if result is not None else "was empty"
+        except json.JSONDecodeError:
+            reason = "was not valid JSON"
+
+        logger.warning(f"{config['model']} output for {task} {reason}; escalating to {self.model_name}")
+        LLM_ESCALATIONS.labels(task=task).inc()
+        config = self.route(task, tier=LARGE_TIER)
+        response = self.chat_completion(messages, temperature=config["temperature"], use_json_mode=use_json_mode,
+                                        model=config["model"], timeout=config["timeout"])
+        return parse_llm_json(response) if response else None
+
     def _mock_response(self) -> str:
         """Mock response for testing without API key"""
         return '{"skills": ["Python", "Data Analysis"], "next_skills": [], "roles": [], "path": [], "courses": [], "nsqf": 4}'
@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from PIL import Image
+import pytesseract
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI through pytesseract (temp file + subprocess per call)"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng"):
+        self.lang = lang
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+    def image_to_text_with_confidence(self, image: Image.Image) -> Tuple[str, float]:
+        """
+        OCR an image via image_to_data and return (text, mean word confidence).
+        Words Tesseract could not score (conf -1) and empty tokens are ignored;
+        an image with no words scores 0.
+        """
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+
+        lines: Dict[tuple, List[str]] = {}
+        confidences = []
+        for idx, word in enumerate(data.get("text", [])):
+            word = (word or "").strip()
+            conf = float(data["conf"][idx])
+            if not word or conf < 0:
+                continue
+            confidences.append(conf)
+            key = (data["block_num"][idx], data["par_num"][idx], data["line_num"][idx])
+            lines.setdefault(key, []).append(word)
+
+        text = ""
+        previous_paragraph = None
+        for key in sorted(lines):
+            paragraph = key[:2]
+            if previous_paragraph is not None and paragraph != previous_paragraph:
+                text += "\n"
+            text += " ".join(lines[key]) + "\n"
+            previous_paragraph = paragraph
+
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, mean_confidence
+
+
+class TesserocrBackend:
+    """
+    Keeps a bounded pool of long-lived Tesseract engines (via the tesserocr C
+    API bindings) and hands them PIL images in memory, so traineddata is loaded
+    once per engine instead of spawning a process and re-reading the model for
+    every page. Engines are created on demand up to `max_engines`; further
+    callers wait for one to be returned rather than each threadpool thread
+    loading its own model.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", max_engines: int = 1):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+        self.lang = lang
+        self.max_engines = max(1, max_engines)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _api(self):
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.max_engines
+                if create:
+                    self._created += 1
+            if create:
+                logger.info(f"Initializing Tesseract engine {self._created}/{self.max_engines} (lang={self.lang})")
+                try:
+                    api = tesserocr.PyTessBaseAPI(lang=self.lang)
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                api = self._idle.get()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def image_to_string(self, image: Image.Image) -> str:
+        with self._api() as api:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+    def image_to_text_with_confidence(self, image: Image.Image) -> Tuple[str, float]:
+        with self._api() as api:
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            confidences = [c for c in api.AllWordConfidences() if c >= 0]
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text, mean_confidence
+
+
+def get_ocr_backend(name: str, lang: str = "eng", max_engines: int = 1):
+    """Build the configured OCR backend, falling back to pytesseract if unavailable"""
+    name = (name or "pytesseract").lower()
+    if name == "tesserocr":
+        try:
+            return TesserocrBackend(lang=lang, max_engines=max_engines)
+        except ImportError as e:
+            logger.warning(f"OCR backend 'tesserocr' unavailable ({e}), falling back to pytesseract")
+    elif name != "pytesseract":
+        logger.warning(f"Unknown OCR backend '{name}', falling back to pytesseract")
+    return PytesseractBackend(lang=lang)
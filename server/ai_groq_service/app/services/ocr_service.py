@@ -1,35 +1,120 @@
+import os
 import logging
-from typing import List, Dict, Any
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from io import BytesIO
-from PIL import Image
-import pytesseract
+from PIL import Image, ImageOps
 from PyPDF2 import PdfReader
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
 from pdf2image.exceptions import PDFInfoNotInstalledError
+from app.services.ocr_backends import get_ocr_backend
+from app.metrics import OCR_PAGES, PDF_DOCUMENTS, track_stage
+from app.cancellation import checkpoint
+from app.deadline import current_deadline
 
 logger = logging.getLogger(__name__)
 
+# Files arrive either as bytes (ZIP members, benchmarks) or as the path of a
+# spooled upload (app.uploads). Paths are handed to PyPDF2, PIL and poppler
+# directly so the document is never held in memory as a whole.
+FileSource = Union[bytes, str, os.PathLike]
+
+
+def _is_path(source: FileSource) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def _source_size(source: FileSource) -> int:
+    return os.path.getsize(source) if _is_path(source) else len(source)
+
+
+def _open_source(source: FileSource):
+    """Binary file object over the source; BytesIO shares the bytes buffer rather than copying it"""
+    return open(source, "rb") if _is_path(source) else BytesIO(source)
+
+
+@contextmanager
+def _source_path(source: FileSource):
+    """Yield a filesystem path for the source, writing bytes to a temp file once if needed"""
+    if _is_path(source):
+        yield source
+        return
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            tmp.write(source)
+        yield tmp.name
+    finally:
+        os.unlink(tmp.name)
+
 
 class OCRService:
     """Service for OCR processing of certificates"""
-    
-    def extract_text_from_pdf(self, file_bytes: bytes) -> str:
+
+    def __init__(self):
+        # Preprocessing applied to every image before it reaches Tesseract.
+        # Tesseract time scales with pixel count, so oversized photos are capped.
+        self.max_dimension = int(os.getenv("OCR_MAX_DIMENSION", 2500))
+        self.pdf_dpi = int(os.getenv("OCR_PDF_DPI", 200))
+        self.grayscale = os.getenv("OCR_GRAYSCALE", "true").lower() == "true"
+        self.binarize = os.getenv("OCR_BINARIZE", "false").lower() == "true"
+        self.deskew = os.getenv("OCR_DESKEW", "false").lower() == "true"
+
+        # Adaptive resolution: OCR a cheap low-resolution pass first and only
+        # re-render / re-OCR pages whose mean word confidence is below threshold.
+        self.adaptive = os.getenv("OCR_ADAPTIVE", "true").lower() == "true"
+        self.low_pdf_dpi = int(os.getenv("OCR_LOW_PDF_DPI", 120))
+        self.low_max_dimension = int(os.getenv("OCR_LOW_MAX_DIMENSION", 1600))
+        self.min_confidence = float(os.getenv("OCR_MIN_CONFIDENCE", 70))
+
+        # Scanned PDFs are rasterized OCR_RASTER_WINDOW pages at a time (0 = the
+        # whole document at once), so memory is bounded by page size rather than
+        # page count. Pages past OCR_MAX_PAGES are not OCR'd.
+        self.raster_window = int(os.getenv("OCR_RASTER_WINDOW", 1))
+        self.max_pages = int(os.getenv("OCR_MAX_PAGES", 50))
+
+        # Tesseract backend: "pytesseract" (subprocess per image) or "tesserocr"
+        # (pool of long-lived in-process engines). Tesseract is CPU-bound, so by
+        # default each worker process gets its share of the CPUs in engines.
+        default_engines = max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WEB_CONCURRENCY") or 1)))
+        self.backend = get_ocr_backend(
+            os.getenv("OCR_BACKEND", "pytesseract"),
+            lang=os.getenv("OCR_LANG", "eng"),
+            max_engines=int(os.getenv("OCR_ENGINES", default_engines)),
+        )
+
+        logger.info(f"OCR backend: {self.backend.name}")
+        logger.info(
+            f"OCR preprocessing: max_dimension={self.max_dimension}, pdf_dpi={self.pdf_dpi}, "
+            f"grayscale={self.grayscale}, binarize={self.binarize}, deskew={self.deskew}"
+        )
+        logger.info(
+            f"OCR adaptive resolution: enabled={self.adaptive}, low_pdf_dpi={self.low_pdf_dpi}, "
+            f"low_max_dimension={self.low_max_dimension}, min_confidence={self.min_confidence}"
+        )
+
+    def extract_text_from_pdf(self, source: FileSource) -> str:
         """
         Extract text from PDF file. 
         Falls back to OCR (pdf2image + pytesseract) if standard extraction yields little text (scanned PDF).
         """
         text = ""
         try:
-            logger.info(f"Attempting PDF text extraction, file size: {len(file_bytes)} bytes")
-            pdf_reader = PdfReader(BytesIO(file_bytes))
-            page_count = len(pdf_reader.pages)
-            logger.info(f"PDF has {page_count} page(s)")
-            
-            # 1. Try Standard Text Extraction (PyPDF2)
-            for idx, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            logger.info(f"Attempting PDF text extraction, file size: {_source_size(source)} bytes")
+            # PdfReader given a path reads the whole file into memory; an open file is read lazily
+            with track_stage("pdf_text_extraction"), _open_source(source) as stream:
+                pdf_reader = PdfReader(stream)
+                page_count = len(pdf_reader.pages)
+                logger.info(f"PDF has {page_count} page(s)")
+
+                # 1. Try Standard Text Extraction (PyPDF2)
+                for idx, page in enumerate(pdf_reader.pages):
+                    checkpoint("pdf_page")
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text + "\n"
             
             extracted_length = len(text.strip())
             logger.info(f"Standard PDF extraction yielded: {extracted_length} characters")
@@ -37,17 +122,10 @@ class OCRService:
             # 2. Fallback to OCR if text is suspicious (too short for a certificate)
             if extracted_length < 50:
                 logger.warning("Low text count detected. Likely a scanned PDF. Attempting OCR conversion...")
+                PDF_DOCUMENTS.labels(source="ocr_fallback").inc()
                 
                 try:
-                    # Convert PDF pages to images
-                    images = convert_from_bytes(file_bytes)
-                    ocr_text = ""
-                    
-                    for i, image in enumerate(images):
-                        logger.info(f"Processing scanned page {i+1} with OCR...")
-                        page_ocr = pytesseract.image_to_string(image)
-                        ocr_text += page_ocr + "\n"
-                        
+                    ocr_text = self._ocr_scanned_pdf(source, page_count=page_count)
                     ocr_length = len(ocr_text.strip())
                     logger.info(f"OCR fallback yielded: {ocr_length} characters")
                     
@@ -62,6 +140,8 @@ class OCRService:
                 except Exception as e:
                     logger.error(f"OCR Fallback error: {e}")
                     # Don't crash entirely if just fallback fails, return what we have
+            else:
+                PDF_DOCUMENTS.labels(source="text_layer").inc()
             
             return text.strip()
 
@@ -69,14 +149,42 @@ class OCRService:
             logger.error(f"PDF extraction error: {e}", exc_info=True)
             raise
     
-    def extract_text_from_image(self, file_bytes: bytes) -> str:
+    def extract_text_from_image(self, source: FileSource) -> str:
         """Extract text from image using Tesseract OCR"""
         try:
-            logger.info(f"Attempting image OCR, file size: {len(file_bytes)} bytes")
-            image = Image.open(BytesIO(file_bytes))
-            logger.info(f"Image opened: {image.format}, size: {image.size}, mode: {image.mode}")
-            
-            text = pytesseract.image_to_string(image)
+            logger.info(f"Attempting image OCR, file size: {_source_size(source)} bytes")
+            # Header-only parse; pixel data is decoded later at the chosen resolution
+            with _open_source(source) as stream, Image.open(stream) as header:
+                logger.info(f"Image opened: {header.format}, size: {header.size}, mode: {header.mode}")
+                size = header.size
+
+            low_pass_helps = self.low_max_dimension < self.max_dimension and max(size) > self.low_max_dimension
+            deadline = current_deadline()
+            # Under a request deadline the low-resolution pass comes first even with adaptive off
+            if (self.adaptive or deadline is not None) and low_pass_helps:
+                start = time.perf_counter()
+                image = self.open_image(source, max_dimension=self.low_max_dimension)
+                text, confidence = self.ocr_with_confidence(
+                    self.preprocess_image(image, max_dimension=self.low_max_dimension)
+                )
+                logger.info(f"Low-resolution OCR pass: mean confidence {confidence:.1f}")
+                OCR_PAGES.labels(pass_type="low_res").inc()
+                # Tesseract time grows with pixel count
+                rerun_seconds = (time.perf_counter() - start) * (self.max_dimension / self.low_max_dimension) ** 2
+
+                if confidence < self.min_confidence and deadline is not None and not deadline.allows(rerun_seconds):
+                    deadline.degrade("ocr_low_resolution")
+                elif confidence < self.min_confidence:
+                    logger.info("Confidence below threshold, re-running OCR at full resolution")
+                    checkpoint("ocr_page")
+                    image = self.open_image(source)
+                    text = self.ocr_image(self.preprocess_image(image))
+                    OCR_PAGES.labels(pass_type="high_res_rerender").inc()
+            else:
+                image = self.open_image(source)
+                text = self.ocr_image(self.preprocess_image(image))
+                OCR_PAGES.labels(pass_type="single").inc()
+
             extracted_length = len(text.strip())
             logger.info(f"OCR extraction complete: {extracted_length} characters")
             
@@ -89,20 +197,216 @@ class OCRService:
         except Exception as e:
             logger.error(f"Image OCR error: {e}", exc_info=True)
             raise
+
+    def _ocr_scanned_pdf(self, source: FileSource, page_count: Optional[int] = None) -> str:
+        """
+        Rasterize and OCR the pages of a scanned PDF, a window of pages at a time;
+        each page image is released before the next window is rendered. With
+        adaptive resolution on, pages are rendered at the low DPI first and only
+        pages whose mean word confidence falls below the threshold are re-rendered
+        at full DPI. Under a request deadline (app.deadline) re-renders and further
+        pages only happen while the budget still leaves the LLM reserve.
+        """
+        deadline = current_deadline()
+        # Under a request deadline pages start at the low DPI even with adaptive off
+        low_first = (self.adaptive or deadline is not None) and self.low_pdf_dpi < self.pdf_dpi
+        first_dpi = self.low_pdf_dpi if low_first else self.pdf_dpi
+        ocr_text = ""
+        rerendered = 0
+
+        # poppler reads the file once per window, so bytes are written to disk once up front
+        with _source_path(source) as path:
+            if page_count is None:
+                page_count = pdfinfo_from_path(path)["Pages"]
+            if self.max_pages and page_count > self.max_pages:
+                logger.warning(f"Scanned PDF has {page_count} pages, only the first {self.max_pages} will be OCR'd")
+                page_count = self.max_pages
+
+            mark = time.perf_counter()
+            page_seconds = 0.0
+            for i, image in enumerate(self._iter_pages(path, page_count, first_dpi)):
+                # A disconnected client stops the remaining pages here
+                checkpoint("ocr_page")
+                # So does a deadline with no room for another page like the last one
+                if deadline is not None and i and not deadline.allows(page_seconds):
+                    image.close()
+                    deadline.degrade("ocr_pages_truncated")
+                    logger.warning(f"Request deadline: stopping OCR after {i} of {page_count} page(s)")
+                    break
+                logger.info(f"Processing scanned page {i+1} with OCR at {first_dpi} DPI...")
+                if first_dpi == self.pdf_dpi:
+                    page_ocr = self.ocr_image(self.preprocess_image(image))
+                    OCR_PAGES.labels(pass_type="single").inc()
+                else:
+                    page_ocr, confidence = self.ocr_with_confidence(self.preprocess_image(image))
+                    OCR_PAGES.labels(pass_type="low_res").inc()
+                    # Rendering and Tesseract time grow with pixel count
+                    rerender_seconds = (time.perf_counter() - mark) * (self.pdf_dpi / first_dpi) ** 2
+                    if confidence < self.min_confidence and deadline is not None and not deadline.allows(rerender_seconds):
+                        deadline.degrade("ocr_low_resolution")
+                    elif confidence < self.min_confidence:
+                        logger.info(
+                            f"Page {i+1} confidence {confidence:.1f} below {self.min_confidence}, "
+                            f"re-rendering at {self.pdf_dpi} DPI"
+                        )
+                        image.close()
+                        checkpoint("ocr_page")
+                        with track_stage("rasterization"):
+                            image = convert_from_path(
+                                path, dpi=self.pdf_dpi, grayscale=self.grayscale,
+                                first_page=i + 1, last_page=i + 1
+                            )[0]
+                        page_ocr = self.ocr_image(self.preprocess_image(image))
+                        OCR_PAGES.labels(pass_type="high_res_rerender").inc()
+                        rerendered += 1
+                image.close()
+                ocr_text += page_ocr + "\n"
+                now = time.perf_counter()
+                page_seconds, mark = now - mark, now
+
+        if first_dpi != self.pdf_dpi:
+            logger.info(f"Adaptive OCR re-rendered {rerendered}/{page_count} page(s) at full resolution")
+        return ocr_text
+
+    def _iter_pages(self, path: str, page_count: int, dpi: int) -> Iterator[Image.Image]:
+        """Yield page images in order, rendering `raster_window` pages per poppler call"""
+        window = self.raster_window if self.raster_window > 0 else page_count
+        for first_page in range(1, page_count + 1, window):
+            last_page = min(page_count, first_page + window - 1)
+            with track_stage("rasterization"):
+                images = convert_from_path(
+                    path, dpi=dpi, grayscale=self.grayscale, first_page=first_page, last_page=last_page
+                )
+            # Pop so the window list doesn't keep already-OCR'd pages alive
+            while images:
+                yield images.pop(0)
+
+    def ocr_image(self, image: Image.Image) -> str:
+        """OCR a preprocessed image with the active backend"""
+        with track_stage("tesseract"):
+            return self.backend.image_to_string(image)
+
+    def ocr_with_confidence(self, image: Image.Image) -> Tuple[str, float]:
+        """OCR an image and return (text, mean word confidence) from the active backend"""
+        with track_stage("tesseract"):
+            return self.backend.image_to_text_with_confidence(image)
+
+    def open_image(self, source: FileSource, max_dimension: Optional[int] = None) -> Image.Image:
+        """
+        Open an uploaded image. JPEGs are decoded in draft mode, which lets libjpeg
+        scale down by 1/2, 1/4 or 1/8 during decoding instead of materialising
+        every pixel of a 12+ megapixel phone photo.
+        """
+        max_dimension = self.max_dimension if max_dimension is None else max_dimension
+        image = Image.open(source if _is_path(source) else BytesIO(source))
+        if image.format == "JPEG" and max_dimension > 0:
+            draft_mode = "L" if self.grayscale else image.mode
+            image.draft(draft_mode, (max_dimension, max_dimension))
+        return image
+
+    def preprocess_image(self, image: Image.Image, max_dimension: Optional[int] = None) -> Image.Image:
+        """
+        Normalize an image for Tesseract: honour EXIF rotation, flatten transparency,
+        convert to grayscale, cap the longest side and optionally binarize / deskew.
+        """
+        with track_stage("image_preprocess"):
+            return self._preprocess(image, max_dimension)
+
+    def _preprocess(self, image: Image.Image, max_dimension: Optional[int] = None) -> Image.Image:
+        image = ImageOps.exif_transpose(image)
+
+        # Flatten alpha onto white so transparent regions don't turn black
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            rgba = image.convert("RGBA")
+            background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, rgba)
+
+        if self.grayscale:
+            if image.mode != "L":
+                image = image.convert("L")
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        max_dimension = self.max_dimension if max_dimension is None else max_dimension
+        if max_dimension > 0 and max(image.size) > max_dimension:
+            original_size = image.size
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            logger.info(f"Downscaled image from {original_size} to {image.size}")
+
+        if self.binarize:
+            image = self._binarize(image)
+
+        if self.deskew:
+            image = self._deskew(image)
+
+        return image
+
+    def _binarize(self, image: Image.Image) -> Image.Image:
+        """Threshold a grayscale image using Otsu's method on its histogram"""
+        gray = image if image.mode == "L" else image.convert("L")
+        histogram = gray.histogram()
+        total = sum(histogram)
+        sum_all = sum(i * count for i, count in enumerate(histogram))
+
+        sum_background = 0.0
+        weight_background = 0
+        best_threshold, best_variance = 127, 0.0
+        for i, count in enumerate(histogram):
+            weight_background += count
+            if weight_background == 0:
+                continue
+            weight_foreground = total - weight_background
+            if weight_foreground == 0:
+                break
+            sum_background += i * count
+            mean_background = sum_background / weight_background
+            mean_foreground = (sum_all - sum_background) / weight_foreground
+            variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+            if variance > best_variance:
+                best_threshold, best_variance = i, variance
+
+        return gray.point(lambda p: 255 if p > best_threshold else 0)
+
+    def _deskew(self, image: Image.Image, max_angle: float = 5.0, step: float = 0.5) -> Image.Image:
+        """
+        Estimate small rotations with a projection profile: text lines are aligned
+        when the variance of row darkness is highest. Scored on a thumbnail for speed.
+        """
+        gray = image if image.mode == "L" else image.convert("L")
+        sample = gray.copy()
+        sample.thumbnail((800, 800))
+
+        def _score(angle: float) -> float:
+            rotated = sample.rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+            # Collapsing to one column gives the mean intensity of every row
+            rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+            mean = sum(rows) / len(rows)
+            return sum((r - mean) ** 2 for r in rows)
+
+        angles = [i * step for i in range(int(-max_angle / step), int(max_angle / step) + 1)]
+        best_angle = max(angles, key=_score)
+
+        if best_angle == 0:
+            return image
+
+        logger.info(f"Deskewing image by {best_angle} degrees")
+        fill = 255 if image.mode == "L" else (255, 255, 255)
+        return image.rotate(best_angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
     
-    def extract_text(self, file_bytes: bytes, filename: str) -> str:
+    def extract_text(self, source: FileSource, filename: str) -> str:
         """
-        Extract text from file (auto-detect type)
+        Extract text from file (auto-detect type).
+        `source` is the file's bytes or a path to it (e.g. a spooled upload).
         """
         filename_lower = filename.lower()
-        logger.info(f"Processing file: {filename}, size: {len(file_bytes)} bytes")
+        logger.info(f"Processing file: {filename}, size: {_source_size(source)} bytes")
         
         if filename_lower.endswith('.pdf'):
             logger.info("Detected file type: PDF")
-            return self.extract_text_from_pdf(file_bytes)
+            return self.extract_text_from_pdf(source)
         elif any(filename_lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp']):
             logger.info(f"Detected file type: Image ({filename_lower.split('.')[-1]})")
-            return self.extract_text_from_image(file_bytes)
+            return self.extract_text_from_image(source)
         else:
             logger.error(f"Unsupported file type: {filename}")
             raise ValueError(f"Unsupported file type: {filename}")
@@ -149,6 +453,26 @@ class OCRService:
             
         return None
 
+    def certificate_number_from_metadata(self, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Build a certificate-number result from AI-extracted certificate metadata,
+        in the same shape as extract_certificate_number_from_text.
+        Returns None if the metadata has no usable number.
+        """
+        for key in ("certificate_number", "certificate_no", "cert_no", "credential_id", "reference_no"):
+            val = (metadata or {}).get(key)
+            if val:
+                val = str(val).strip()
+                # Simple check if meaningful
+                if len(val) > 4:
+                    return {
+                        "certificate_number": val,
+                        "confidence": 85.0,  # AI usually good
+                        "status": "found",
+                        "candidate": {"value": val, "evidence": "ai_extracted", "score": 85.0}
+                    }
+        return None
+
     async def extract_certificate_number_from_text(self, text: str) -> Dict[str, Any]:
         """
         Robustly extract certificate number using regex patterns and scoring.
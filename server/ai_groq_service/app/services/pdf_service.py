@@ -1,4 +1,6 @@
 import io
+import os
+from typing import Union
 import qrcode
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
@@ -6,6 +8,7 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import HexColor, Color
 from reportlab.lib.units import inch
 from PIL import Image
+from app.metrics import track_stage
 
 class PDFService:
     def create_qr_page(self, qr_data: str) -> io.BytesIO:
@@ -105,30 +108,41 @@ class PDFService:
         packet.seek(0)
         return packet
 
-    def append_qr_page(self, original_pdf_bytes: bytes, qr_data: str) -> bytes:
+    def append_qr_page(self, original_pdf: Union[bytes, str, os.PathLike], qr_data: str) -> bytes:
         """
         Appends the generated QR page to the original PDF
         """
+        return self.append_qr_page_stream(original_pdf, qr_data).getvalue()
+
+    def append_qr_page_stream(self, original_pdf: Union[bytes, str, os.PathLike], qr_data: str) -> io.BytesIO:
+        """
+        Same as append_qr_page, but reads the original from a path when given one
+        and returns the output buffer rewound to the start, ready to stream,
+        instead of copying it out to bytes.
+        """
         # Create QR page
-        qr_page_stream = self.create_qr_page(qr_data)
+        with track_stage("qr_page_render"):
+            qr_page_stream = self.create_qr_page(qr_data)
         qr_pdf_reader = PdfReader(qr_page_stream)
         qr_page = qr_pdf_reader.pages[0]
         
-        # Read original PDF
-        original_pdf_stream = io.BytesIO(original_pdf_bytes)
-        pdf_reader = PdfReader(original_pdf_stream)
-        pdf_writer = PdfWriter()
-        
-        # Add all original pages
-        for page in pdf_reader.pages:
-            pdf_writer.add_page(page)
-            
-        # Add QR page
-        pdf_writer.add_page(qr_page)
-        
-        # Write to output
-        output_stream = io.BytesIO()
-        pdf_writer.write(output_stream)
-        return output_stream.getvalue()
+        # Read original PDF (PdfReader given a path would read it all into memory first)
+        is_path = isinstance(original_pdf, (str, os.PathLike))
+        with track_stage("pdf_write"), (open(original_pdf, "rb") if is_path else io.BytesIO(original_pdf)) as original_pdf_stream:
+            pdf_reader = PdfReader(original_pdf_stream)
+            pdf_writer = PdfWriter()
+
+            # Add all original pages
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
+
+            # Add QR page
+            pdf_writer.add_page(qr_page)
+
+            # Write to output
+            output_stream = io.BytesIO()
+            pdf_writer.write(output_stream)
+        output_stream.seek(0)
+        return output_stream
 
 pdf_service = PDFService()
@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 from app.services.groq_service import groq_service
 from app.services.stackability_service import stackability_service
 from app.models.schemas import StackabilityRequest
+from app.metrics import track_stage
 
 logger = logging.getLogger(__name__)
 
@@ -67,35 +68,23 @@ class RecommendationService:
         
         # Generate recommendations using LLM
         try:
-            prompt = self._build_recommendation_prompt(unique_skills, certificates)
+            with track_stage("prompt_build"):
+                prompt = self._build_recommendation_prompt(unique_skills, certificates)
             messages = [
                 {"role": "system", "content": "You are an AI career advisor. You MUST respond ONLY with valid JSON. Do not include any text before or after the JSON."},
                 {"role": "user", "content": prompt}
             ]
             
-            response = groq_service.chat_completion(messages, temperature=0.3, use_json_mode=True)
+            try:
+                recommendations = groq_service.json_completion(messages, task="recommendations")
+            except json.JSONDecodeError as je:
+                logger.error(f"JSON decode error: {je}, Response: {je.doc[:500]}")
+                return self._empty_recommendations()
             
-            if response:
-                # Clean up the response - remove markdown code blocks if present
-                cleaned_response = response.strip()
-                if cleaned_response.startswith('```json'):
-                    cleaned_response = cleaned_response[7:]
-                if cleaned_response.startswith('```'):
-                    cleaned_response = cleaned_response[3:]
-                if cleaned_response.endswith('```'):
-                    cleaned_response = cleaned_response[:-3]
-                cleaned_response = cleaned_response.strip()
-                
-                logger.info(f"AI Response (first 200 chars): {cleaned_response[:200]}")
-                
-                try:
-                    recommendations = json.loads(cleaned_response)
-                    recommendations['source'] = 'groq'
-                    recommendations['confidence'] = 0.9
-                    return recommendations
-                except json.JSONDecodeError as je:
-                    logger.error(f"JSON decode error: {je}, Response: {cleaned_response[:500]}")
-                    return self._empty_recommendations()
+            if recommendations:
+                recommendations['source'] = 'groq'
+                recommendations['confidence'] = 0.9
+                return recommendations
             else:
                 return self._empty_recommendations()
                 
@@ -205,29 +194,16 @@ Focus on Indian job market and NSQF framework.
                 {"role": "user", "content": prompt}
             ]
             
-            response = groq_service.chat_completion(messages, temperature=0.3, use_json_mode=True)
+            try:
+                recommendations = groq_service.json_completion(messages, task="recommendations")
+            except json.JSONDecodeError as je:
+                logger.error(f"JSON decode error from titles: {je}, Response: {je.doc[:500]}")
+                return self._empty_recommendations()
             
-            if response:
-                # Clean up the response - remove markdown code blocks if present
-                cleaned_response = response.strip()
-                if cleaned_response.startswith('```json'):
-                    cleaned_response = cleaned_response[7:]
-                if cleaned_response.startswith('```'):
-                    cleaned_response = cleaned_response[3:]
-                if cleaned_response.endswith('```'):
-                    cleaned_response = cleaned_response[:-3]
-                cleaned_response = cleaned_response.strip()
-                
-                logger.info(f"AI Response from titles (first 200 chars): {cleaned_response[:200]}")
-                
-                try:
-                    recommendations = json.loads(cleaned_response)
-                    recommendations['source'] = 'groq-from-titles'
-                    recommendations['confidence'] = 0.75
-                    return recommendations
-                except json.JSONDecodeError as je:
-                    logger.error(f"JSON decode error from titles: {je}, Response: {cleaned_response[:500]}")
-                    return self._empty_recommendations()
+            if recommendations:
+                recommendations['source'] = 'groq-from-titles'
+                recommendations['confidence'] = 0.75
+                return recommendations
             else:
                 return self._empty_recommendations()
                 
@@ -309,7 +285,7 @@ Focus on Indian job market and NSQF framework.
             """
             
             # 1. Generate core roadmap using LLM
-            roadmap_response = self._call_llm(prompt)
+            roadmap_response = self._call_llm(prompt, task="roadmap")
             
             # 2. Enhance with Stackable Pathways using dedicated service
             try:
@@ -470,7 +446,7 @@ Focus on Indian job market and NSQF framework.
             3. Focus on the Indian job market.
             """
             
-            return self._call_llm(prompt)
+            return self._call_llm(prompt, task="skill_profile")
             
         except Exception as e:
             logger.error(f"Skill profile generation error: {e}")
@@ -497,7 +473,7 @@ Focus on Indian job market and NSQF framework.
             Focus on the Indian job market.
             """
             
-            return self._call_llm(prompt)
+            return self._call_llm(prompt, task="enrichment", required_keys=("related_job_roles", "top_skills_gained"))
             
         except Exception as e:
             logger.error(f"Credential enrichment error: {e}")
@@ -525,23 +501,20 @@ Focus on Indian job market and NSQF framework.
         
         return list(set([s for s in cleaned_skills if s]))
 
-    def _call_llm(self, prompt: str) -> dict:
+    def _call_llm(self, prompt: str, task: str, required_keys: tuple = ()) -> dict:
+        """Run a JSON prompt on the model tier routed for `task` (see GroqService routes)"""
         messages = [
             {"role": "system", "content": "You are an AI career advisor. You MUST respond ONLY with valid JSON."},
             {"role": "user", "content": prompt}
         ]
-        response = groq_service.chat_completion(messages, temperature=0.3, use_json_mode=True)
-        if response:
-            try:
-                # Clean up response
-                cleaned = response.strip()
-                if cleaned.startswith('```json'): cleaned = cleaned[7:]
-                if cleaned.startswith('```'): cleaned = cleaned[3:]
-                if cleaned.endswith('```'): cleaned = cleaned[:-3]
-                return json.loads(cleaned.strip())
-            except json.JSONDecodeError:
-                logger.error("JSON decode error in _call_llm")
-                return {}
-        return {}
+        try:
+            result = groq_service.json_completion(
+                messages, task=task,
+                validate=lambda r: isinstance(r, dict) and all(key in r for key in required_keys)
+            )
+        except json.JSONDecodeError:
+            logger.error("JSON decode error in _call_llm")
+            return {}
+        return result or {}
 
 recommendation_service = RecommendationService()
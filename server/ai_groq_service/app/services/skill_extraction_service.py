@@ -1,21 +1,111 @@
 import logging
 import json
+import os
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from app.services.groq_service import groq_service
+from app.metrics import BATCH_EXTRACTION_ITEMS, EXTRACTION_PROMPT_TOKENS, track_stage
 
 logger = logging.getLogger(__name__)
 
+EXTRACTION_SYSTEM_PROMPT = (
+    "You are an expert at extracting structured data from educational certificates,Match this certificate to the best NSQF level, QP, NOS, and Skills, always there is potential nsqf mapping , with job roles , skiil. Always return valid JSON."
+)
+
+# Per-certificate output schema and rules, shared by the single and batched prompts
+EXTRACTION_SCHEMA = """{
+  "skills": [
+    {
+      "name": "Python",
+      "category": "Programming Languages",
+      "proficiency_level": "Intermediate",
+      "confidence": 0.95
+    }
+  ],
+  "nsqf": {
+    "level": 5,
+    "confidence": 0.85,
+    "reasoning": "Certificate covers intermediate programming with practical applications"
+  },
+  "nsqf_alignment": {
+    "aligned": true,
+    "job_role": "Software Developer",
+    "qp_code": "QP123",
+    "nos_code": null,
+    "nsqf_level": 5,
+    "confidence": 0.9,
+    "reasoning": "Matches Job Role X description"
+  },
+  "keywords": ["python", "programming"],
+  "certificate_metadata": {
+    "course_name": "Python Programming Course",
+    "duration": "3 months",
+    "completion_date": "2024-01",
+    "grade_or_score": "A",
+    "certificate_number": "CERT123"
+  },
+  "description": "Programming certificate covering Python and data analysis fundamentals"
+}
+"""
+
+EXTRACTION_RULES = """1. skills: Array of objects with name, category, proficiency_level, confidence (0.0-1.0)
+2. nsqf: Object with level (1-10), confidence (0.0-1.0), reasoning (string)
+3. nsqf_alignment: Object with aligned (bool), job_role (string or null), qp_code/nos_code (string or null), nsqf_level (int), confidence (float), reasoning (string). Extract job_role from the NSQF context matches. If no strong match in context, set aligned to false and job_role to null.
+4. keywords: Array of lowercase strings for search
+5. certificate_metadata: Extract available info (all fields optional)
+6. description: Brief 1-2 sentence summary
+"""
+
+BATCH_SYSTEM_PROMPT = (
+    "You are an expert at extracting structured data from educational certificates. You are given a batch of certificates; "
+    "match each one to the best NSQF level, QP, NOS, and Skills independently of the others. Always return valid JSON."
+)
+
+
+def _estimate_tokens(messages: list) -> int:
+    """Rough prompt size in tokens (~4 characters per token), matching the benchmark stub"""
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4
+
+
+def _is_extraction(result: Any) -> bool:
+    return (
+        isinstance(result, dict)
+        and isinstance(result.get("skills"), list)
+        and isinstance(result.get("certificate_metadata", {}), dict)
+    )
+
+
+def compact_text(text: str, limit: int = 3000) -> str:
+    """
+    Shrink OCR text before it goes into a prompt: collapse runs of spaces,
+    drop blank lines and lines repeated verbatim (page headers/footers), then
+    cut to `limit` characters.
+    """
+    lines, seen = [], set()
+    for line in (text or "").splitlines():
+        line = " ".join(line.split())
+        if not line or line.lower() in seen:
+            continue
+        seen.add(line.lower())
+        lines.append(line)
+    return "\n".join(lines)[:limit]
+
 
 class SkillExtractionService:
     """Service for extracting skills and metadata from certificate text"""
     
+    def __init__(self):
+        # Certificates per batched prompt, and per-certificate text budget after compaction
+        self.batch_size = int(os.getenv("SKILL_BATCH_SIZE", 5))
+        self.batch_text_chars = int(os.getenv("SKILL_BATCH_TEXT_CHARS", 3000))
+    
     def extract_skills_and_metadata(
         self, 
         extracted_text: str, 
         certificate_title: str,
         issuer_name: str,
-        nsqf_context: list = None
+        nsqf_context: list = None,
+        task: str = "skill_extraction"
     ) -> Dict[str, Any]:
         """
         Extract skills, NSQF level, keywords, and metadata from certificate text
@@ -25,6 +115,7 @@ class SkillExtractionService:
             certificate_title: Title of the certificate
             issuer_name: Name of the issuing organization
             nsqf_context: List of potential NSQF matches from knowledge base
+            task: Model routing key (see GroqService routes); "id_fallback" runs on the fast tier
             
         Returns:
             Dictionary with skills, nsqf, keywords, and metadata
@@ -34,47 +125,161 @@ class SkillExtractionService:
             print("Certificate Title: ", certificate_title)
             print("Issuer Name: ", issuer_name)
             print("NSQF Context: ", nsqf_context)
-            prompt = self._build_extraction_prompt(extracted_text, certificate_title, issuer_name, nsqf_context)
+            with track_stage("prompt_build"):
+                prompt = self._build_extraction_prompt(extracted_text, certificate_title, issuer_name, nsqf_context)
             
             messages = [
                 {
                     "role": "system", 
-                    "content": "You are an expert at extracting structured data from educational certificates,Match this certificate to the best NSQF level, QP, NOS, and Skills, always there is potential nsqf mapping , with job roles , skiil. Always return valid JSON."
+                    "content": EXTRACTION_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ]
+            EXTRACTION_PROMPT_TOKENS.labels(mode="single").observe(_estimate_tokens(messages))
             
-            response = groq_service.chat_completion(messages, temperature=0.1)
+            # Parsed with parse_llm_json (strips markdown fences, extracts/repairs malformed output);
+            # fast-tier output that doesn't match the expected shape is retried on the large model
+            result = groq_service.json_completion(messages, task=task, use_json_mode=False, validate=_is_extraction)
             
-            if response:
-                # Clean the response - remove markdown code blocks if present
-                cleaned_response = response.strip()
-                if cleaned_response.startswith('```json'):
-                    cleaned_response = cleaned_response[7:]
-                if cleaned_response.startswith('```'):
-                    cleaned_response = cleaned_response[3:]
-                if cleaned_response.endswith('```'):
-                    cleaned_response = cleaned_response[:-3]
-                cleaned_response = cleaned_response.strip()
-                
-                # Parse JSON
-                result = json.loads(cleaned_response)
-                
+            if result:
                 # Validate and normalize the structure
                 return self._validate_and_normalize(result)
             else:
                 return self._empty_extraction()
                 
         except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e}. Response: {response[:500] if response else 'None'}")
+            logger.error(f"JSON parse error: {e}. Response: {e.doc[:500] if e.doc else 'None'}")
             return self._empty_extraction()
         except Exception as e:
             logger.error(f"Skill extraction error: {e}")
             return self._empty_extraction()
     
+    def extract_batch(self, items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Extract skills and metadata for many certificates with fewer LLM calls
+        
+        Certificates are packed into prompts of up to `batch_size` (SKILL_BATCH_SIZE)
+        that share one schema header and one de-duplicated NSQF reference list.
+        Each certificate's text is compacted and tagged with an ID, and the answer
+        is split back per ID. Certificates missing from the answer or failing
+        validation are retried one at a time with extract_skills_and_metadata.
+        
+        Args:
+            items: Dicts with extracted_text, certificate_title, issuer_name and optional nsqf_context
+            batch_size: Certificates per prompt
+            
+        Returns:
+            One extraction dict per item, in input order (same shape as extract_skills_and_metadata)
+        """
+        batch_size = max(1, batch_size or self.batch_size)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        
+        for start in range(0, len(items), batch_size):
+            indices = list(range(start, min(start + batch_size, len(items))))
+            if len(indices) > 1:
+                answers = self._run_batch([items[i] for i in indices])
+                for offset, i in enumerate(indices):
+                    if answers.get(f"c{offset + 1}") is not None:
+                        results[i] = answers[f"c{offset + 1}"]
+                        BATCH_EXTRACTION_ITEMS.labels(outcome="batched").inc()
+            
+            for i in indices:
+                if results[i] is None:
+                    if len(indices) > 1:
+                        BATCH_EXTRACTION_ITEMS.labels(outcome="retried").inc()
+                    results[i] = self.extract_skills_and_metadata(
+                        extracted_text=items[i].get("extracted_text", ""),
+                        certificate_title=items[i].get("certificate_title", ""),
+                        issuer_name=items[i].get("issuer_name", ""),
+                        nsqf_context=items[i].get("nsqf_context")
+                    )
+        
+        return results
+    
+    def _run_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """One batched call; returns normalized results keyed by certificate ID (c1, c2, ...), valid ones only"""
+        try:
+            with track_stage("prompt_build"):
+                prompt = self._build_batch_prompt(items)
+            messages = [
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            EXTRACTION_PROMPT_TOKENS.labels(mode="batch").observe(_estimate_tokens(messages) / len(items))
+            
+            result = groq_service.json_completion(
+                messages, task="skill_extraction_batch", use_json_mode=True,
+                validate=lambda r: isinstance(r, dict) and isinstance(r.get("certificates"), list)
+            )
+        except json.JSONDecodeError as e:
+            logger.error(f"Batch extraction JSON parse error: {e}. Response: {e.doc[:500] if e.doc else 'None'}")
+            return {}
+        except Exception as e:
+            logger.error(f"Batch extraction error: {e}")
+            return {}
+        
+        answers = {}
+        entries = result.get("certificates") if isinstance(result, dict) else None
+        for entry in entries or []:
+            if isinstance(entry, dict) and _is_extraction(entry):
+                answers[str(entry.get("id", "")).strip().lower()] = self._validate_and_normalize(entry)
+        
+        missing = len(items) - sum(1 for n in range(len(items)) if f"c{n + 1}" in answers)
+        if missing:
+            logger.warning(f"Batch extraction: {missing} of {len(items)} certificates missing or invalid; retrying individually")
+        return answers
+    
+    def _build_batch_prompt(self, items: List[Dict[str, Any]]) -> str:
+        """Build one prompt for several certificates: shared schema and NSQF references, per-item IDs"""
+        
+        # NSQF candidates are listed once and referenced per certificate; cohorts usually share them
+        references: Dict[tuple, str] = {}
+        reference_lines = []
+        blocks = []
+        for n, item in enumerate(items, start=1):
+            refs = []
+            for ctx in (item.get("nsqf_context") or [])[:5]:
+                key = (ctx.get('qp_code', 'N/A'), ctx.get('job_role', 'N/A'), ctx.get('nsqf_level', 'N/A'))
+                if key not in references:
+                    references[key] = f"R{len(references) + 1}"
+                    desc = ctx.get('description', '')[:100]
+                    reference_lines.append(
+                        f"{references[key]}: QP Code: {key[0]}, Role: {key[1]}, Level: {key[2]}, Desc: {desc}"
+                    )
+                refs.append(references[key])
+            
+            block = (
+                f"### Certificate c{n}\n"
+                f"Title: {item.get('certificate_title', '')}\n"
+                f"Issuer: {item.get('issuer_name', '')}\n"
+            )
+            if refs:
+                block += f"Potential NSQF Matches: {', '.join(refs)}\n"
+            block += f"Text: {compact_text(item.get('extracted_text', ''), self.batch_text_chars)}\n"
+            blocks.append(block)
+        
+        reference_str = ""
+        if reference_lines:
+            reference_str = "NSQF reference list (certificates cite these by ID):\n" + "\n".join(reference_lines) + "\n"
+        certificates = "\n".join(blocks)
+        
+        return f"""
+Extract skills, NSQF level, and keywords from each of the {len(items)} certificates below. Treat every certificate independently.
+
+{reference_str}
+{certificates}
+For EACH certificate return one object in this EXACT format, plus its "id":
+{EXTRACTION_SCHEMA}
+Rules:
+{EXTRACTION_RULES}7. Use only the NSQF references listed for that certificate when filling nsqf_alignment.
+
+Return JSON of the form {{"certificates": [{{"id": "c1", ...}}, {{"id": "c2", ...}}]}} with exactly one entry per certificate ID.
+IMPORTANT: Return ONLY the JSON object, nothing else. No markdown, no explanations.
+"""
+    
     def _validate_and_normalize(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and normalize the extracted data structure"""
         
@@ -176,48 +381,9 @@ Text: {text_preview}
 {context_str}
 
 Return JSON in this EXACT format:
-{{
-  "skills": [
-    {{
-      "name": "Python",
-      "category": "Programming Languages",
-      "proficiency_level": "Intermediate",
-      "confidence": 0.95
-    }}
-  ],
-  "nsqf": {{
-    "level": 5,
-    "confidence": 0.85,
-    "reasoning": "Certificate covers intermediate programming with practical applications"
-  }},
-  "nsqf_alignment": {{
-    "aligned": true,
-    "job_role": "Software Developer",
-    "qp_code": "QP123",
-    "nos_code": null,
-    "nsqf_level": 5,
-    "confidence": 0.9,
-    "reasoning": "Matches Job Role X description"
-  }},
-  "keywords": ["python", "programming"],
-  "certificate_metadata": {{
-    "course_name": "Python Programming Course",
-    "duration": "3 months",
-    "completion_date": "2024-01",
-    "grade_or_score": "A",
-    "certificate_number": "CERT123"
-  }},
-  "description": "Programming certificate covering Python and data analysis fundamentals"
-}}
-
+{EXTRACTION_SCHEMA}
 Rules:
-1. skills: Array of objects with name, category, proficiency_level, confidence (0.0-1.0)
-2. nsqf: Object with level (1-10), confidence (0.0-1.0), reasoning (string)
-3. nsqf_alignment: Object with aligned (bool), job_role (string or null), qp_code/nos_code (string or null), nsqf_level (int), confidence (float), reasoning (string). Extract job_role from the NSQF context matches. If no strong match in context, set aligned to false and job_role to null.
-4. keywords: Array of lowercase strings for search
-5. certificate_metadata: Extract available info (all fields optional)
-6. description: Brief 1-2 sentence summary
-
+{EXTRACTION_RULES}
 IMPORTANT: Return ONLY the JSON object, nothing else. No markdown, no explanations.
 """
     
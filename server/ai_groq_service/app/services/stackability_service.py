@@ -1,79 +1,264 @@
 import logging
 import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from app.services.groq_service import groq_service
 from app.models.schemas import StackabilityRequest
+from app.metrics import STACKABILITY_TEMPLATES
 
 logger = logging.getLogger(__name__)
 
+TemplateKey = Tuple[str, Optional[float], str, str]
+
+# Level and filler words that say nothing about which skill a name refers to
+GENERIC_SKILL_WORDS = frozenset({
+    "a", "an", "and", "the", "of", "for", "in", "on", "to", "with", "using",
+    "basic", "basics", "fundamentals", "foundation", "foundations", "introduction", "intro",
+    "beginner", "intermediate", "advanced", "expert", "level", "skills", "course", "certificate",
+})
+
+
+def normalize_skill(name: str) -> str:
+    """Lowercase, keep letters/digits/+/#, collapse whitespace: "Python 3.x (Advanced)" -> "python 3 x advanced" """
+    return " ".join(re.sub(r"[^a-z0-9+#]+", " ", str(name).lower()).split())
+
+
+def skill_tokens(name: str) -> frozenset:
+    """Whole words of a normalized skill name, minus generic ones: "javascript basics" -> {"javascript"}"""
+    return frozenset(word for word in name.split() if word not in GENERIC_SKILL_WORDS)
+
+
+class TemplateCache:
+    """Bounded in-memory map of qualification key -> pathway template, least recently used evicted first"""
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 2000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[TemplateKey, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: TemplateKey) -> Optional[dict]:
+        with self._lock:
+            entry = self._templates.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl_seconds:
+                del self._templates[key]
+                return None
+            self._templates.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: TemplateKey, template: dict):
+        with self._lock:
+            self._templates[key] = (time.time(), template)
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [
+                {"key": list(key), "age_seconds": round(time.time() - created, 1), "pathways": len(template["pathways"])}
+                for key, (created, template) in self._templates.items()
+            ]
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._templates)
+            self._templates.clear()
+            return count
+
+
 class StackabilityService:
     """Service for analyzing stackable pathways using NSQF data and user skills"""
 
+    def __init__(self):
+        # Pathway templates depend only on the qualification, so one LLM call serves
+        # every learner holding it; learner progress is computed locally
+        self.templates = TemplateCache(
+            ttl_seconds=float(os.getenv("STACKABILITY_TEMPLATE_TTL_SECONDS", 86400)),
+            max_entries=int(os.getenv("STACKABILITY_TEMPLATE_MAX_ENTRIES", 2000))
+        )
+        # key -> [lock, callers holding or waiting on it]; dropped when the last one leaves
+        self._key_locks: Dict[TemplateKey, list] = {}
+        self._key_locks_guard = threading.Lock()
+
     def generate_stackable_path(self, request: StackabilityRequest) -> dict:
         try:
-            # Construct context from request
-            context = {
-                "qualification_code": request.code,
-                "nsqf_level": request.level,
-                "progression_pathway": request.progression_pathway,
-                "qualification_type": request.qualification_type,
-                "sector": request.sector_name,
-                "training_hours": request.training_delivery_hours,
-                "notational_hours": f"{request.min_notational_hours}-{request.max_notational_hours}",
-                "proposed_occupation": request.proposed_occupation,
-                "learner_skills": request.skills
-            }
-
-            prompt = f"""
-            Analyze the learner's current skills against the requirements for relevant NSQF job roles/pathways based on the input qualification.
-            
-            Input Qualification Context:
-            {json.dumps(context, indent=2)}
-            
-            Task:
-            1. Identify 1-3 relevant "Stackable Pathways".
-            2. For each pathway, break down the required skills.
-            3. Compare learner's skills to these requirements.
-            4. Assign "credits" (arbitrary units, e.g., 1-5) to each skill based on complexity. 
-            5. Mark status as "completed" (if learner has it), "missing" (if not), or "in_progress".
-            
-            Generate a JSON response with this EXACT structure:
-            {{
-              "pathways": [
-                {{
-                  "pathway_title": "Title (e.g. Full Stack Developer - NSQF Level 5)",
-                  "description": "Brief description of this career progression...",
-                  "next_credential": "Name of the next logical certification",
-                  "estimated_duration": "Estimated time to complete (e.g. 3-6 months)",
-                  "progress_percentage": 50,
-                  "skills": [
-                    {{ "name": "Skill A", "credits_earned": 2, "credits_total": 2, "status": "completed" }},
-                    {{ "name": "Skill B", "credits_earned": 0, "credits_total": 4, "status": "missing" }}
-                  ]
-                }}
-              ]
-            }}
-            
-            Focus on the Indian job market context.
-            """
-            
-            messages = [
-                {"role": "system", "content": "You are an expert in the National Skills Qualification Framework (NSQF). Provide structured JSON output matching the requested schema exactly."},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = groq_service.chat_completion(messages, temperature=0.3, use_json_mode=True)
-            
-            if response:
-                cleaned = response.strip()
-                if cleaned.startswith('```json'): cleaned = cleaned[7:]
-                if cleaned.startswith('```'): cleaned = cleaned[3:]
-                if cleaned.endswith('```'): cleaned = cleaned[:-3]
-                return json.loads(cleaned.strip())
-            
-            return {"pathways": []}
+            template = self.get_template(request)
+            return self.apply_template(template, request.skills)
 
         except Exception as e:
             logger.error(f"Stackability analysis failed: {e}")
             raise
 
+    def template_key(self, request: StackabilityRequest) -> TemplateKey:
+        """(qp_code, level, sector, occupation); the occupation only counts when there is no code"""
+        code = (request.code or "").strip().upper()
+        level = round(request.level, 1) if request.level is not None else None
+        sector = (request.sector_name or "").strip().lower()
+        occupation = "" if code else (request.proposed_occupation or "").strip().lower()
+        return (code, level, sector, occupation)
+
+    def get_template(self, request: StackabilityRequest) -> dict:
+        """Cached pathway template for the request's qualification, generated on first use"""
+        key = self.template_key(request)
+        template = self.templates.get(key)
+        if template is not None:
+            STACKABILITY_TEMPLATES.labels(outcome="hit").inc()
+            return template
+
+        # One generation per key: concurrent misses wait for the first instead of calling the LLM too.
+        # The lock stays registered while anyone holds or waits on it, so a caller
+        # arriving before the cache is filled always queues on the same lock.
+        with self._key_locks_guard:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                template = self.templates.get(key)
+                if template is not None:
+                    STACKABILITY_TEMPLATES.labels(outcome="hit").inc()
+                    return template
+                STACKABILITY_TEMPLATES.labels(outcome="miss").inc()
+                template = self._generate_template(request)
+                if template["pathways"]:
+                    # Empty answers aren't cached, so the next learner retries
+                    self.templates.put(key, template)
+                return template
+        finally:
+            with self._key_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _generate_template(self, request: StackabilityRequest) -> dict:
+        # Construct context from request; learner skills are deliberately left out
+        context = {
+            "qualification_code": request.code,
+            "nsqf_level": request.level,
+            "progression_pathway": request.progression_pathway,
+            "qualification_type": request.qualification_type,
+            "sector": request.sector_name,
+            "training_hours": request.training_delivery_hours,
+            "notational_hours": f"{request.min_notational_hours}-{request.max_notational_hours}",
+            "proposed_occupation": request.proposed_occupation
+        }
+
+        prompt = f"""
+        Describe the stackable progression pathways for holders of the input qualification. The same answer is reused for every learner holding it, so do not assume anything about an individual learner.
+
+        Input Qualification Context:
+        {json.dumps(context, indent=2)}
+
+        Task:
+        1. Identify 1-3 relevant "Stackable Pathways".
+        2. For each pathway, break down the required skills.
+        3. Assign "credits" (arbitrary units, e.g., 1-5) to each skill based on complexity.
+        4. For each skill list common alternative names a certificate might use for it.
+
+        Generate a JSON response with this EXACT structure:
+        {{
+          "pathways": [
+            {{
+              "pathway_title": "Title (e.g. Full Stack Developer - NSQF Level 5)",
+              "description": "Brief description of this career progression...",
+              "next_credential": "Name of the next logical certification",
+              "estimated_duration": "Estimated time to complete (e.g. 3-6 months)",
+              "skills": [
+                {{ "name": "Skill A", "credits_total": 2, "aliases": ["Skill A basics"] }},
+                {{ "name": "Skill B", "credits_total": 4, "aliases": [] }}
+              ]
+            }}
+          ]
+        }}
+
+        Focus on the Indian job market context.
+        """
+
+        messages = [
+            {"role": "system", "content": "You are an expert in the National Skills Qualification Framework (NSQF). Provide structured JSON output matching the requested schema exactly."},
+            {"role": "user", "content": prompt}
+        ]
+
+        result = groq_service.json_completion(messages, task="stackability")
+        return self._normalize_template(result)
+
+    def _normalize_template(self, result: Any) -> dict:
+        """Keep well-formed pathways and precompute each skill's normalized names for matching"""
+        pathways = []
+        for pathway in (result or {}).get("pathways", []) if isinstance(result, dict) else []:
+            if not isinstance(pathway, dict) or not pathway.get("pathway_title"):
+                continue
+            skills = []
+            for skill in pathway.get("skills", []) or []:
+                if isinstance(skill, str):
+                    skill = {"name": skill}
+                if not isinstance(skill, dict) or not skill.get("name"):
+                    continue
+                try:
+                    credits_total = max(1, int(skill.get("credits_total") or 1))
+                except (TypeError, ValueError):
+                    credits_total = 1
+                names = {normalize_skill(skill["name"])}
+                names.update(normalize_skill(alias) for alias in skill.get("aliases", []) or [] if alias)
+                skills.append({
+                    "name": str(skill["name"]),
+                    "credits_total": credits_total,
+                    "match_names": sorted(n for n in names if n)
+                })
+            pathways.append({
+                "pathway_title": str(pathway["pathway_title"]),
+                "description": str(pathway.get("description", "")),
+                "next_credential": str(pathway.get("next_credential", "")),
+                "estimated_duration": str(pathway.get("estimated_duration", "")),
+                "skills": skills
+            })
+        return {"pathways": pathways}
+
+    def apply_template(self, template: dict, learner_skills: List[str]) -> dict:
+        """
+        Fill in learner progress against a template without calling the LLM.
+        A required skill is completed when a learner skill matches its name or an
+        alias after normalization, in_progress (half credits) when one side's whole
+        words, ignoring generic ones like "basics" or "advanced", are all among the
+        other's ("aws" vs "aws lambda"), otherwise missing. Words are compared
+        whole, so "java" never counts towards "javascript".
+        """
+        learner = {normalize_skill(s) for s in learner_skills or [] if s}
+        learner.discard("")
+        learner_tokens = [tokens for tokens in (skill_tokens(s) for s in learner) if tokens]
+
+        pathways = []
+        for pathway in template["pathways"]:
+            skills = []
+            earned_sum = total_sum = 0
+            for skill in pathway["skills"]:
+                total = skill["credits_total"]
+                if any(name in learner for name in skill["match_names"]):
+                    status, earned = "completed", total
+                elif any(
+                    required and (tokens <= required or required <= tokens)
+                    for required in map(skill_tokens, skill["match_names"]) for tokens in learner_tokens
+                ):
+                    status, earned = "in_progress", total // 2
+                else:
+                    status, earned = "missing", 0
+                skills.append({"name": skill["name"], "credits_earned": earned, "credits_total": total, "status": status})
+                earned_sum += earned
+                total_sum += total
+            pathways.append({
+                "pathway_title": pathway["pathway_title"],
+                "description": pathway["description"],
+                "next_credential": pathway["next_credential"],
+                "estimated_duration": pathway["estimated_duration"],
+                "progress_percentage": round(100 * earned_sum / total_sum) if total_sum else 0,
+                "skills": skills
+            })
+        return {"pathways": pathways}
+
 stackability_service = StackabilityService()
@@ -0,0 +1,113 @@
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from app.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+
+
+class SpooledUpload:
+    """An upload copied to a named temp file: pass `path` to services instead of bytes"""
+
+    def __init__(self, path: str, filename: str, content_type: Optional[str], size: int):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+
+@asynccontextmanager
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None):
+    """
+    Stream an UploadFile to a named temp file in CHUNK_SIZE pieces and delete it
+    on exit. Raises 413 as soon as `max_bytes` is exceeded.
+
+    Usage:
+        async with spool_upload(file) as upload:
+            text = ocr_service.extract_text(upload.path, upload.filename)
+    """
+    limit = max_upload_bytes() if max_bytes is None else max_bytes
+    suffix = os.path.splitext(file.filename or "")[1]
+    tmp = tempfile.NamedTemporaryFile(
+        prefix="upload_", suffix=suffix, dir=os.getenv("UPLOAD_SPOOL_DIR") or None, delete=False
+    )
+    size = 0
+    try:
+        try:
+            with track_stage("file_read"):
+                while True:
+                    chunk = await file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if limit and size > limit:
+                        raise _too_large(limit)
+                    await run_in_threadpool(tmp.write, chunk)
+        finally:
+            tmp.close()
+
+        upload = SpooledUpload(tmp.name, file.filename or "uploaded_file", file.content_type, size)
+        logger.info(f"Spooled upload {upload.filename}: {size} bytes")
+        yield upload
+    finally:
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware enforcing MAX_UPLOAD_BYTES on request bodies while they are
+    received: an oversized Content-Length is rejected before the body is read,
+    and a body without one is cut off with 413 once it passes the limit.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": _too_large(self.max_bytes).detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPException from body parsing, so this becomes a 413
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,51 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies per key (e.g. model name)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """The pct-th percentile latency for key, or None until min_samples are recorded"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedges to a share of calls: every call deposits
+    `ratio` tokens (up to `burst`), every hedge spends one. With ratio=0.05 at
+    most ~5% of calls are hedged over time, however slow the backend gets.
+    """
+
+    def __init__(self, ratio: float = 0.05, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
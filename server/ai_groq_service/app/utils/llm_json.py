@@ -0,0 +1,188 @@
+import json
+import logging
+from typing import Any, List, Optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from app.metrics import LLM_JSON_PARSES, track_stage
+
+logger = logging.getLogger(__name__)
+
+# Truncated output is repaired by dropping trailing members one at a time;
+# give up after this many attempts
+MAX_REPAIR_ATTEMPTS = 5
+
+
+def _loads(text: str) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can catch either
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` markdown fence"""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        first_newline = cleaned.find("\n")
+        cleaned = cleaned[first_newline + 1:] if first_newline != -1 else cleaned[3:]
+        if cleaned.lstrip().lower().startswith("json"):
+            cleaned = cleaned.lstrip()[4:]
+    if cleaned.endswith("```"):
+        cleaned = cleaned[:-3]
+    return cleaned.strip()
+
+
+def _block_end(text: str, start: int) -> Optional[int]:
+    """Index just past the bracket closing the one at `start`, or None if it never closes"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for idx in range(start, len(text)):
+        ch = text[idx]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return idx + 1
+    return None
+
+
+def extract_json_block(text: str) -> Optional[str]:
+    """
+    Return the outermost balanced {...} or [...] in text, skipping brackets
+    inside strings. A [ before the first { only wins when its block encloses
+    that object ("Here you go: [{...}, {...}]"); a bracket that closes first is
+    prose ("Note [1]: {...}") and the object is returned.
+    If the block never closes (truncated output) the remainder of the text from
+    its opening bracket is returned.
+    """
+    obj_start = text.find("{")
+    arr_start = text.find("[")
+    if obj_start == -1 and arr_start == -1:
+        return None
+
+    start = obj_start
+    if arr_start != -1 and (obj_start == -1 or arr_start < obj_start):
+        arr_end = _block_end(text, arr_start)
+        if obj_start == -1 or arr_end is None or arr_end > obj_start:
+            start = arr_start
+
+    end = _block_end(text, start)
+    return text[start:end] if end is not None else text[start:]
+
+
+def _remove_trailing_commas(text: str) -> str:
+    out: List[str] = []
+    in_string = False
+    escaped = False
+    for idx, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[idx + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def _close_truncated(text: str) -> str:
+    """Terminate an open string and close every open bracket"""
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    repaired = text + ('"' if in_string else "")
+    repaired = repaired.rstrip()
+    if repaired.endswith(","):
+        repaired = repaired[:-1]
+    elif repaired.endswith(":"):
+        repaired += " null"
+    return repaired + "".join(reversed(stack))
+
+
+def _repair(block: str) -> Any:
+    candidate = block
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        try:
+            return _loads(_close_truncated(_remove_trailing_commas(candidate)))
+        except json.JSONDecodeError:
+            # Drop the last (probably cut-off) member and try again
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                break
+            candidate = candidate[:cut]
+    raise json.JSONDecodeError("Unrepairable JSON", block, 0)
+
+
+def parse_llm_json(response: str) -> Any:
+    """
+    Parse JSON produced by an LLM.
+
+    Tries, in order: the response as-is (minus markdown fences), the first
+    balanced JSON object/array found in surrounding prose, and finally a
+    repaired version of that block (trailing commas removed, truncated
+    strings and brackets closed, cut-off trailing members dropped).
+    Raises json.JSONDecodeError if nothing parses.
+    """
+    with track_stage("json_parse"):
+        cleaned = strip_code_fences(response or "")
+        try:
+            result = _loads(cleaned)
+            LLM_JSON_PARSES.labels(outcome="clean").inc()
+            return result
+        except json.JSONDecodeError as e:
+            original_error = e
+
+        block = extract_json_block(cleaned)
+        if block is not None:
+            if block != cleaned:
+                try:
+                    result = _loads(block)
+                    LLM_JSON_PARSES.labels(outcome="extracted").inc()
+                    return result
+                except json.JSONDecodeError:
+                    pass
+            try:
+                result = _repair(block)
+                LLM_JSON_PARSES.labels(outcome="repaired").inc()
+                logger.warning("Repaired malformed LLM JSON output")
+                return result
+            except json.JSONDecodeError:
+                pass
+
+        LLM_JSON_PARSES.labels(outcome="failed").inc()
+        raise original_error
@@ -0,0 +1,119 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Modules imported lazily by the routes, in the order they are preloaded.
+# Importing a service module also builds its singleton.
+WARMUP_MODULES = [
+    "app.services.groq_service",
+    "app.services.recommendation_service",
+    "app.services.employer_chatbot_service",
+    "app.services.skill_extraction_service",
+    "app.services.ocr_service",
+    "app.services.pdf_service",
+]
+
+_state = {
+    "started": False,
+    "completed": False,
+    "timings_ms": {},
+    "errors": {},
+}
+_lock = threading.Lock()
+
+
+def preload_modules() -> Dict[str, float]:
+    """Import every heavy service module now and return per-module import time in ms"""
+    timings = {}
+    for module_name in WARMUP_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.error(f"Warm-up failed to import {module_name}: {e}")
+            _state["errors"][module_name] = str(e)
+            continue
+        timings[module_name] = round((time.perf_counter() - start) * 1000, 1)
+        _state["timings_ms"][module_name] = timings[module_name]
+    return timings
+
+
+def prime_caches():
+    """
+    Exercise renderers once so state they build lazily (PIL format plugins,
+    reportlab font metrics, qrcode tables) exists before the first request,
+    or before workers fork when preloaded by gunicorn.conf.py
+    """
+    start = time.perf_counter()
+    try:
+        from PIL import Image
+        Image.init()
+        from app.services.pdf_service import pdf_service
+        pdf_service.create_qr_page("https://micromerit.example/warmup")
+    except Exception as e:
+        logger.error(f"Warm-up failed to prime caches: {e}")
+        _state["errors"]["prime_caches"] = str(e)
+        return
+    _state["timings_ms"]["prime_caches"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _run():
+    start = time.perf_counter()
+    preload_modules()
+    prime_caches()
+    _state["completed"] = True
+    logger.info(f"Warm-up complete in {(time.perf_counter() - start) * 1000:.0f} ms: {_state['timings_ms']}")
+
+
+def run_warmup() -> bool:
+    """Warm up synchronously on the calling thread (used by the production launcher before forking)"""
+    with _lock:
+        if _state["started"]:
+            return False
+        _state["started"] = True
+    _run()
+    return True
+
+
+def start_background_warmup() -> bool:
+    """
+    Preload heavy modules on a daemon thread so the server accepts traffic
+    immediately. Enabled with AI_WARMUP=true; returns whether it was started.
+    """
+    if os.getenv("AI_WARMUP", "false").lower() != "true":
+        return False
+
+    with _lock:
+        if _state["started"]:
+            return False
+        _state["started"] = True
+
+    threading.Thread(target=_run, name="ai-warmup", daemon=True).start()
+    logger.info("Background warm-up started")
+    return True
+
+
+def is_ready() -> bool:
+    """
+    Readiness: true once warm-up has completed. With warm-up disabled
+    (AI_WARMUP=false, nothing preloaded) modules load on first use and there
+    is nothing to wait for.
+    """
+    if _state["completed"]:
+        return True
+    return not _state["started"] and os.getenv("AI_WARMUP", "false").lower() != "true"
+
+
+def warmup_status() -> dict:
+    return {
+        "ready": is_ready(),
+        "started": _state["started"],
+        "completed": _state["completed"],
+        "timings_ms": dict(_state["timings_ms"]),
+        "errors": dict(_state["errors"]),
+    }
@@ -0,0 +1 @@
+# Performance benchmarks for the AI service (run as modules, e.g. `python -m benchmarks.bench_ocr_preprocessing`)
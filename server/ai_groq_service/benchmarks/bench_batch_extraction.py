@@ -0,0 +1,116 @@
+"""
+Prompt-token comparison for single vs batched skill extraction.
+
+Runs SkillExtractionService over a synthetic cohort twice: one
+extract_skills_and_metadata call per certificate, then extract_batch at each
+--batch-sizes value. The Groq client is an in-process fake that answers every
+certificate ID it finds in a batched prompt (dropping --drop-rate of them to
+exercise the per-item retry path), so no network calls are made. Prompt
+tokens are estimated as characters / 4, like benchmarks.groq_stub.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.bench_batch_extraction --certificates 100
+    python -m benchmarks.bench_batch_extraction --certificates 100 --batch-sizes 2 5 10 --drop-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import re
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("MOCK_MODE", "false")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from benchmarks.corpus import _certificate_lines  # noqa: E402
+from benchmarks.run_suite import MOCK_EXTRACTION, NSQF_CONTEXT  # noqa: E402
+
+
+class FakeClient:
+    """Stands in for groq.Groq: counts calls and prompt characters, answers batches per ID"""
+
+    def __init__(self, drop_rate: float, rng: random.Random):
+        self.drop_rate = drop_rate
+        self.rng = rng
+        self.calls = 0
+        self.prompt_chars = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **params):
+        self.calls += 1
+        text = " ".join(str(m.get("content", "")) for m in params["messages"])
+        self.prompt_chars += len(text)
+        ids = re.findall(r"### Certificate (c\d+)", text)
+        if ids:
+            entries = [
+                dict(json.loads(MOCK_EXTRACTION), id=cert_id)
+                for cert_id in ids if self.rng.random() >= self.drop_rate
+            ]
+            content = json.dumps({"certificates": entries})
+        else:
+            content = MOCK_EXTRACTION
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(text) // 4, completion_tokens=len(content) // 4),
+        )
+
+
+def build_cohort(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        cert = _certificate_lines(rng)
+        # OCR output repeats page headers and carries ragged spacing
+        text = "\n".join(["CERTIFICATE OF COMPLETION   ", ""] + cert["lines"] + ["", "Page 1 of 1"] * 3)
+        items.append({
+            "extracted_text": text,
+            "certificate_title": cert["lines"][3],
+            "issuer_name": "Skill India Centre",
+            "nsqf_context": NSQF_CONTEXT,
+        })
+    return items
+
+
+def measure(service, items, batch_size, drop_rate, seed) -> dict:
+    from app.services.groq_service import groq_service
+
+    client = FakeClient(drop_rate, random.Random(seed))
+    with mock.patch.object(groq_service, "client", client), mock.patch.object(groq_service, "hedging", False):
+        if batch_size is None:
+            results = [service.extract_skills_and_metadata(**item) for item in items]
+        else:
+            results = service.extract_batch(items, batch_size=batch_size)
+    assert len(results) == len(items) and all(r["skills"] for r in results)
+    return {
+        "llm_calls": client.calls,
+        "prompt_tokens": client.prompt_chars // 4,
+        "prompt_tokens_per_certificate": round(client.prompt_chars / 4 / len(items), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--certificates", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Share of certificates the fake leaves out of batched answers")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.services.skill_extraction_service import skill_extraction_service
+
+    items = build_cohort(args.certificates, args.seed)
+    single = measure(skill_extraction_service, items, None, 0.0, args.seed)
+    print(f"{'single':>10}: {single['llm_calls']:4d} calls, {single['prompt_tokens_per_certificate']:7.1f} prompt tokens/certificate")
+    for size in args.batch_sizes:
+        result = measure(skill_extraction_service, items, size, args.drop_rate, args.seed)
+        change = result["prompt_tokens"] / single["prompt_tokens"] - 1
+        print(
+            f"{'batch=' + str(size):>10}: {result['llm_calls']:4d} calls, "
+            f"{result['prompt_tokens_per_certificate']:7.1f} prompt tokens/certificate ({change:+.0%} vs single)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+OCR backend benchmark: pytesseract (subprocess per image) vs. tesserocr
+(long-lived in-process engine).
+
+Each backend OCRs the same preprocessed pages; the first call per backend is
+reported separately because it includes tesserocr's one-off model load.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.bench_ocr_backends --iterations 5
+"""
+import argparse
+import time
+
+from app.services.ocr_backends import PytesseractBackend, TesserocrBackend, tesserocr
+from app.services.ocr_service import OCRService
+from benchmarks.bench_ocr_preprocessing import character_accuracy, synthetic_corpus
+
+
+def run_backend(backend, pages, iterations: int) -> dict:
+    start = time.perf_counter()
+    backend.image_to_string(pages[0][0])
+    first_call = time.perf_counter() - start
+
+    timings, accuracies = [], []
+    for _ in range(iterations):
+        for image, expected in pages:
+            start = time.perf_counter()
+            text = backend.image_to_string(image)
+            timings.append(time.perf_counter() - start)
+            accuracies.append(character_accuracy(expected, text))
+
+    timings.sort()
+    return {
+        "backend": backend.name,
+        "first_call_seconds": first_call,
+        "mean_seconds": sum(timings) / len(timings),
+        "p95_seconds": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "mean_accuracy": sum(accuracies) / len(accuracies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the corpus per backend")
+    parser.add_argument("--lang", default="eng")
+    args = parser.parse_args()
+
+    service = OCRService()
+    pages = [
+        (service.preprocess_image(service.open_image(file_bytes)), expected)
+        for _, file_bytes, expected in synthetic_corpus()
+    ]
+
+    backends = [PytesseractBackend(lang=args.lang)]
+    if tesserocr is not None:
+        backends.append(TesserocrBackend(lang=args.lang))
+    else:
+        print("tesserocr not installed - benchmarking pytesseract only")
+
+    print(f"{'backend':<14}{'first call':>12}{'mean s':>10}{'p95 s':>10}{'accuracy':>10}")
+    for backend in backends:
+        r = run_backend(backend, pages, args.iterations)
+        print(
+            f"{r['backend']:<14}{r['first_call_seconds']:>12.3f}{r['mean_seconds']:>10.3f}"
+            f"{r['p95_seconds']:>10.3f}{r['mean_accuracy']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
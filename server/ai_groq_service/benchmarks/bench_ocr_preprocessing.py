@@ -0,0 +1,109 @@
+"""
+OCR preprocessing benchmark: OCR time vs. character accuracy.
+
+Runs every image in a corpus through Tesseract under several preprocessing
+configurations and reports mean time per image and mean character accuracy
+against the ground truth.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.bench_ocr_preprocessing
+    python -m benchmarks.bench_ocr_preprocessing --corpus ./samples
+
+A corpus directory holds images (.png/.jpg/.jpeg/.webp) each with a sibling
+.txt file containing the expected text. Without --corpus a small synthetic
+set of oversized "phone photos" is generated.
+"""
+import argparse
+import difflib
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import List, Tuple
+
+import pytesseract
+from PIL import Image
+
+from app.services.ocr_service import OCRService
+from benchmarks.corpus import build_corpus
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+CONFIGURATIONS = {
+    "raw": None,
+    "default": {},
+    "fixed-resolution": {"adaptive": False},
+    "binarize": {"binarize": True},
+    "deskew": {"deskew": True},
+    "binarize+deskew": {"binarize": True, "deskew": True},
+    "max-1600": {"max_dimension": 1600},
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def character_accuracy(expected: str, actual: str) -> float:
+    """Similarity ratio (0-1) between whitespace-normalized texts"""
+    return difflib.SequenceMatcher(None, _normalize(expected), _normalize(actual)).ratio()
+
+
+def synthetic_corpus(count: int = 4, seed: int = 7) -> List[Tuple[str, bytes, str]]:
+    """Oversized, slightly tilted JPEG/RGBA-PNG phone photos from the shared benchmark corpus"""
+    return [
+        (item["name"], item["bytes"], item["text"])
+        for item in build_corpus(per_kind=count, seed=seed, kinds=("phone_photo",))
+    ]
+
+
+def load_corpus(directory: Path) -> List[Tuple[str, bytes, str]]:
+    corpus = []
+    for path in sorted(directory.iterdir()):
+        truth = path.with_suffix(".txt")
+        if path.suffix.lower() in IMAGE_EXTENSIONS and truth.exists():
+            corpus.append((path.name, path.read_bytes(), truth.read_text()))
+    return corpus
+
+
+def run_configuration(name: str, overrides, corpus) -> dict:
+    service = OCRService()
+    for attr, value in (overrides or {}).items():
+        setattr(service, attr, value)
+
+    times, accuracies = [], []
+    for _, file_bytes, expected in corpus:
+        start = time.perf_counter()
+        if overrides is None:
+            # Baseline: the original path, no draft decoding or preprocessing
+            text = pytesseract.image_to_string(Image.open(BytesIO(file_bytes)))
+        else:
+            text = service.extract_text_from_image(file_bytes)
+        times.append(time.perf_counter() - start)
+        accuracies.append(character_accuracy(expected, text))
+
+    return {
+        "configuration": name,
+        "mean_seconds": sum(times) / len(times),
+        "mean_accuracy": sum(accuracies) / len(accuracies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="Directory of images with sibling .txt ground truth")
+    parser.add_argument("--configs", nargs="*", default=list(CONFIGURATIONS), help="Configurations to run")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        raise SystemExit("Corpus is empty")
+
+    print(f"Corpus: {len(corpus)} image(s)")
+    print(f"{'configuration':<18}{'s/image':>10}{'accuracy':>10}")
+    for name in args.configs:
+        result = run_configuration(name, CONFIGURATIONS[name], corpus)
+        print(f"{result['configuration']:<18}{result['mean_seconds']:>10.3f}{result['mean_accuracy']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Peak-memory regression check for scanned-PDF OCR.
+
+Builds an N-page image-only PDF, then OCRs it in a fresh interpreter per
+configuration and reports how far peak RSS (ru_maxrss) rose above the
+post-import baseline. With page-by-page rasterization the growth should stay
+roughly flat as the page count rises; rendering the whole document at once
+(OCR_RASTER_WINDOW=0) grows linearly. Exits non-zero when a streaming run
+exceeds --max-growth-mb, so CI can catch regressions.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.bench_pdf_memory --pages 40
+    python -m benchmarks.bench_pdf_memory --pages 60 --windows 1 4 0 --max-growth-mb 300
+    python -m benchmarks.bench_pdf_memory --pages 60 --rasterize-only   # no Tesseract needed
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import scanned_pdf
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, resource, sys, time
+
+def peak_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return value / (1024 * 1024) if sys.platform == "darwin" else value / 1024
+
+from app.services.ocr_service import ocr_service
+if {rasterize_only!r}:
+    ocr_service.ocr_image = lambda image: ""
+    ocr_service.ocr_with_confidence = lambda image: ("", 100.0)
+baseline = peak_mb()
+start = time.perf_counter()
+text = ocr_service._ocr_scanned_pdf({path!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "baseline_mb": baseline,
+    "peak_mb": peak_mb(),
+    "seconds": elapsed,
+    "characters": len(text),
+}}))
+"""
+
+
+def run_once(path: str, window: int, pages: int, rasterize_only: bool) -> dict:
+    code = CHILD.format(path=path, rasterize_only=rasterize_only)
+    env = dict(
+        os.environ, MOCK_MODE="true", AI_WARMUP="false",
+        OCR_RASTER_WINDOW=str(window), OCR_MAX_PAGES=str(pages),
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVICE_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["growth_mb"] = result["peak_mb"] - result["baseline_mb"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 0],
+                        help="OCR_RASTER_WINDOW values to compare (0 = whole document at once)")
+    parser.add_argument("--rasterize-only", action="store_true", help="Skip Tesseract and measure rendering alone")
+    parser.add_argument("--max-growth-mb", type=float, default=250.0,
+                        help="Fail if a windowed (non-zero) run grows peak RSS by more than this")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    item = scanned_pdf(random.Random(args.seed), pages=args.pages)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(item["bytes"])
+
+    failed = False
+    try:
+        print(f"scanned PDF: {args.pages} pages, {len(item['bytes']) / 1024:.0f} KB")
+        for window in args.windows:
+            result = run_once(tmp.name, window, args.pages, args.rasterize_only)
+            label = "whole document" if window == 0 else f"window={window}"
+            print(f"{label:>16}: peak RSS +{result['growth_mb']:7.1f} MB  ({result['seconds']:.1f}s)")
+            if window > 0 and result["growth_mb"] > args.max_growth_mb:
+                print(f"FAIL: {label} over budget ({args.max_growth_mb} MB)")
+                failed = True
+    finally:
+        os.unlink(tmp.name)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Startup-time benchmark for the AI service.
+
+Each run starts a fresh interpreter, times `import main`, then the first
+request through FastAPI's TestClient, and records which heavy dependencies
+were loaded at import time. Medians are compared against optional budgets
+so CI can fail on regressions.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --route chat --import-budget-ms 800 --first-request-budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["PIL", "pytesseract", "pdf2image", "PyPDF2", "reportlab", "qrcode", "groq"]
+
+ROUTES = {
+    "health": ("GET", "/ai/health", None),
+    "chat": ("POST", "/ai/employer-chat", {
+        "learner_email": "bench@example.com",
+        "question": "Does this candidate know Python?",
+        "credentials": [{"certificate_title": "Python Basics", "metadata": {"ai_extracted": {"skills": [{"name": "Python"}]}}}],
+    }),
+    "recommendations": ("POST", "/ai/recommendations", {
+        "learner_email": "bench@example.com",
+        "certificates": [{"certificate_title": "Python Basics", "metadata": {"skills": ["Python"]}}],
+    }),
+}
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+method, path, payload = {route!r}
+before = time.perf_counter()
+response = client.request(method, path, json=payload)
+after = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (after - before) * 1000,
+    "status_code": response.status_code,
+    "heavy_modules_at_import": loaded,
+}}))
+"""
+
+
+def run_once(route: str) -> dict:
+    code = CHILD.format(heavy=HEAVY_MODULES, route=ROUTES[route])
+    env = dict(os.environ, MOCK_MODE="true", AI_WARMUP="false")
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVICE_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--route", choices=list(ROUTES), default="health")
+    parser.add_argument("--import-budget-ms", type=float, help="Fail if median import time exceeds this")
+    parser.add_argument("--first-request-budget-ms", type=float, help="Fail if median first request exceeds this")
+    args = parser.parse_args()
+
+    runs = [run_once(args.route) for _ in range(args.runs)]
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    first_ms = statistics.median(r["first_request_ms"] for r in runs)
+
+    print(f"route: {args.route} ({args.runs} runs)")
+    print(f"import main (median):   {import_ms:8.1f} ms")
+    print(f"first request (median): {first_ms:8.1f} ms  status={runs[-1]['status_code']}")
+    print(f"heavy modules loaded at import: {runs[-1]['heavy_modules_at_import'] or 'none'}")
+
+    failed = False
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        print(f"FAIL: import time over budget ({args.import_budget_ms} ms)")
+        failed = True
+    if args.first_request_budget_ms is not None and first_ms > args.first_request_budget_ms:
+        print(f"FAIL: first request over budget ({args.first_request_budget_ms} ms)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
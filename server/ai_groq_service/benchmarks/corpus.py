@@ -0,0 +1,159 @@
+"""
+Synthetic certificate corpus for benchmarks.
+
+Every item carries the ground truth it was generated from so benchmarks can
+report accuracy as well as time:
+
+    {
+        "name": "text_pdf_0.pdf",
+        "kind": "text_pdf" | "scanned_pdf" | "phone_photo" | "transcript",
+        "bytes": b"...",
+        "certificate_number": "MMC-2024-000123",
+        "skills": ["Python", ...],
+        "text": "full expected text",
+        "pages": 1,
+    }
+"""
+import io
+import random
+from typing import Dict, List
+
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+KINDS = ("text_pdf", "scanned_pdf", "phone_photo", "transcript")
+
+LEARNERS = ["Asha Verma", "Rohan Gupta", "Meera Iyer", "Kabir Singh", "Fatima Khan", "Arjun Nair"]
+COURSES = {
+    "Python Programming for Data Analysis": ["Python", "Pandas", "Data Visualization", "SQL"],
+    "Cloud Infrastructure with AWS": ["AWS", "Docker", "Linux", "Networking"],
+    "Automotive Service Technician": ["Engine Diagnostics", "Brake Systems", "Workshop Safety"],
+    "Retail Sales Associate": ["Customer Service", "Inventory Management", "Point of Sale"],
+    "Solar PV Installer": ["Electrical Wiring", "Solar Panel Installation", "Site Assessment"],
+}
+ISSUERS = ["TechUniversity", "Skill India Centre", "NSDC Partner Institute", "Global Training Academy"]
+
+
+def _certificate_lines(rng: random.Random) -> Dict:
+    course, skills = rng.choice(list(COURSES.items()))
+    number = f"MMC-{rng.randint(2019, 2025)}-{rng.randint(0, 999999):06d}"
+    lines = [
+        "CERTIFICATE OF COMPLETION",
+        f"This is to certify that {rng.choice(LEARNERS)}",
+        "has successfully completed the course",
+        course,
+        f"Skills covered: {', '.join(skills)}",
+        f"Certificate No: {number}",
+        f"Issued by {rng.choice(ISSUERS)} on {rng.randint(1, 28)} March {rng.randint(2019, 2025)}",
+    ]
+    return {"lines": lines, "certificate_number": number, "skills": skills}
+
+
+def _font(size: int):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def _render_image(lines: List[str], size=(1654, 2339), font_size=40) -> Image.Image:
+    """Render lines onto an A4-proportioned page (150 DPI by default)"""
+    page = Image.new("RGB", size, (250, 248, 240))
+    draw = ImageDraw.Draw(page)
+    font = _font(font_size)
+    y = size[1] // 6
+    for line in lines:
+        draw.text((size[0] // 12, y), line, fill=(20, 20, 30), font=font)
+        y += int(font_size * 2.2)
+    return page
+
+
+def _draw_pdf_lines(c: canvas.Canvas, lines: List[str]):
+    width, height = A4
+    y = height - 150
+    for idx, line in enumerate(lines):
+        c.setFont("Helvetica-Bold" if idx == 0 else "Helvetica", 22 if idx == 0 else 14)
+        c.drawString(72, y, line)
+        y -= 32
+
+
+def text_pdf(rng: random.Random) -> Dict:
+    cert = _certificate_lines(rng)
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=A4)
+    _draw_pdf_lines(c, cert["lines"])
+    c.showPage()
+    c.save()
+    return {"kind": "text_pdf", "bytes": packet.getvalue(), "text": "\n".join(cert["lines"]), "pages": 1, **cert}
+
+
+def scanned_pdf(rng: random.Random, pages: int = 1) -> Dict:
+    """Image-only PDF: every page is a raster with no text layer, forcing the OCR fallback"""
+    cert = _certificate_lines(rng)
+    scan = _render_image(cert["lines"]).rotate(rng.uniform(-1.5, 1.5), fillcolor=(250, 248, 240))
+    scan_buffer = io.BytesIO()
+    scan.convert("L").save(scan_buffer, format="PNG")
+
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=A4)
+    width, height = A4
+    for _ in range(pages):
+        scan_buffer.seek(0)
+        c.drawImage(ImageReader(scan_buffer), 0, 0, width=width, height=height)
+        c.showPage()
+    c.save()
+    return {"kind": "scanned_pdf", "bytes": packet.getvalue(), "text": "\n".join(cert["lines"]), "pages": pages, **cert}
+
+
+def phone_photo(rng: random.Random, fmt: str = "JPEG") -> Dict:
+    """~12MP tilted photo of a certificate, JPEG or RGBA PNG"""
+    cert = _certificate_lines(rng)
+    photo = _render_image(cert["lines"], size=(1400, 1000), font_size=44)
+    photo = photo.resize((4000, 2857), Image.BICUBIC)
+    photo = photo.rotate(rng.uniform(-2.5, 2.5), resample=Image.BICUBIC, fillcolor=(250, 248, 240))
+
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        photo.convert("RGBA").save(buffer, format="PNG")
+    else:
+        photo.save(buffer, format="JPEG", quality=90)
+    return {"kind": "phone_photo", "bytes": buffer.getvalue(), "text": "\n".join(cert["lines"]), "pages": 1, "format": fmt, **cert}
+
+
+def transcript(rng: random.Random, pages: int = 6) -> Dict:
+    """Multi-page text-layer transcript; the certificate number appears on the first page only"""
+    cert = _certificate_lines(rng)
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=A4)
+    text_lines = list(cert["lines"])
+    _draw_pdf_lines(c, cert["lines"])
+    c.showPage()
+    for page in range(2, pages + 1):
+        lines = [f"Transcript - page {page}"] + [
+            f"Module {page}.{i}: {rng.choice(cert['skills'])} - Grade {rng.choice('ABC')}" for i in range(1, 15)
+        ]
+        text_lines.extend(lines)
+        _draw_pdf_lines(c, lines)
+        c.showPage()
+    c.save()
+    return {"kind": "transcript", "bytes": packet.getvalue(), "text": "\n".join(text_lines), "pages": pages, **cert}
+
+
+def build_corpus(per_kind: int = 3, seed: int = 42, kinds=KINDS) -> List[Dict]:
+    """Generate `per_kind` deterministic items for each requested kind"""
+    rng = random.Random(seed)
+    builders = {
+        "text_pdf": lambda i: (text_pdf(rng), "pdf"),
+        "scanned_pdf": lambda i: (scanned_pdf(rng), "pdf"),
+        "phone_photo": lambda i: (phone_photo(rng, "PNG" if i % 2 else "JPEG"), "png" if i % 2 else "jpg"),
+        "transcript": lambda i: (transcript(rng), "pdf"),
+    }
+    corpus = []
+    for kind in kinds:
+        for i in range(per_kind):
+            item, ext = builders[kind](i)
+            item["name"] = f"{kind}_{i}.{ext}"
+            corpus.append(item)
+    return corpus
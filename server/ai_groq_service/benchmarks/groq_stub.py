@@ -0,0 +1,235 @@
+"""
+Local OpenAI/Groq-compatible stand-in server for capacity planning.
+
+Serves POST /openai/v1/chat/completions (the path the Groq SDK uses) and
+/v1/chat/completions. Each request is classified by prompt type and answered
+with JSON that matches what the calling service expects, after a simulated
+delay of time-to-first-token plus completion tokens at the configured rate.
+A share of requests can be rejected with 429 to exercise retry paths.
+Requests for small models (name containing --fast-model-marker, e.g. the
+llama-3.1-8b-instant fast tier) are answered --fast-speedup times faster.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.groq_stub --port 8900 --latency lognormal:0.8:0.5 --tokens-per-second 250 --error-rate 0.02
+    GROQ_BASE_URL=http://localhost:8900 uvicorn main:app --port 8000
+
+Latency specs (seconds, before token generation):
+    constant:<s>            e.g. constant:0.5
+    uniform:<low>:<high>    e.g. uniform:0.2:1.5
+    lognormal:<median>:<sigma>
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PROMPT_TYPES = (
+    "skill_extraction", "skill_extraction_batch", "employer_chat", "stackability", "roadmap",
+    "skill_profile", "enrichment", "recommendations", "generic",
+)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "constant":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def classify(messages: List[Dict]) -> str:
+    """Identify which service built the prompt from distinctive phrases in it"""
+    text = " ".join(str(m.get("content", "")) for m in messages).lower()
+    if "batch of certificates" in text:
+        return "skill_extraction_batch"
+    if "extracting structured data from educational certificates" in text:
+        return "skill_extraction"
+    if "helping employers evaluate candidates" in text:
+        return "employer_chat"
+    if "stackable pathways" in text:
+        return "stackability"
+    if "career roadmap" in text:
+        return "roadmap"
+    if "skill profile" in text:
+        return "skill_profile"
+    if "job-related metadata" in text:
+        return "enrichment"
+    if "career recommendations" in text:
+        return "recommendations"
+    return "generic"
+
+
+def build_content(prompt_type: str, rng: random.Random, messages: List[Dict] = ()) -> dict:
+    if prompt_type == "skill_extraction_batch":
+        text = " ".join(str(m.get("content", "")) for m in messages)
+        return {"certificates": [
+            dict(build_content("skill_extraction", rng), id=cert_id)
+            for cert_id in re.findall(r"### Certificate (c\d+)", text)
+        ]}
+    skills = rng.sample(["Python", "SQL", "Docker", "AWS", "Customer Service", "Electrical Wiring", "Excel"], 3)
+    level = rng.randint(3, 6)
+    if prompt_type == "skill_extraction":
+        return {
+            "skills": [{"name": s, "category": "Technical", "proficiency_level": "Intermediate",
+                        "confidence": round(rng.uniform(0.6, 0.99), 2)} for s in skills],
+            "nsqf": {"level": level, "confidence": 0.8, "reasoning": "Stub assessment"},
+            "nsqf_alignment": {"aligned": True, "job_role": "Stub Job Role", "qp_code": "QP0001",
+                               "nos_code": None, "nsqf_level": level, "confidence": 0.8, "reasoning": "Stub"},
+            "keywords": [s.lower() for s in skills],
+            "certificate_metadata": {"course_name": "Stub Course", "duration": "3 months",
+                                     "completion_date": "2024-01", "grade_or_score": "A",
+                                     "certificate_number": f"STUB-{rng.randint(100000, 999999)}"},
+            "description": "Stub certificate description.",
+        }
+    if prompt_type == "employer_chat":
+        return {
+            "answer": f"Yes, the candidate has verified skills in {', '.join(skills)}.",
+            "relevant_skills": [{"name": s, "category": "Technical", "proficiency_level": None, "confidence": 0.9}
+                                for s in skills],
+            "certificates_referenced": ["Stub Certificate"],
+            "confidence": 0.9,
+        }
+    if prompt_type == "stackability":
+        return {"pathways": [{
+            "pathway_title": f"Stub Pathway - NSQF Level {level + 1}",
+            "description": "Stub progression pathway.",
+            "next_credential": "Stub Advanced Certificate",
+            "estimated_duration": "3-6 months",
+            "progress_percentage": 50,
+            "skills": [
+                {"name": skills[0], "credits_earned": 2, "credits_total": 2, "status": "completed"},
+                {"name": skills[1], "credits_earned": 0, "credits_total": 4, "status": "missing"},
+            ],
+        }]}
+    if prompt_type == "roadmap":
+        return {
+            "current_status": "Stub current status.",
+            "future_plans": [{"goal": "Short-term goal", "description": "Stub", "timeline": "6 months",
+                              "skills_to_acquire": {"basic": skills[:1], "intermediate": skills[1:2],
+                                                    "advanced": skills[2:]}}],
+            "conditional_paths": [{"path_name": "Path A", "condition": "If you learn X",
+                                   "outcome": "X Specialist", "next_steps": ["Step 1", "Step 2"]}],
+            "job_opportunities": [{"role": "Stub Role", "match_percentage": 80,
+                                   "missing_skills": skills[:1], "salary_range": "4-6 LPA"}],
+        }
+    if prompt_type == "skill_profile":
+        return {
+            "current_skills": [{"skill": s, "proficiency": 80, "category": "Technical", "verified_by": "Stub Issuer"}
+                               for s in skills],
+            "ready_to_apply_jobs": [{"role": "Stub Role", "match_percentage": 85, "salary_range": "4-6 LPA",
+                                     "matching_skills": skills}],
+            "field_analysis": {"current_field": "Stub Field", "achievable_roles": [
+                {"role": "Senior Stub", "gap_description": "Stub gap", "missing_skills": skills[:1],
+                 "estimated_time": "3-6 Months"}]},
+            "comprehensive_view": "Stub summary.",
+        }
+    if prompt_type == "enrichment":
+        return {
+            "related_job_roles": ["Stub Role 1", "Stub Role 2"],
+            "industry_demand": "High",
+            "avg_salary_range": "3-5 LPA",
+            "top_skills_gained": skills,
+            "job_recommendation": "Stub job recommendation.",
+        }
+    if prompt_type == "recommendations":
+        return {
+            "skills": skills,
+            "recommended_next_skills": [{"skill": "Kubernetes", "description": "Stub", "market_demand_percent": 85,
+                                         "career_outcome": "DevOps Engineer"}],
+            "role_suggestions": [{"role": "Stub Role", "required_skills": skills, "matched_skills": skills[:2],
+                                  "percent_complete": 66}],
+            "learning_path": [{"stage": "Intermediate", "skills": ["Kubernetes"], "est_time_weeks": 8}],
+            "recommended_courses": [{"title": "Stub Course", "provider": "Stub", "url": "https://example.com"}],
+            "nsqf_level": level,
+            "nsqf_confidence": 0.8,
+        }
+    return {"result": "stub"}
+
+
+def create_app(latency: str = "constant:0.5", tokens_per_second: float = 250.0,
+               error_rate: float = 0.0, seed: int = None,
+               fast_model_marker: str = "instant", fast_speedup: float = 4.0) -> FastAPI:
+    app = FastAPI(title="Groq Stub")
+    rng = random.Random(seed)
+    sample_latency = parse_latency(latency)
+    stats = {"requests": 0, "rate_limited": 0, "by_type": {t: 0 for t in PROMPT_TYPES}, "by_model": {}}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        if rng.random() < error_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": "1"},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "tokens", "code": "rate_limit_exceeded"}},
+            )
+
+        model = body.get("model", "stub")
+        stats["by_model"][model] = stats["by_model"].get(model, 0) + 1
+        messages = body.get("messages", [])
+        prompt_type = classify(messages)
+        stats["by_type"][prompt_type] += 1
+        content = json.dumps(build_content(prompt_type, rng, messages))
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        delay = sample_latency(rng) + (completion_tokens / tokens_per_second if tokens_per_second > 0 else 0)
+        if fast_model_marker and fast_model_marker in model:
+            delay /= fast_speedup
+        await asyncio.sleep(delay)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: stats, methods=["GET"])
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="lognormal:0.8:0.5", help="Time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="Completion token rate (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--fast-model-marker", default="instant", help="Substring identifying small/fast models")
+    parser.add_argument("--fast-speedup", type=float, default=4.0, help="Latency divisor for fast models")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.tokens_per_second, args.error_rate, args.seed,
+                     args.fast_model_marker, args.fast_speedup)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+End-to-end load generator for the /ai/* routes.
+
+Drives a running AI service (ideally pointed at benchmarks/groq_stub.py via
+GROQ_BASE_URL) with a weighted traffic mix from a fixed number of concurrent
+virtual users, then reports throughput and p50/p95/p99 latency per route.
+
+Usage (from server/ai_groq_service):
+    python -m benchmarks.groq_stub --port 8900 &
+    GROQ_BASE_URL=http://localhost:8900 uvicorn main:app --port 8000 &
+    python -m benchmarks.load_test --url http://localhost:8000 --profile mixed --concurrency 32 --duration 60
+
+Profiles:
+    issuance   certificate uploads (process-ocr, extract-certificate-id, append-qr)
+    dashboard  learner dashboards (recommendations, roadmap, skill profile, stackability)
+    chat       employer chatbot
+    mixed      weighted blend of all of the above
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from benchmarks.corpus import build_corpus
+
+CERTIFICATES = [
+    {
+        "certificate_title": "Python Programming for Data Analysis",
+        "issuer_name": "TechUniversity",
+        "nsqf_level": 4,
+        "metadata": {
+            "skills": ["Python", "SQL"],
+            "nos_data": {"qp_code": "SSC/Q0501", "nsqf_level": 4},
+            "ai_extracted": {"skills": [{"name": "Pandas"}], "nsqf": {"level": 4}},
+        },
+    },
+    {
+        "certificate_title": "Cloud Infrastructure with AWS",
+        "issuer_name": "Skill India Centre",
+        "metadata": {"ai_extracted": {"skills": [{"name": "AWS"}, {"name": "Docker"}], "keywords": ["cloud"]}},
+    },
+]
+
+PROFILES = {
+    "issuance": {"process-ocr": 6, "extract-certificate-id": 3, "append-qr": 1},
+    "dashboard": {"recommendations": 3, "generate-roadmap": 3, "generate-skill-profile": 2,
+                  "stackability": 1, "enrich-credential": 1},
+    "chat": {"employer-chat": 1},
+    "mixed": {"process-ocr": 3, "extract-certificate-id": 1, "append-qr": 1, "recommendations": 2,
+              "generate-roadmap": 2, "generate-skill-profile": 1, "stackability": 1,
+              "enrich-credential": 1, "employer-chat": 3},
+}
+
+
+class RequestFactory:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        corpus = build_corpus(per_kind=2, seed=seed, kinds=("text_pdf", "scanned_pdf", "phone_photo"))
+        self.uploads = corpus
+        self.pdfs = [item for item in corpus if item["name"].endswith(".pdf")]
+
+    def build(self, route: str) -> dict:
+        if route == "process-ocr":
+            item = self.rng.choice(self.uploads)
+            return {"files": {"file": (item["name"], item["bytes"])}, "data": {
+                "learner_email": "load@example.com", "certificate_title": "Load Test Certificate",
+                "issuer_name": "TechUniversity"}}
+        if route == "extract-certificate-id":
+            item = self.rng.choice(self.uploads)
+            return {"files": {"file": (item["name"], item["bytes"])}, "data": {"issuer_name": "TechUniversity"}}
+        if route == "append-qr":
+            item = self.rng.choice(self.pdfs)
+            return {"files": {"file": (item["name"], item["bytes"], "application/pdf")},
+                    "data": {"qr_data": "https://micromerit.example/verify/load"}}
+        if route == "recommendations":
+            return {"json": {"learner_email": "load@example.com", "certificates": CERTIFICATES}}
+        if route in ("generate-roadmap", "generate-skill-profile"):
+            return {"json": {"certificates": CERTIFICATES, "learner_profile": {"name": "Load Tester"}}}
+        if route == "stackability":
+            return {"json": {"code": "SSC/Q0501", "level": 4, "sector_name": "IT-ITeS", "skills": ["Python", "SQL"]}}
+        if route == "enrich-credential":
+            return {"json": {"certificate_title": "Python Programming", "nos_data": {"qp_code": "SSC/Q0501"}}}
+        if route == "employer-chat":
+            return {"json": {"learner_email": "load@example.com", "question": "Does this candidate know AWS?",
+                             "credentials": CERTIFICATES}}
+        raise ValueError(route)
+
+
+def percentile(ordered, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def virtual_user(client, factory, routes, weights, deadline, samples, errors):
+    while time.monotonic() < deadline:
+        route = factory.rng.choices(routes, weights)[0]
+        kwargs = factory.build(route)
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"/ai/{route}", **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                errors[route][str(response.status_code)] += 1
+            else:
+                samples[route].append(elapsed)
+        except httpx.HTTPError as e:
+            errors[route][type(e).__name__] += 1
+
+
+async def run(args) -> dict:
+    mix = PROFILES[args.profile]
+    routes, weights = list(mix), list(mix.values())
+    factory = RequestFactory(args.seed)
+    samples, errors = defaultdict(list), defaultdict(lambda: defaultdict(int))
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(client, factory, routes, weights, deadline, samples, errors)
+            for _ in range(args.concurrency)
+        ])
+        wall = time.monotonic() - started
+
+    report = {"profile": args.profile, "concurrency": args.concurrency, "duration_s": round(wall, 2), "routes": {}}
+    all_samples = []
+    for route in routes:
+        ordered = sorted(samples[route])
+        all_samples.extend(ordered)
+        report["routes"][route] = {
+            "ok": len(ordered),
+            "errors": dict(errors[route]),
+            "throughput_rps": round(len(ordered) / wall, 2),
+            "p50_ms": round(percentile(ordered, 0.50), 1),
+            "p95_ms": round(percentile(ordered, 0.95), 1),
+            "p99_ms": round(percentile(ordered, 0.99), 1),
+        }
+    all_samples.sort()
+    report["overall"] = {
+        "ok": len(all_samples),
+        "errors": sum(sum(e.values()) for e in errors.values()),
+        "throughput_rps": round(len(all_samples) / wall, 2),
+        "p50_ms": round(percentile(all_samples, 0.50), 1),
+        "p95_ms": round(percentile(all_samples, 0.95), 1),
+        "p99_ms": round(percentile(all_samples, 0.99), 1),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--profile", choices=list(PROFILES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    print(f"profile={report['profile']} concurrency={report['concurrency']} duration={report['duration_s']}s")
+    print(f"{'route':<26}{'ok':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, r in list(report["routes"].items()) + [("OVERALL", report["overall"])]:
+        err = r["errors"] if isinstance(r["errors"], int) else sum(r["errors"].values())
+        print(f"{route:<26}{r['ok']:>7}{err:>6}{r['throughput_rps']:>9.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
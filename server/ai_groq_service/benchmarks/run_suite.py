@@ -0,0 +1,284 @@
+"""
+Benchmark suite for the AI service hot paths over a synthetic certificate corpus.
+
+Benchmarks:
+    ocr.extract_text.<kind>               OCRService.extract_text per corpus kind
+    regex.certificate_number.<kind>       OCRService.extract_certificate_number_from_text
+    prompt.build_extraction_prompt        SkillExtractionService._build_extraction_prompt
+    skills.extract_skills_and_metadata    full extraction with the Groq client mocked
+    pdf.append_qr_page.<kind>             PDFService.append_qr_page
+    route.extract_bulk_ids                /ai/extract-bulk-ids with a ZIP of the corpus
+
+The Groq client is always replaced by an in-process fake, so no network calls
+are made. Results are written as JSON and can be compared between commits:
+
+    python -m benchmarks.run_suite --output bench-before.json
+    git checkout <other commit>
+    python -m benchmarks.run_suite --output bench-after.json --compare bench-before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+os.environ.setdefault("MOCK_MODE", "false")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from benchmarks.corpus import KINDS, build_corpus  # noqa: E402
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+MOCK_EXTRACTION = json.dumps({
+    "skills": [{"name": "Python", "category": "Programming", "proficiency_level": "Intermediate", "confidence": 0.9}],
+    "nsqf": {"level": 4, "confidence": 0.8, "reasoning": "benchmark"},
+    "nsqf_alignment": {"aligned": False, "job_role": None, "qp_code": None, "nos_code": None,
+                       "nsqf_level": 4, "confidence": 0.5, "reasoning": "benchmark"},
+    "keywords": ["python"],
+    "certificate_metadata": {"certificate_number": "MMC-2024-000001"},
+    "description": "Benchmark certificate",
+})
+
+NSQF_CONTEXT = [
+    {"qp_code": f"QP{i:04d}", "job_role": f"Job Role {i}", "nsqf_level": 4, "description": "Synthetic QP " * 20}
+    for i in range(8)
+]
+
+
+def _fake_groq_client():
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=MOCK_EXTRACTION))],
+        usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+    )
+    client = mock.MagicMock()
+    client.chat.completions.create.return_value = response
+    return client
+
+
+def summarize(samples_ms, **extra) -> dict:
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+    return {
+        "runs": n,
+        "mean_ms": round(sum(ordered) / n, 3),
+        "p50_ms": round(ordered[n // 2], 3),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))], 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+        **extra,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_ocr(corpus, repeat):
+    from app.services.ocr_service import ocr_service
+    from benchmarks.bench_ocr_preprocessing import character_accuracy
+
+    results = {}
+    for kind in KINDS:
+        items = [item for item in corpus if item["kind"] == kind]
+        if not items:
+            continue
+        samples, accuracy, id_hits = [], [], 0
+        for _ in range(repeat):
+            for item in items:
+                text, ms = timed(ocr_service.extract_text, item["bytes"], item["name"])
+                samples.append(ms)
+                accuracy.append(character_accuracy(item["text"], text))
+                id_hits += item["certificate_number"] in text
+        results[f"ocr.extract_text.{kind}"] = summarize(
+            samples,
+            mean_accuracy=round(sum(accuracy) / len(accuracy), 4),
+            certificate_number_in_text=round(id_hits / len(samples), 4),
+        )
+    return results
+
+
+def bench_regex(corpus, repeat):
+    from app.services.ocr_service import ocr_service
+
+    results = {}
+    for kind in KINDS:
+        items = [item for item in corpus if item["kind"] == kind]
+        if not items:
+            continue
+        samples, correct = [], 0
+        for _ in range(repeat * 10):
+            for item in items:
+                result, ms = timed(asyncio.run, ocr_service.extract_certificate_number_from_text(item["text"]))
+                samples.append(ms)
+                correct += result["certificate_number"] == item["certificate_number"]
+        results[f"regex.certificate_number.{kind}"] = summarize(samples, accuracy=round(correct / len(samples), 4))
+    return results
+
+
+def bench_prompt(corpus, repeat):
+    from app.services.skill_extraction_service import skill_extraction_service
+
+    samples = []
+    for _ in range(repeat * 50):
+        for item in corpus:
+            _, ms = timed(
+                skill_extraction_service._build_extraction_prompt,
+                item["text"], "Benchmark Certificate", "TechUniversity", NSQF_CONTEXT
+            )
+            samples.append(ms)
+    return {"prompt.build_extraction_prompt": summarize(samples)}
+
+
+def bench_skill_extraction(corpus, repeat):
+    from app.services.skill_extraction_service import skill_extraction_service
+
+    samples = []
+    # The service prints the full certificate text; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat * 10):
+            for item in corpus:
+                _, ms = timed(
+                    skill_extraction_service.extract_skills_and_metadata,
+                    item["text"], "Benchmark Certificate", "TechUniversity", NSQF_CONTEXT
+                )
+                samples.append(ms)
+    return {"skills.extract_skills_and_metadata": summarize(samples)}
+
+
+def bench_pdf(corpus, repeat):
+    from app.services.pdf_service import pdf_service
+
+    results = {}
+    for kind in ("text_pdf", "scanned_pdf", "transcript"):
+        items = [item for item in corpus if item["kind"] == kind]
+        if not items:
+            continue
+        samples = []
+        for _ in range(repeat):
+            for item in items:
+                _, ms = timed(pdf_service.append_qr_page, item["bytes"], "https://micromerit.example/verify/benchmark")
+                samples.append(ms)
+        results[f"pdf.append_qr_page.{kind}"] = summarize(samples)
+    return results
+
+
+def bench_bulk_zip(corpus, repeat):
+    from fastapi.testclient import TestClient
+    import main
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        for item in corpus:
+            z.writestr(item["name"], item["bytes"])
+    payload = archive.getvalue()
+
+    client = TestClient(main.app)
+    samples, correct, total = [], 0, 0
+    expected = {item["name"]: item["certificate_number"] for item in corpus}
+    for _ in range(repeat):
+        response, ms = timed(
+            client.post, "/ai/extract-bulk-ids",
+            files={"file": ("corpus.zip", payload, "application/zip")}
+        )
+        samples.append(ms)
+        for row in response.json().get("results", []):
+            total += 1
+            correct += row.get("certificate_number") == expected.get(row["filename"])
+    return {
+        "route.extract_bulk_ids": summarize(
+            samples,
+            files=len(corpus),
+            mean_ms_per_file=round(sum(samples) / len(samples) / len(corpus), 3),
+            accuracy=round(correct / total, 4) if total else 0.0,
+        )
+    }
+
+
+BENCHMARKS = {
+    "ocr": bench_ocr,
+    "regex": bench_regex,
+    "prompt": bench_prompt,
+    "skills": bench_skill_extraction,
+    "pdf": bench_pdf,
+    "bulk": bench_bulk_zip,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\n{'benchmark':<44}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            print(f"{name:<44}{'-':>14}{result['p50_ms']:>14.3f}{'new':>10}")
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        print(f"{name:<44}{before['p50_ms']:>14.3f}{result['p50_ms']:>14.3f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="Run a subset of benchmarks")
+    parser.add_argument("--per-kind", type=int, default=3, help="Corpus items per kind")
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over the corpus per benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--compare", type=Path, help="Previous results file to diff against")
+    args = parser.parse_args()
+
+    from app.services.groq_service import groq_service
+    groq_service.mock_mode = False
+    groq_service.client = _fake_groq_client()
+
+    corpus = build_corpus(per_kind=args.per_kind, seed=args.seed)
+    print(f"Corpus: {len(corpus)} items ({args.per_kind} per kind)")
+
+    results = {}
+    for name in args.only or list(BENCHMARKS):
+        print(f"Running {name}...")
+        results.update(BENCHMARKS[name](corpus, args.repeat))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "corpus": {"per_kind": args.per_kind, "seed": args.seed, "items": len(corpus)},
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    for name, result in results.items():
+        print(f"{name:<44}p50 {result['p50_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms")
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
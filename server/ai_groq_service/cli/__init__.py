@@ -0,0 +1 @@
+# Offline batch jobs for the AI service (run as modules, e.g. `python -m cli.precompute`)
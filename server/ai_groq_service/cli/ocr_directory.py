@@ -0,0 +1,245 @@
+"""
+Offline OCR + certificate-ID extraction for a directory of certificates.
+
+Walks a directory for PDFs and images and runs OCRService.extract_text and
+extract_certificate_number_from_text on every file, one process per core. Each
+result is appended to a JSONL manifest as soon as it is ready, so an
+interrupted run loses nothing. A rerun hashes each file (SHA-256) and skips
+content already in the manifest. Files that failed are retried. A skipped file
+at a path the manifest doesn't have yet (a copy, or a moved file) gets its own
+line with the existing result and `duplicate_of` set to the path it came from.
+
+Prints files/sec and per-stage time (hash, ocr, id_extraction) while running
+and at the end. With pyarrow installed, --parquet also writes the manifest as
+Parquet.
+
+Usage (from server/ai_groq_service):
+    python -m cli.ocr_directory /data/legacy-certificates --manifest legacy.jsonl
+    python -m cli.ocr_directory /data/legacy-certificates --manifest legacy.jsonl --workers 8 --include-text --parquet legacy.parquet
+
+Manifest lines:
+    {"sha256": "...", "path": "2019/batch-3/cert_0042.pdf", "size": 182133,
+     "status": "found" | "needs_review" | "not_found" | "error",
+     "certificate_number": "MMC-2019-000042", "confidence": 92.0, "text_chars": 640,
+     "timings_ms": {"hash": 0.4, "ocr": 812.5, "id_extraction": 0.3}, "error": null,
+     "duplicate_of": null | "2019/batch-1/cert_0007.pdf"}
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+from dotenv import load_dotenv
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(SERVICE_DIR / ".env")
+
+logger = logging.getLogger("ocr_directory")
+
+EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.webp')
+STAGES = ("hash", "ocr", "id_extraction")
+
+# Per-process state, set by _init_worker
+_done_hashes: Set[str] = set()
+_root: Optional[Path] = None
+_include_text = False
+_loop = None
+
+
+def _init_worker(done_hashes: Set[str], root: str, include_text: bool):
+    global _done_hashes, _root, _include_text, _loop
+    _done_hashes = done_hashes
+    _root = Path(root)
+    _include_text = include_text
+    _loop = asyncio.new_event_loop()
+    # Quiet the per-page service logs; the parent reports progress
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def process_file(path: str) -> Dict:
+    """Hash, OCR and ID-extract one file (runs in a worker process)"""
+    from app.services.ocr_service import ocr_service
+
+    file_path = Path(path)
+    record = {"sha256": None, "path": str(file_path.relative_to(_root)), "size": None, "status": "error",
+              "certificate_number": None, "confidence": 0.0, "text_chars": 0, "timings_ms": {}, "error": None,
+              "duplicate_of": None}
+    try:
+        start = time.perf_counter()
+        record["size"] = file_path.stat().st_size
+        record["sha256"] = _sha256(file_path)
+        record["timings_ms"]["hash"] = round((time.perf_counter() - start) * 1000, 2)
+        if record["sha256"] in _done_hashes:
+            return {"skipped": True, **record}
+
+        start = time.perf_counter()
+        text = ocr_service.extract_text(path, file_path.name)
+        record["timings_ms"]["ocr"] = round((time.perf_counter() - start) * 1000, 2)
+        record["text_chars"] = len(text or "")
+
+        start = time.perf_counter()
+        result = _loop.run_until_complete(ocr_service.extract_certificate_number_from_text(text))
+        record["timings_ms"]["id_extraction"] = round((time.perf_counter() - start) * 1000, 2)
+
+        record.update(
+            status=result["status"],
+            certificate_number=result["certificate_number"],
+            confidence=result["confidence"]
+        )
+        if _include_text:
+            record["extracted_text"] = text
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def iter_files(root: Path) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(('.', '__MACOSX')))
+        for name in sorted(filenames):
+            if name.lower().endswith(EXTENSIONS) and not name.startswith('.'):
+                yield os.path.join(dirpath, name)
+
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    """Latest manifest record per file path"""
+    records: Dict[str, dict] = {}
+    if not path.exists():
+        return records
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            if record.get("path"):
+                records[record["path"]] = record
+    return records
+
+
+def duplicate_record(record: dict, original: dict) -> dict:
+    """Manifest line for a file skipped by hash: the original's result under this file's path"""
+    return {
+        **{k: v for k, v in original.items() if k not in ("path", "size", "timings_ms", "duplicate_of")},
+        "path": record["path"],
+        "size": record["size"],
+        "timings_ms": record["timings_ms"],
+        "duplicate_of": original.get("duplicate_of") or original["path"],
+    }
+
+
+def write_parquet(manifest: Path, target: Path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.error("--parquet needs pyarrow (pip install pyarrow); the JSONL manifest is complete")
+        return
+    rows = list(load_manifest(manifest).values())
+    for row in rows:
+        row["timings_ms"] = json.dumps(row.get("timings_ms") or {})
+    pq.write_table(pa.Table.from_pylist(rows), target)
+    logger.info(f"Wrote {len(rows)} rows to {target}")
+
+
+class Report:
+    """Running totals for files/sec and per-stage time"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = {"processed": 0, "skipped": 0, "errors": 0}
+        self.stage_ms = {stage: [] for stage in STAGES}
+
+    def add(self, record: dict):
+        if record.get("skipped"):
+            self.counts["skipped"] += 1
+            return
+        self.counts["processed"] += 1
+        self.counts["errors"] += record["status"] == "error"
+        for stage, ms in record["timings_ms"].items():
+            self.stage_ms[stage].append(ms)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.counts["processed"] / elapsed if elapsed else 0.0
+        parts = [f"{self.counts['processed']} processed, {self.counts['skipped']} skipped, "
+                 f"{self.counts['errors']} errors in {elapsed:.1f}s ({rate:.2f} files/sec)"]
+        for stage, samples in self.stage_ms.items():
+            if samples:
+                ordered = sorted(samples)
+                parts.append(
+                    f"{stage}: total {sum(ordered) / 1000:.1f}s, mean {sum(ordered) / len(ordered):.1f}ms, "
+                    f"p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.1f}ms"
+                )
+        return "\n  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--manifest", type=Path, required=True, help="JSONL manifest to append to (and resume from)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--include-text", action="store_true", help="Store the OCR text in the manifest")
+    parser.add_argument("--parquet", type=Path, help="Also write the manifest as Parquet when done (needs pyarrow)")
+    parser.add_argument("--progress-every", type=int, default=100, help="Print a report every N files")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.directory.is_dir():
+        sys.exit(f"{args.directory} is not a directory")
+    # One Tesseract thread per process; the pool already uses every core
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    existing = load_manifest(args.manifest)
+    # Skipping is by content: a file moved or copied since the last run isn't OCR'd again
+    results = {}
+    for record in existing.values():
+        if record.get("sha256") and record.get("status") != "error":
+            results.setdefault(record["sha256"], record)
+    done = set(results)
+    logger.info(f"Manifest has {len(existing)} files ({len(done)} done); scanning {args.directory} with {args.workers} workers")
+
+    report = Report()
+    root = str(args.directory.resolve())
+    with open(args.manifest, "a", encoding="utf-8") as out, Pool(
+        args.workers, initializer=_init_worker, initargs=(done, root, args.include_text)
+    ) as pool:
+        files = (os.path.abspath(p) for p in iter_files(Path(root)))
+        for record in pool.imap_unordered(process_file, files, chunksize=4):
+            report.add(record)
+            if record.pop("skipped", False):
+                known = existing.get(record["path"])
+                if known is not None and known.get("sha256") == record["sha256"]:
+                    continue
+                # Same content under a new path: record the path against the existing result
+                record = duplicate_record(record, results[record["sha256"]])
+                existing[record["path"]] = record
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            seen = report.counts["processed"] + report.counts["skipped"]
+            if seen % args.progress_every == 0:
+                logger.info(report.summary())
+
+    logger.info("Done\n  " + report.summary())
+    if args.parquet:
+        write_parquet(args.manifest, args.parquet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Offline precompute job for recommendations, roadmaps and skill profiles.
+
+Reads learners from a JSONL export, runs RecommendationService for each one
+with bounded concurrency, and writes the results to the SQLite store that the
+API serves from when PRECOMPUTE_DB points at it (app/precomputed.py). Run it
+after a cohort's certificates are issued, off-peak, so dashboards opening at
+once hit stored results instead of the LLM.
+
+Input, one JSON object per line. Either a learner:
+    {"learner_email": "a@example.com", "certificates": [...], "learner_profile": {...}}
+or a single certificate row carrying learner_email. Rows for the same learner
+are merged.
+
+Resuming: the store doubles as the checkpoint. Results are keyed by a hash of
+their inputs, so a rerun skips every (learner, task) already stored and still
+fresh, and redoes only failures, new learners and learners whose
+certificates changed. --force recomputes everything.
+
+Rate limits: --rpm paces job starts. After a 429, every worker waits out the
+Retry-After window before starting another job. Failed jobs (empty results,
+or results missing the kind's required keys, see REQUIRED_KEYS) are retried
+with exponential backoff and never stored.
+
+Usage (from server/ai_groq_service):
+    python -m cli.precompute --input learners.jsonl --db precomputed.sqlite
+    python -m cli.precompute --input learners.jsonl --db precomputed.sqlite --tasks recommendations --concurrency 8 --rpm 120
+    PRECOMPUTE_DB=precomputed.sqlite gunicorn -c gunicorn.conf.py main:app
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from dotenv import load_dotenv
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(SERVICE_DIR / ".env")
+
+from app.precomputed import KINDS, PrecomputedStore, input_hash, missing_keys  # noqa: E402
+
+logger = logging.getLogger("precompute")
+
+
+class Pacer:
+    """Spaces job starts at least 60/rpm seconds apart across threads (rpm <= 0 = unpaced)"""
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+
+def load_learners(path: Path) -> Dict[str, dict]:
+    """Group export lines into {email: {"certificates": [...], "learner_profile": {...}}}"""
+    learners: Dict[str, dict] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping line {line_no}: {e}")
+                continue
+            email = row.get("learner_email")
+            if not email:
+                logger.warning(f"Skipping line {line_no}: no learner_email")
+                continue
+            learner = learners.setdefault(email, {"certificates": [], "learner_profile": {}})
+            if isinstance(row.get("certificates"), list):
+                learner["certificates"].extend(row["certificates"])
+                if isinstance(row.get("learner_profile"), dict):
+                    learner["learner_profile"] = row["learner_profile"]
+            else:
+                learner["certificates"].append({k: v for k, v in row.items() if k != "learner_email"})
+    return learners
+
+
+def run_task(kind: str, learner: dict) -> dict:
+    from app.services.recommendation_service import recommendation_service
+
+    if kind == "recommendations":
+        result = recommendation_service.generate_recommendations(learner["certificates"])
+        return result if result.get("source") != "none" else {}
+    if kind == "roadmap":
+        return recommendation_service.generate_roadmap(learner["certificates"], learner["learner_profile"])
+    return recommendation_service.generate_skill_profile(learner["certificates"])
+
+
+def run_job(store: PrecomputedStore, pacer: Pacer, kind: str, email: str, learner: dict, key: str,
+            retries: int, backoff: float) -> bool:
+    """Generate and store one result; an incomplete result (the services' failure value) is retried"""
+    from app.services.groq_service import groq_service
+
+    for attempt in range(retries + 1):
+        pause = groq_service.rate_limit_wait()
+        if pause:
+            logger.info(f"Rate limited; pausing {pause:.1f}s")
+            time.sleep(pause)
+        pacer.wait()
+        try:
+            result = run_task(kind, learner)
+        except Exception as e:
+            logger.warning(f"{kind} for {email} raised: {e}")
+            result = {}
+        missing = missing_keys(kind, result)
+        if not missing:
+            store.put(kind, key, result, learner_email=email)
+            return True
+        if result:
+            logger.warning(f"{kind} for {email} is missing {', '.join(missing)}")
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    logger.error(f"{kind} for {email} failed after {retries + 1} attempts")
+    return False
+
+
+def plan_jobs(store: PrecomputedStore, learners: Dict[str, dict], tasks: List[str],
+              force: bool, stats: dict) -> Iterator[Tuple[str, str, dict, str]]:
+    for email, learner in learners.items():
+        if not learner["certificates"]:
+            stats["skipped_empty"] += len(tasks)
+            continue
+        for kind in tasks:
+            key = input_hash(kind, learner["certificates"], learner["learner_profile"])
+            stored = None if force else store.get(kind, key)
+            if stored is not None and not missing_keys(kind, stored):
+                stats["already_done"] += 1
+                continue
+            yield kind, email, learner, key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, required=True, help="JSONL export of learners/certificates")
+    parser.add_argument("--db", required=True, help="SQLite store to write (serve it with PRECOMPUTE_DB)")
+    parser.add_argument("--tasks", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs running at once")
+    parser.add_argument("--rpm", type=float, default=0, help="Max job starts per minute (0 = unpaced)")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per failed job")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Seconds before the first retry (doubles)")
+    parser.add_argument("--max-age-seconds", type=float, default=7 * 86400,
+                        help="Stored results older than this are recomputed")
+    parser.add_argument("--force", action="store_true", help="Recompute results already in the store")
+    parser.add_argument("--allow-mock", action="store_true", help="Run even without a Groq client (writes mock output)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Imported before the pool starts so worker threads never see a half-imported module
+    import app.services.recommendation_service  # noqa: F401
+    from app.services.groq_service import groq_service
+    if (groq_service.mock_mode or not groq_service.client) and not args.allow_mock:
+        sys.exit("No Groq client (MOCK_MODE or missing GROQ_API_KEY); refusing to store mock results. Use --allow-mock to override.")
+
+    store = PrecomputedStore(args.db, max_age_seconds=args.max_age_seconds)
+    learners = load_learners(args.input)
+    stats = {"done": 0, "failed": 0, "already_done": 0, "skipped_empty": 0}
+    pacer = Pacer(args.rpm)
+    logger.info(f"Loaded {len(learners)} learners; tasks: {', '.join(args.tasks)}")
+
+    start = time.perf_counter()
+    last_logged = 0
+    jobs = plan_jobs(store, learners, args.tasks, args.force, stats)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        pending = set()
+        for job in jobs:
+            # Keep at most 2x concurrency jobs queued so huge exports aren't submitted all at once
+            if len(pending) >= 2 * args.concurrency:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stats["done" if future.result() else "failed"] += 1
+            pending.add(executor.submit(run_job, store, pacer, *job, args.retries, args.backoff))
+            completed = stats["done"] + stats["failed"]
+            if completed - last_logged >= 100:
+                last_logged = completed
+                logger.info(f"Progress: {stats}")
+        for future in wait(pending).done:
+            stats["done" if future.result() else "failed"] += 1
+
+    store.close()
+    logger.info(f"Finished in {time.perf_counter() - start:.1f}s: {stats}")
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
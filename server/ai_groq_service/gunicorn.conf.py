@@ -0,0 +1,121 @@
+"""
+Production launcher configuration for the AI service.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+- Runs WEB_CONCURRENCY uvicorn workers (default: CPUs available to the container).
+- Imports the app, every service module and the renderers' lazy state in the
+  master before forking, then freezes the GC so those pages stay copy-on-write
+  shared between workers.
+- Recycles workers gracefully after WORKER_MAX_REQUESTS requests (with jitter)
+  or when a worker's RSS passes WORKER_MAX_RSS_MB.
+- Aggregates Prometheus metrics across workers via PROMETHEUS_MULTIPROC_DIR
+  and shares stored request profiles via PROFILE_DIR.
+"""
+import gc
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+
+def _available_cpus() -> int:
+    """CPUs this process may use, honouring affinity masks and cgroup v2 quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as fh:
+            quota, period = fh.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY") or _available_cpus())
+# Exported so the app can share CPUs out between workers (see PIPELINE_OCR_WORKERS)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+preload_app = True
+
+# Recycling: restart a worker after this many requests; jitter avoids all
+# workers restarting at once
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", 100))
+# In-flight requests (OCR + LLM can take tens of seconds) get this long to finish
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", 60))
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+keepalive = 5
+
+max_rss_mb = float(os.getenv("WORKER_MAX_RSS_MB", 0))
+rss_check_seconds = float(os.getenv("WORKER_RSS_CHECK_SECONDS", 10))
+
+# The master already warms up before forking; workers must not repeat it lazily
+os.environ.setdefault("AI_WARMUP", "true")
+
+# prometheus_client picks multiprocess mode up at import time, so the directory
+# has to exist (and be emptied of stale samples) before the app is preloaded
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tempfile.gettempdir(), "ai_service_prometheus")
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Request profiles (X-Profile) are stored where every worker can serve them
+if workers > 1 and not os.getenv("PROFILE_DIR"):
+    os.environ["PROFILE_DIR"] = os.path.join(tempfile.gettempdir(), "ai_service_profiles")
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker forks
+    from app.warmup import run_warmup, warmup_status
+    run_warmup()
+    status = warmup_status()
+    # Move everything allocated so far out of the GC's generations, so collections
+    # in the workers don't touch (and un-share) these pages
+    gc.freeze()
+    server.log.info(
+        f"Warm-up finished before fork ({len(status['timings_ms'])} steps, errors: {status['errors'] or 'none'}); "
+        f"starting {workers} worker(s)"
+    )
+
+
+def post_worker_init(worker):
+    if max_rss_mb <= 0:
+        return
+
+    def _watch():
+        while True:
+            time.sleep(rss_check_seconds)
+            rss = _rss_mb()
+            if rss > max_rss_mb:
+                worker.log.warning(
+                    f"Worker {worker.pid} RSS {rss:.0f} MB over WORKER_MAX_RSS_MB={max_rss_mb:.0f}; recycling"
+                )
+                # SIGTERM = graceful: in-flight requests finish, the master forks a replacement
+                os.kill(worker.pid, signal.SIGTERM)
+                return
+
+    threading.Thread(target=_watch, name="rss-watchdog", daemon=True).start()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
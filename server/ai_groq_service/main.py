@@ -13,9 +13,23 @@ load_dotenv(dotenv_path=env_path)
 # =========================================================
 
 # Now import after .env is loaded
-from fastapi import FastAPI
+import sys
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.routes.ai_routes import router as ai_router
+from app.routes.admin_routes import router as admin_router
+from app.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, format_server_timing, metrics_registry, start_request_timings
+from app.profiling import call_with_profile, profiling_requested
+from app.cancellation import CancelOnDisconnectMiddleware
+from app.deadline import DeadlineMiddleware
+from app.idempotency import IdempotencyMiddleware
+from app.responses import CompressionMiddleware
+from app.uploads import UploadLimitMiddleware, max_upload_bytes
+from app.warmup import start_background_warmup, warmup_status
+from app.sampling_profiler import start_sampling_profiler_if_enabled
 
 # Log whether .env was found
 logger = logging.getLogger(__name__)
@@ -35,13 +49,15 @@ logger.info(f"  GROQ_API_KEY: {'*' * 20 if os.getenv('GROQ_API_KEY') else 'NOT S
 logger.info(f"  MODEL_NAME: {os.getenv('MODEL_NAME', 'NOT SET')}")
 logger.info(f"  MOCK_MODE: {os.getenv('MOCK_MODE', 'NOT SET')}")
 logger.info(f"  GROQ_TIMEOUT_SECONDS: {os.getenv('GROQ_TIMEOUT_SECONDS', 'NOT SET')}")
+logger.info(f"  AI_WARMUP: {os.getenv('AI_WARMUP', 'NOT SET')}")
 logger.info("=" * 50)
 
 # Create FastAPI app
 app = FastAPI(
     title="MicroMerit AI Service",
     description="AI-powered OCR and Career Recommendation Service",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -53,8 +69,151 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Retries carrying the same Idempotency-Key attach to / replay the first attempt.
+# Added before compression so stored bodies are uncompressed and re-encoded per client.
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=[
+        "/ai/process-ocr",
+        "/ai/ingest-certificate",
+        "/ai/extract-certificate-id",
+        "/ai/extract-bulk-ids",
+        "/ai/recommendations",
+        "/ai/generate-roadmap",
+        "/ai/generate-skill-profile",
+        "/ai/enrich-credential",
+        "/ai/stackability",
+    ],
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 3600)),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 1000))
+)
+
+# gzip/Brotli for large JSON bodies (OCR text, recommendations, roadmaps)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+)
+
+# Reject oversized uploads while the body is still arriving
+app.add_middleware(UploadLimitMiddleware, max_bytes=max_upload_bytes())
+
+# Routes whose OCR and LLM work is scoped to the request (disconnects, deadlines)
+REQUEST_SCOPED_PATHS = [
+    "/ai/process-ocr",
+    "/ai/ingest-certificate",
+    "/ai/extract-certificate-id",
+    "/ai/recommendations",
+    "/ai/employer-chat",
+    "/ai/generate-roadmap",
+    "/ai/generate-skill-profile",
+    "/ai/enrich-credential",
+    "/ai/stackability",
+]
+
+# Stop OCR pages and LLM calls a disconnected client will never read. Outside
+# idempotency, which holds an attempt's token while retries are attached to it.
+app.add_middleware(CancelOnDisconnectMiddleware, paths=REQUEST_SCOPED_PATHS)
+
+# Fit OCR and LLM work into the caller's X-Request-Deadline-Ms, returning flagged
+# partial results rather than overrunning it
+app.add_middleware(
+    DeadlineMiddleware,
+    paths=REQUEST_SCOPED_PATHS,
+    default_ms=float(os.getenv("DEFAULT_REQUEST_DEADLINE_MS", 0)),
+    llm_reserve_seconds=float(os.getenv("DEADLINE_LLM_RESERVE_SECONDS", 5)),
+    min_llm_seconds=float(os.getenv("DEADLINE_MIN_LLM_SECONDS", 1))
+)
+
 # Include routes
 app.include_router(ai_router, prefix="/ai", tags=["AI"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"], include_in_schema=False)
+
+
+# Route paths seen in scope["route"] so far, for labelling requests before routing
+_route_paths: set = set()
+
+
+def _route_label(request: Request) -> str:
+    """
+    Label metrics with the matched route's path so unknown URLs can't explode
+    cardinality. The router sets scope["route"] once it has matched; before
+    that, only paths already seen as routes keep their own label.
+    """
+    path = getattr(request.scope.get("route"), "path", None)
+    if path:
+        _route_paths.add(path)
+        return path
+    return request.url.path if request.url.path in _route_paths else "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if request.url.path in ("/metrics", "/ready"):
+        return await call_next(request)
+
+    in_flight_route = _route_label(request)
+    REQUESTS_IN_FLIGHT.labels(route=in_flight_route).inc()
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        REQUEST_LATENCY.labels(
+            method=request.method, route=_route_label(request), status=status
+        ).observe(time.perf_counter() - start)
+        REQUESTS_IN_FLIGHT.labels(route=in_flight_route).dec()
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """
+    Attach a Server-Timing header with per-stage durations to /ai/* responses.
+    Requests with `X-Profile: true` and a valid X-Admin-Token are run under
+    cProfile; the stored profile's ID is returned in X-Profile-Id.
+    """
+    if not request.url.path.startswith("/ai/"):
+        return await call_next(request)
+
+    timings = start_request_timings()
+    start = time.perf_counter()
+    if profiling_requested(request.headers):
+        response, profile_id = await call_with_profile(request, call_next)
+        response.headers["X-Profile-Id"] = profile_id or "busy"
+    else:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = format_server_timing(timings, time.perf_counter() - start)
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe: 503 until warm-up has completed"""
+    status = warmup_status()
+    return ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.on_event("startup")
+async def warmup():
+    # Non-blocking: heavy modules load on a background thread while traffic is served
+    start_background_warmup()
+    start_sampling_profiler_if_enabled()
+
+
+@app.on_event("shutdown")
+async def stop_batch_pipeline():
+    # The OCR process pool only exists if a batch request imported the pipeline
+    module = sys.modules.get("app.services.batch_pipeline")
+    if module is not None:
+        module.batch_pipeline.shutdown()
+
 
 @app.get("/")
 async def root():
@@ -63,6 +222,8 @@ async def root():
         "version": "2.0.0",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
+            "ready": "/ready",
             "ocr": "/process-ocr (internal)",
             "recommendations": "/recommendations"
         }
@@ -0,0 +1,150 @@
+import asyncio
+import io
+import json
+import os
+import time
+import zipfile
+import pytest
+from app.services import batch_pipeline as pipeline_module
+from app.services.batch_pipeline import BatchPipeline
+from app.services.ocr_service import ocr_service
+from app.services.skill_extraction_service import skill_extraction_service
+
+
+def _read_or_crash(path: str, filename: str) -> str:
+    """OCR stand-in run in the pool processes: a "crash" file kills its worker"""
+    if "crash" in filename:
+        os._exit(1)
+    with open(path) as fh:
+        return fh.read()
+
+
+@pytest.fixture
+def extraction(monkeypatch):
+    monkeypatch.setattr(skill_extraction_service, "extract_skills_and_metadata",
+                        lambda **kw: {"skills": [{"name": kw["certificate_title"], "category": "Test", "confidence": 0.9}]})
+
+
+def _files(tmp_path, names):
+    workdir = tmp_path / "batch"
+    workdir.mkdir()
+    files = []
+    for name in names:
+        (workdir / name).write_text(f"certificate text for {name}")
+        files.append({"path": str(workdir / name), "filename": name, "certificate_title": name})
+    return str(workdir), files
+
+
+def _collect(pipeline, files, workdir, fail_after=None):
+    async def main():
+        results = []
+        stream = pipeline.run(files, "NSDC", workdir=workdir)
+        try:
+            async for result in stream:
+                results.append(result)
+                if fail_after is not None and len(results) == fail_after:
+                    raise RuntimeError("client went away")
+        finally:
+            # As ndjson_stream does when the response ends or the client disconnects
+            await stream.aclose()
+        return results
+    return asyncio.run(main())
+
+
+def _post_batch(archive: bytes):
+    from main import app
+    body = (
+        b'--b\r\nContent-Disposition: form-data; name="issuer_name"\r\n\r\nNSDC\r\n'
+        b'--b\r\nContent-Disposition: form-data; name="file"; filename="batch.zip"\r\n'
+        b"Content-Type: application/zip\r\n\r\n" + archive + b"\r\n--b--\r\n"
+    )
+
+    async def post():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/ai/process-ocr-batch", "raw_path": b"/ai/process-ocr-batch",
+            "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+            "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+        }
+        await app(scope, receive, send)
+        return sent
+
+    return asyncio.run(post())
+
+
+def test_batch_route_streams_one_line_per_file_in_completion_order(monkeypatch):
+    monkeypatch.setattr(pipeline_module.batch_pipeline, "ocr_workers", 0)
+    monkeypatch.setattr(ocr_service, "extract_text", lambda path, filename: "certificate text " * 3)
+    delays = {"slow": 0.3, "medium": 0.15, "fast": 0.0}
+
+    def extract(**kw):
+        time.sleep(delays[kw["certificate_title"]])
+        return {"skills": [{"name": kw["certificate_title"], "category": "Test", "confidence": 0.9}]}
+
+    monkeypatch.setattr(skill_extraction_service, "extract_skills_and_metadata", extract)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        for name in ["slow.pdf", "medium.png", "fast.jpg", "notes.txt"]:
+            z.writestr(name, b"scan")
+
+    sent = _post_batch(archive.getvalue())
+    assert sent[0]["status"] == 200
+    lines = [json.loads(line) for line in b"".join(m.get("body", b"") for m in sent[1:]).splitlines()]
+    assert [(line["index"], line["filename"], line["status"]) for line in lines] == [
+        (2, "fast.jpg", "ok"), (1, "medium.png", "ok"), (0, "slow.pdf", "ok")
+    ]
+    assert lines[0]["skills"][0]["name"] == "fast"
+
+
+def test_worker_crash_fails_only_its_file_and_the_pool_recovers(tmp_path, extraction, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "_ocr_file", _read_or_crash)
+    pipeline = BatchPipeline()
+    pipeline.ocr_workers = 2
+    try:
+        workdir, files = _files(tmp_path, ["a.pdf", "crash.pdf", "b.pdf"])
+        results = {r["filename"]: r["status"] for r in _collect(pipeline, files, workdir)}
+        assert results == {"a.pdf": "ok", "crash.pdf": "error", "b.pdf": "ok"}
+
+        (tmp_path / "next").mkdir()
+        workdir, files = _files(tmp_path / "next", ["c.pdf", "d.pdf"])
+        assert sorted(r["status"] for r in _collect(pipeline, files, workdir)) == ["ok", "ok"]
+    finally:
+        pipeline.shutdown()
+
+
+def test_workdir_is_removed_after_success(tmp_path, extraction, monkeypatch):
+    monkeypatch.setattr(ocr_service, "extract_text", lambda path, filename: open(path).read())
+    pipeline = BatchPipeline()
+    pipeline.ocr_workers = 0
+    workdir, files = _files(tmp_path, ["a.pdf", "b.pdf"])
+    assert len(_collect(pipeline, files, workdir)) == 2
+    assert not os.path.exists(workdir)
+
+
+def test_workdir_is_removed_when_the_run_fails(tmp_path, extraction, monkeypatch):
+    monkeypatch.setattr(ocr_service, "extract_text", lambda path, filename: open(path).read())
+    pipeline = BatchPipeline()
+    pipeline.ocr_workers = 0
+    workdir, files = _files(tmp_path, ["a.pdf", "b.pdf", "c.pdf"])
+    with pytest.raises(RuntimeError):
+        _collect(pipeline, files, workdir, fail_after=1)
+    assert not os.path.exists(workdir)
+
+
+def test_workdir_is_removed_when_the_archive_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_DIR", str(tmp_path))
+    sent = _post_batch(b"not a zip")
+    assert sent[0]["status"] == 400
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("batch_")]
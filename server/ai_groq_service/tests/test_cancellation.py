@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.cancellation import (
+    CLIENT_CLOSED_STATUS, CancelOnDisconnectMiddleware, CancelToken, RequestCancelled, _current_token, checkpoint, current_token
+)
+from app.services.groq_service import groq_service
+
+
+def _run(app, disconnect_after: float):
+    """Send one request through CancelOnDisconnectMiddleware; the client disconnects after `disconnect_after`"""
+    middleware = CancelOnDisconnectMiddleware(app, ["/x"])
+
+    async def main():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": b"{}", "more_body": False})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def disconnect():
+            await asyncio.sleep(disconnect_after)
+            await messages.put({"type": "http.disconnect"})
+
+        asyncio.get_running_loop().create_task(disconnect())
+        await middleware({"type": "http", "method": "POST", "path": "/x", "headers": []}, messages.get, send)
+        return sent
+
+    return asyncio.run(main())
+
+
+def test_disconnect_stops_work_at_the_next_checkpoint_and_answers_499():
+    pages = []
+
+    async def app(scope, receive, send):
+        await receive()
+        for page in range(50):
+            checkpoint("ocr_page")
+            pages.append(page)
+            await asyncio.sleep(0.01)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    sent = _run(app, disconnect_after=0.05)
+    assert 0 < len(pages) < 50
+    assert sent[0]["status"] == CLIENT_CLOSED_STATUS
+
+
+def test_checkpoint_raises_once_the_token_is_cancelled():
+    token = CancelToken()
+    checkpoint("llm_call")  # outside a cancellable request: no-op
+    token.cancel()
+    assert token.cancelled
+
+    async def check():
+        _current_token.set(token)
+        with pytest.raises(RequestCancelled):
+            checkpoint("llm_call")
+
+    asyncio.run(check())
+
+
+def test_held_token_is_only_cancelled_after_the_last_release():
+    token = CancelToken()
+    token.hold()
+    token.hold()
+    token.cancel()
+    assert not token.cancelled
+    token.release()
+    assert not token.cancelled
+    token.release()
+    assert token.cancelled
+
+
+def test_release_without_a_disconnect_leaves_the_token_live():
+    token = CancelToken()
+    token.hold()
+    token.release()
+    assert not token.cancelled
+
+
+def test_work_held_by_an_attached_retry_survives_the_disconnect():
+    pages = []
+
+    async def app(scope, receive, send):
+        await receive()
+        token = current_token()
+        token.hold()  # what IdempotencyMiddleware does for an attached retry
+        try:
+            for page in range(10):
+                checkpoint("ocr_page")
+                pages.append(page)
+                await asyncio.sleep(0.01)
+        finally:
+            token.release()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    sent = _run(app, disconnect_after=0.02)
+    assert pages == list(range(10))
+    assert sent[0]["status"] == 200
+
+
+def test_groq_wait_is_abandoned_when_the_client_goes_away():
+    token = CancelToken()
+    release = threading.Event()
+
+    def run():
+        _current_token.set(token)
+        with ThreadPoolExecutor(1) as pool:
+            call = pool.submit(release.wait, 5)
+            start = time.monotonic()
+            try:
+                groq_service._wait([call])
+            except RequestCancelled:
+                return time.monotonic() - start
+            finally:
+                release.set()
+
+    with ThreadPoolExecutor(1) as runner:
+        waited = runner.submit(run)
+        time.sleep(0.15)
+        token.cancel()
+        assert waited.result(timeout=2) < 0.5
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+import pytest
+from app.deadline import Deadline, DeadlineExceeded, _current_deadline
+from app.services.groq_service import groq_service
+from app.services.ocr_service import ocr_service
+
+CERTIFICATES = [{"certificate_title": "Python Programming", "metadata": {"skills": ["Python"]}}]
+
+
+class _Completions:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        time.sleep(self.delay)
+        message = SimpleNamespace(content='{"answer": "yes"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def groq_client(monkeypatch):
+    completions = _Completions()
+    monkeypatch.setattr(groq_service, "mock_mode", False)
+    monkeypatch.setattr(groq_service, "hedging", False)
+    monkeypatch.setattr(groq_service, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+
+
+def _multipart(fields: dict) -> bytes:
+    parts = [
+        f'--b\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in fields.items()
+    ]
+    parts.append('--b\r\nContent-Disposition: form-data; name="file"; filename="cert.png"\r\n'
+                 'Content-Type: image/png\r\n\r\npng\r\n--b--\r\n')
+    return "".join(parts).encode()
+
+
+def _post(path: str, body: bytes, content_type: str, deadline_ms: str):
+    from main import app
+
+    async def call():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "client": ("test", 1), "server": ("test", 80),
+            "headers": [(b"content-type", content_type.encode()), (b"x-request-deadline-ms", deadline_ms.encode())],
+        }
+        await app(scope, receive, send)
+        start = next(m for m in sent if m["type"] == "http.response.start")
+        headers = {k.decode().lower(): v.decode() for k, v in start["headers"]}
+        return start["status"], headers, json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+
+    return asyncio.run(call())
+
+
+ROUTES = [
+    ("/ai/process-ocr", {"learner_email": "a@x", "certificate_title": "Python", "issuer_name": "NSDC"}),
+    ("/ai/ingest-certificate", {"certificate_title": "Python", "issuer_name": "NSDC"}),
+    ("/ai/extract-certificate-id", {}),
+    ("/ai/recommendations", {"learner_email": "a@x", "certificates": CERTIFICATES}),
+    ("/ai/employer-chat", {"learner_email": "a@x", "question": "Python?", "credentials": CERTIFICATES}),
+    ("/ai/generate-roadmap", {"certificates": CERTIFICATES}),
+    ("/ai/generate-skill-profile", {"certificates": CERTIFICATES}),
+    ("/ai/enrich-credential", {"certificate_title": "Python Programming"}),
+    ("/ai/stackability", {"code": "QP/0001", "level": 4, "skills": ["Python"]}),
+]
+
+
+@pytest.mark.parametrize("path,fields", ROUTES, ids=[path for path, _ in ROUTES])
+def test_expired_budget_returns_a_flagged_partial_result(path, fields, groq_client, monkeypatch):
+    # No certificate number in the text, so the ID route needs its LLM fallback too
+    monkeypatch.setattr(ocr_service, "extract_text", lambda source, filename: "Awarded to A Learner for Python Programming")
+    if path in ("/ai/process-ocr", "/ai/ingest-certificate", "/ai/extract-certificate-id"):
+        status, headers, body = _post(path, _multipart(fields), "multipart/form-data; boundary=b", "1")
+    else:
+        status, headers, body = _post(path, json.dumps(fields).encode(), "application/json", "1")
+
+    assert status == 200
+    assert headers["x-partial-result"] == "llm_skipped"
+    assert body["partial"] is True
+    assert body["partial_reasons"] == ["llm_skipped"]
+    assert groq_client.calls == []
+
+
+@pytest.mark.parametrize("budget", [0.0, 0.3, 1.0, 1.5, 5.0, 60.0])
+@pytest.mark.parametrize("timeout", [0.5, 2.0, 30.0])
+def test_llm_timeout_never_exceeds_the_remaining_budget(budget, timeout):
+    deadline = Deadline(budget, min_llm_seconds=0.1)
+    allowed = deadline.llm_timeout(timeout)
+    if allowed is not None:
+        assert 0.1 <= allowed <= min(timeout, deadline.remaining())
+    else:
+        assert deadline.remaining() < 0.1 + 0.25
+
+
+def test_groq_call_is_cut_to_the_deadline(groq_client):
+    groq_client.delay = 1.0
+    deadline = Deadline(0.6, min_llm_seconds=0.1)
+    reset = _current_deadline.set(deadline)
+    try:
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            groq_service.chat_completion([{"role": "user", "content": "x"}], timeout=30)
+        assert time.monotonic() - start < 0.6
+    finally:
+        _current_deadline.reset(reset)
+    assert groq_client.calls[0]["timeout"] <= 0.6 - 0.25
+    assert deadline.degraded == ["llm_timeout"]
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services import groq_service as groq_module
+from app.services.groq_service import GroqService
+from app.utils.hedging import HedgeBudget, LatencyTracker
+
+
+def test_budget_spends_its_burst_then_denies():
+    budget = HedgeBudget(ratio=0.25, burst=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_budget_refills_by_ratio_per_call_up_to_the_burst():
+    budget = HedgeBudget(ratio=0.25, burst=2)
+    budget.withdraw(), budget.withdraw()
+    for _ in range(3):
+        budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+    for _ in range(100):
+        budget.deposit()
+    assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+
+def test_percentile_waits_for_min_samples():
+    tracker = LatencyTracker(min_samples=5)
+    for seconds in (1, 2, 3, 4):
+        tracker.record("m", seconds)
+    assert tracker.percentile("m", 95) is None
+    assert tracker.percentile("other", 95) is None
+
+
+def test_percentile_over_the_rolling_window():
+    tracker = LatencyTracker(window=101, min_samples=10)
+    for seconds in range(101):
+        tracker.record("m", seconds / 100)
+    assert tracker.percentile("m", 50) == 0.5
+    assert tracker.percentile("m", 95) == 0.95
+    assert tracker.percentile("m", 100) == 1.0
+
+    # Only the latest `window` samples count
+    for _ in range(101):
+        tracker.record("m", 2.0)
+    assert tracker.percentile("m", 50) == 2.0
+
+
+def test_concurrent_first_calls_share_one_call_pool(monkeypatch):
+    class SlowToBuild(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)  # widen the window between the None check and the assignment
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(groq_module, "ThreadPoolExecutor", SlowToBuild)
+    service = GroqService()
+    start = threading.Barrier(16)
+    pools = []
+
+    def first_call():
+        start.wait()
+        pools.append(service._executor())
+
+    threads = [threading.Thread(target=first_call) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(pool) for pool in pools}) == 1
+    pools[0].shutdown()
@@ -0,0 +1,155 @@
+import asyncio
+from app.idempotency import IdempotencyMiddleware
+
+
+def _multipart(boundary: str) -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"\r\n\r\ncertificate\r\n--{boundary}--\r\n"
+    ).encode()
+
+
+def _run(app, requests):
+    """Send (name, body, content_type, start_delay) requests with one key; returns {name: [status, body]}"""
+    middleware = IdempotencyMiddleware(app, ["/x"])
+
+    async def client(name, body, content_type, delay):
+        await asyncio.sleep(delay)
+        messages = asyncio.Queue()
+        for i in range(0, len(body), 7):
+            await messages.put({"type": "http.request", "body": body[i:i + 7], "more_body": i + 7 < len(body)})
+        sent = []
+
+        async def send(message):
+            sent.append(message.get("status") or message.get("body"))
+
+        scope = {"type": "http", "method": "POST", "path": "/x", "name": name,
+                 "headers": [(b"idempotency-key", b"k"), (b"content-type", content_type.encode())]}
+        try:
+            await middleware(scope, messages.get, send)
+        except RuntimeError:
+            sent.append("raised")
+        return name, sent
+
+    async def main():
+        return dict(await asyncio.gather(*(client(*request) for request in requests)))
+
+    return asyncio.run(main())
+
+
+def _app(runs, fail=()):
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        runs.append(scope["name"])
+        await asyncio.sleep(0.05)
+        if scope["name"] in fail:
+            raise RuntimeError("attempt died")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": scope["name"].encode()})
+    return app
+
+
+def test_retry_with_same_body_attaches_and_other_body_is_rejected():
+    runs = []
+    results = _run(_app(runs), [
+        ("first", b'{"id": 1}', "application/json", 0),
+        ("same", b'{"id": 1}', "application/json", 0.01),
+        ("other", b'{"id": 2}', "application/json", 0.01),
+    ])
+    assert runs == ["first"]
+    assert results["same"] == [200, b"first"]
+    assert results["other"][0] == 422
+
+
+def test_rebuilt_multipart_form_matches():
+    runs = []
+    results = _run(_app(runs), [
+        ("first", _multipart("aaaa1111"), "multipart/form-data; boundary=aaaa1111", 0),
+        ("retry", _multipart("zz"), 'multipart/form-data; boundary="zz"', 0.01),
+    ])
+    assert runs == ["first"]
+    assert results["retry"] == [200, b"first"]
+
+
+def test_one_waiter_takes_over_a_dead_attempt():
+    runs = []
+    results = _run(_app(runs, fail={"first"}), [("first", b"{}", "application/json", 0)] + [
+        (f"retry{i}", b"{}", "application/json", 0.01) for i in range(3)
+    ])
+    assert len(runs) == 2
+    assert {tuple(results[f"retry{i}"]) for i in range(3)} == {(200, runs[1].encode())}
+
+
+def test_streamed_response_is_captured_and_replayed():
+    chunks = [b"a" * 10] * 5
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"50")]})
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def main():
+        middleware = IdempotencyMiddleware(app, ["/x"])
+        scope = {"type": "http", "method": "POST", "path": "/x", "headers": [(b"idempotency-key", b"k")]}
+
+        async def receive():
+            return {"type": "http.request", "body": b"{}"}
+
+        await middleware(scope, receive, _ignore)
+        entry = middleware.store.get(("/x", "k"))
+        replayed = []
+
+        async def send(message):
+            replayed.append(message)
+
+        await middleware(scope, receive, send)
+        return entry, replayed
+
+    entry, replayed = asyncio.run(main())
+    assert bytes(entry.body) == b"a" * 50
+    assert replayed[-1]["body"] == b"a" * 50
+
+
+def test_oversized_response_stops_capturing_and_is_not_kept():
+    runs = []
+
+    async def app(scope, receive, send):
+        await receive()
+        runs.append(1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(5):
+            await send({"type": "http.response.body", "body": b"a" * 10, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def main():
+        middleware = IdempotencyMiddleware(app, ["/x"], max_body_bytes=25)
+        scope = {"type": "http", "method": "POST", "path": "/x", "headers": [(b"idempotency-key", b"k")]}
+        captured = []
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"{}"}
+
+        async def send(message):
+            sent.append(message.get("body", b""))
+            entry = next(iter(middleware.store._entries.values()), None)
+            if entry is not None:
+                captured.append(len(entry.body))
+
+        await middleware(scope, receive, send)
+        first_key_kept = middleware.store.get(("/x", "k")) is not None
+        await middleware(scope, receive, _ignore)
+        return b"".join(sent), captured, first_key_kept
+
+    body, captured, kept = asyncio.run(main())
+    # The client still gets the whole response; the store stops buffering past the limit
+    assert body == b"a" * 50
+    assert max(captured) <= 25
+    assert not kept
+    assert len(runs) == 2
+
+
+async def _ignore(message):
+    pass
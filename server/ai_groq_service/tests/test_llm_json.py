@@ -0,0 +1,30 @@
+from app.utils.llm_json import extract_json_block, parse_llm_json
+
+
+def test_object_preferred_over_earlier_bracket_in_prose():
+    text = 'Note [1]: {"skills": ["Python", "SQL"]} as requested.'
+    assert extract_json_block(text) == '{"skills": ["Python", "SQL"]}'
+    assert parse_llm_json(text) == {"skills": ["Python", "SQL"]}
+
+
+def test_array_used_when_there_is_no_object():
+    assert extract_json_block('Result: ["a", "b"] done') == '["a", "b"]'
+
+
+def test_array_of_objects_in_prose_is_returned_whole():
+    text = 'Here you go: [{"a": 1}, {"b": 2}] thanks'
+    assert extract_json_block(text) == '[{"a": 1}, {"b": 2}]'
+    assert parse_llm_json(text) == [{"a": 1}, {"b": 2}]
+
+
+def test_truncated_array_of_objects_is_repaired():
+    assert parse_llm_json('Sure: [{"a": 1}, {"b": 2}, {"c"') == [{"a": 1}, {"b": 2}]
+
+
+def test_brackets_inside_strings_are_skipped():
+    text = 'Here you go: {"note": "see [1] and }", "level": 4} thanks'
+    assert parse_llm_json(text) == {"note": "see [1] and }", "level": 4}
+
+
+def test_truncated_object_is_repaired():
+    assert parse_llm_json('{"skills": ["Python", "SQ') == {"skills": ["Python", "SQ"]}
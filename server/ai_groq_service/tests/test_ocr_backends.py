@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from app.services import ocr_backends
+
+
+class _FakeEngine:
+    created = []
+
+    def __init__(self, lang):
+        self.lang = lang
+        self.in_use = False
+        _FakeEngine.created.append(self)
+
+    def SetImage(self, image):
+        assert not self.in_use, "engine shared between threads"
+        self.in_use = True
+
+    def GetUTF8Text(self):
+        time.sleep(0.01)
+        return "text"
+
+    def AllWordConfidences(self):
+        return [80, -1, 90]
+
+    def Clear(self):
+        self.in_use = False
+
+
+def _backend(monkeypatch, max_engines):
+    _FakeEngine.created = []
+    monkeypatch.setattr(ocr_backends, "tesserocr", SimpleNamespace(PyTessBaseAPI=_FakeEngine))
+    return ocr_backends.get_ocr_backend("tesserocr", max_engines=max_engines)
+
+
+def test_engines_are_reused_between_calls(monkeypatch):
+    backend = _backend(monkeypatch, max_engines=4)
+    for _ in range(5):
+        assert backend.image_to_text_with_confidence(None) == ("text", 85.0)
+    assert len(_FakeEngine.created) == 1
+
+
+def test_callers_wait_for_an_engine_once_the_pool_is_exhausted(monkeypatch):
+    backend = _backend(monkeypatch, max_engines=3)
+    with ThreadPoolExecutor(40) as pool:
+        results = list(pool.map(lambda _: backend.image_to_string(None), range(120)))
+    assert results == ["text"] * 120
+    assert len(_FakeEngine.created) == 3
+
+
+def test_failed_engine_start_frees_its_slot(monkeypatch):
+    backend = _backend(monkeypatch, max_engines=1)
+    failing = SimpleNamespace(PyTessBaseAPI=lambda lang: (_ for _ in ()).throw(RuntimeError("no traineddata")))
+    monkeypatch.setattr(ocr_backends, "tesserocr", failing)
+    try:
+        backend.image_to_string(None)
+    except RuntimeError:
+        pass
+    monkeypatch.setattr(ocr_backends, "tesserocr", SimpleNamespace(PyTessBaseAPI=_FakeEngine))
+    done = threading.Event()
+    threading.Thread(target=lambda: (backend.image_to_string(None), done.set())).start()
+    assert done.wait(1)
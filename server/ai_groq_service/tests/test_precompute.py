@@ -0,0 +1,58 @@
+import json
+from cli import precompute
+from app.precomputed import PrecomputedStore, input_hash
+
+ROADMAP = {"current_status": "Level 4", "future_plans": [], "job_opportunities": []}
+
+
+def _write(path, rows):
+    path.write_text("\n".join(json.dumps(row) if isinstance(row, dict) else row for row in rows) + "\n")
+    return path
+
+
+def test_load_learners_merges_rows_per_learner(tmp_path):
+    export = _write(tmp_path / "learners.jsonl", [
+        {"learner_email": "a@x", "certificates": [{"certificate_title": "Python"}], "learner_profile": {"goal": "data"}},
+        {"learner_email": "a@x", "certificate_title": "SQL", "issuer_name": "NSDC"},
+        {"learner_email": "b@x", "certificate_title": "Welding"},
+        "{not json",
+        {"certificate_title": "orphan"},
+    ])
+    learners = precompute.load_learners(export)
+    assert learners == {
+        "a@x": {"certificates": [{"certificate_title": "Python"}, {"certificate_title": "SQL", "issuer_name": "NSDC"}],
+                "learner_profile": {"goal": "data"}},
+        "b@x": {"certificates": [{"certificate_title": "Welding"}], "learner_profile": {}},
+    }
+
+
+def test_plan_jobs_skips_stored_results_and_redoes_the_rest(tmp_path):
+    store = PrecomputedStore(str(tmp_path / "store.sqlite"))
+    learners = {
+        "done@x": {"certificates": [{"certificate_title": "Python"}], "learner_profile": {}},
+        "hollow@x": {"certificates": [{"certificate_title": "SQL"}], "learner_profile": {}},
+        "new@x": {"certificates": [{"certificate_title": "Java"}], "learner_profile": {}},
+        "empty@x": {"certificates": [], "learner_profile": {}},
+    }
+    store.put("roadmap", input_hash("roadmap", learners["done@x"]["certificates"], {}), ROADMAP)
+    store.put("roadmap", input_hash("roadmap", learners["hollow@x"]["certificates"], {}), {"stackable_pathways": []})
+
+    stats = {"done": 0, "failed": 0, "already_done": 0, "skipped_empty": 0}
+    planned = [email for _, email, _, _ in precompute.plan_jobs(store, learners, ["roadmap"], False, stats)]
+    assert planned == ["hollow@x", "new@x"]
+    assert stats["already_done"] == 1 and stats["skipped_empty"] == 1
+
+    forced = [email for _, email, _, _ in precompute.plan_jobs(store, learners, ["roadmap"], True, dict(stats))]
+    assert forced == ["done@x", "hollow@x", "new@x"]
+
+
+def test_run_job_retries_and_does_not_store_a_result_missing_core_fields(tmp_path, monkeypatch):
+    store = PrecomputedStore(str(tmp_path / "store.sqlite"))
+    answers = [{"stackable_pathways": [{"pathway_name": "Next"}]}, {}, ROADMAP]
+    monkeypatch.setattr(precompute, "run_task", lambda kind, learner: answers.pop(0))
+    learner = {"certificates": [{"certificate_title": "Python"}], "learner_profile": {}}
+
+    assert not precompute.run_job(store, precompute.Pacer(0), "roadmap", "a@x", learner, "k", retries=1, backoff=0)
+    assert store.get("roadmap", "k") is None
+    assert precompute.run_job(store, precompute.Pacer(0), "roadmap", "a@x", learner, "k", retries=0, backoff=0)
+    assert store.get("roadmap", "k") == ROADMAP
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+from app.profiling import call_with_profile, profile_store, run_in_threadpool
+
+
+def _tesseract_stand_in():
+    return sum(i * i for i in range(10000))
+
+
+def test_threadpool_work_is_in_the_request_profile():
+    request = SimpleNamespace(method="POST", url=SimpleNamespace(path="/ai/process-ocr"))
+
+    async def call_next(_):
+        await run_in_threadpool(_tesseract_stand_in)
+        return SimpleNamespace(status_code=200)
+
+    response, profile_id = asyncio.run(call_with_profile(request, call_next))
+    assert response.status_code == 200
+    assert "_tesseract_stand_in" in profile_store.get(profile_id)["text"]
+
+
+def test_threadpool_calls_outside_a_profile_run_plainly():
+    assert asyncio.run(run_in_threadpool(_tesseract_stand_in)) == _tesseract_stand_in()
+
+
+def test_profiles_in_a_shared_directory_are_visible_to_other_workers(tmp_path):
+    import cProfile
+    from app.profiling import ProfileStore
+
+    def profiled():
+        profiler = cProfile.Profile()
+        profiler.runcall(_tesseract_stand_in)
+        return [profiler]
+
+    recording, serving = ProfileStore(max_entries=2, directory=str(tmp_path)), ProfileStore(directory=str(tmp_path))
+    ids = [recording.add(profiled(), {"path": f"/ai/{i}"}) for i in range(3)]
+
+    assert serving.get(ids[0]) is None
+    assert serving.get(ids[2])["path"] == "/ai/2"
+    assert [entry["id"] for entry in serving.list()] == [ids[2], ids[1]]
+    assert serving.get("../" + ids[2]) is None
@@ -0,0 +1,112 @@
+import asyncio
+import gzip
+import json
+import brotli
+import pytest
+from starlette.requests import Request
+from app import responses
+from app.responses import CompressionMiddleware, select_fields
+
+PAYLOAD = {
+    "extracted_text": "long text",
+    "skills": [{"name": "Python", "category": "Programming"}],
+    "certificate_metadata": {"course_name": "Python", "certificate_number": "ABC-1"},
+}
+
+
+def _request(query: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": query.encode()})
+
+
+def test_fields_keeps_only_the_named_top_level_keys_with_their_nested_values():
+    assert select_fields(PAYLOAD, _request("fields=skills,certificate_metadata")) == {
+        "skills": PAYLOAD["skills"], "certificate_metadata": PAYLOAD["certificate_metadata"]
+    }
+
+
+def test_exclude_drops_top_level_keys_and_leaves_nested_ones():
+    selected = select_fields(PAYLOAD, _request("exclude=extracted_text,course_name"))
+    assert selected == {"skills": PAYLOAD["skills"], "certificate_metadata": PAYLOAD["certificate_metadata"]}
+
+
+def test_fields_and_exclude_combine_and_non_dicts_pass_through():
+    assert select_fields(PAYLOAD, _request("fields=skills,extracted_text&exclude=extracted_text")) == {
+        "skills": PAYLOAD["skills"]
+    }
+    assert select_fields([PAYLOAD], _request("fields=skills")) == [PAYLOAD]
+    assert select_fields(PAYLOAD, _request("")) is PAYLOAD
+
+
+def _send(accept_encoding: str, body: bytes, content_type: str = "application/json",
+          extra_headers=(), more_body: bool = False):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers + list(extra_headers)})
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+        if more_body:
+            await send({"type": "http.response.body", "body": b""})
+
+    async def main():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []}
+        await CompressionMiddleware(app, minimum_size=100)(scope, None, send)
+        headers = {k.decode(): v.decode() for k, v in sent[0]["headers"]}
+        return headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+    return asyncio.run(main())
+
+
+BODY = json.dumps({"text": "certificate " * 50}).encode()
+
+
+@pytest.mark.parametrize("accept,expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_encoding_follows_accept_encoding(accept, expected):
+    headers, body = _send(accept, BODY)
+    assert headers.get("content-encoding") == expected
+    decoded = {"br": brotli.decompress, "gzip": gzip.decompress, None: bytes}[expected](body)
+    assert decoded == BODY
+    if expected:
+        assert headers["content-length"] == str(len(body))
+        assert headers["vary"] == "Accept-Encoding"
+
+
+def test_gzip_is_used_when_brotli_is_not_installed(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    headers, body = _send("br, gzip", BODY)
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
+
+
+def test_small_bodies_are_sent_as_is():
+    headers, body = _send("br, gzip", b'{"ok": true}')
+    assert "content-encoding" not in headers and "vary" not in headers
+    assert body == b'{"ok": true}'
+
+
+def test_already_encoded_responses_are_not_compressed_again():
+    encoded = gzip.compress(BODY)
+    headers, body = _send("br, gzip", encoded, extra_headers=[(b"content-encoding", b"gzip")])
+    assert headers["content-encoding"] == "gzip"
+    assert body == encoded
+
+
+def test_streaming_and_binary_responses_pass_through():
+    headers, body = _send("gzip", BODY, more_body=True)
+    assert "content-encoding" not in headers and body == BODY
+    headers, body = _send("gzip", b"\x89PNG" * 100, content_type="image/png")
+    assert "content-encoding" not in headers
+
+
+def test_existing_vary_header_is_extended():
+    headers, _ = _send("gzip", BODY, extra_headers=[(b"vary", b"Origin")])
+    assert headers["vary"] == "Origin, Accept-Encoding"
@@ -0,0 +1,50 @@
+import threading
+import time
+from types import SimpleNamespace
+from app.services.stackability_service import StackabilityService
+
+
+def _template(*skills):
+    service = StackabilityService()
+    return service._normalize_template({"pathways": [{
+        "pathway_title": "Web Developer",
+        "skills": [{"name": name, "credits_total": 4, "aliases": aliases} for name, aliases in skills],
+    }]})
+
+
+def _statuses(template, learner_skills):
+    result = StackabilityService().apply_template(template, learner_skills)
+    return {skill["name"]: skill["status"] for skill in result["pathways"][0]["skills"]}
+
+
+def test_skills_match_on_whole_words():
+    template = _template(("JavaScript Basics", []), ("AWS Lambda", []), ("Docker", ["Containers"]))
+    assert _statuses(template, ["Java"]) == {"JavaScript Basics": "missing", "AWS Lambda": "missing", "Docker": "missing"}
+    assert _statuses(template, ["JavaScript", "AWS", "containers"]) == {
+        "JavaScript Basics": "in_progress", "AWS Lambda": "in_progress", "Docker": "completed"
+    }
+
+
+def test_generic_words_alone_do_not_count():
+    template = _template(("JavaScript Basics", []), ("Advanced Excel", []))
+    assert set(_statuses(template, ["Basics", "Advanced"]).values()) == {"missing"}
+
+
+def test_concurrent_misses_generate_one_template():
+    service = StackabilityService()
+    calls = []
+
+    def generate(request):
+        calls.append(request)
+        time.sleep(0.05)
+        return service._normalize_template({"pathways": [{"pathway_title": "Next", "skills": ["Python"]}]})
+
+    service._generate_template = generate
+    request = SimpleNamespace(code="QP1", level=4, sector_name="IT", proposed_occupation=None)
+    threads = [threading.Thread(target=service.get_template, args=(request,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert service._key_locks == {}
@@ -126,11 +126,11 @@ NODE_APP_PID=$!
 # Start ai_groq_service
 echo -e "${MAGENTA}[4/5] Starting server-ai (production)...${NC}"
 if [ -d "server/ai_groq_service/.venv" ]; then
-    (cd server/ai_groq_service && source .venv/bin/activate && uvicorn main:app --host 0.0.0.0 --port 8000 2>&1 | prefix_logs "${MAGENTA}" "server-ai") &
+    (cd server/ai_groq_service && source .venv/bin/activate && gunicorn -c gunicorn.conf.py main:app 2>&1 | prefix_logs "${MAGENTA}" "server-ai") &
     AI_SERVICE_PID=$!
 else
     echo -e "${YELLOW}Warning: .venv not found for AI service. Trying without venv...${NC}"
-    (cd server/ai_groq_service && uvicorn main:app --host 0.0.0.0 --port 8000 2>&1 | prefix_logs "${MAGENTA}" "server-ai") &
+    (cd server/ai_groq_service && gunicorn -c gunicorn.conf.py main:app 2>&1 | prefix_logs "${MAGENTA}" "server-ai") &
     AI_SERVICE_PID=$!
 fi
 